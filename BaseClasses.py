@@ -6,10 +6,12 @@ import functools
 import logging
 import random
 import secrets
+import threading
 import typing  # this can go away when Python 3.8 support is dropped
 from argparse import Namespace
 from collections import Counter, deque
 from collections.abc import Collection, MutableSequence
+from concurrent.futures import Executor
 from enum import IntEnum, IntFlag
 from typing import Any, Callable, Dict, Iterable, Iterator, List, Mapping, NamedTuple, Optional, Set, Tuple, \
                    TypedDict, Union, Type, ClassVar
@@ -20,6 +22,7 @@ import Utils
 
 if typing.TYPE_CHECKING:
     from worlds import AutoWorld
+    from Profiler import GenerationProfiler
 
 
 class Group(TypedDict, total=False):
@@ -48,6 +51,18 @@ class ThreadBarrierProxy:
                                "Please use multiworld.per_slot_randoms[player] or randomize ahead of output.")
 
 
+class SphereData(NamedTuple):
+    """A single walk through the logical spheres of a filled multiworld, see MultiWorld.get_sphere_data."""
+    spheres: List[Set[Location]]
+    """filled locations of each logical sphere, in order"""
+    unreachable: Set[Location]
+    """filled locations that can't be reached"""
+    states: List[CollectionState]
+    """states[i] has collected the advancement items of the spheres before spheres[i], states[-1] those of all spheres.
+    Empty for walks collecting every item, which nothing reads states of.
+    Shared between users, so copy before changing them."""
+
+
 class MultiWorld():
     debug_types = False
     player_name: Dict[int, str]
@@ -61,6 +76,14 @@ class MultiWorld():
     is_race: bool = False
     precollected_items: Dict[int, List[Item]]
     state: CollectionState
+    reachability_executor: Optional[Executor] = None
+    """If set, CollectionState.update_stale_regions updates independent players on it concurrently."""
+    profiler: Optional[GenerationProfiler] = None
+    """If set, records time spent in worlds, access rules and CollectionState operations, see Generate's --profile."""
+    cache_spheres: bool = False
+    """Set once world hooks no longer change logic, lets get_sphere_data reuse its walks until items are moved."""
+    _sphere_data: Dict[bool, Tuple[Tuple[Any, ...], SphereData]]
+    _sphere_lock: threading.RLock
 
     plando_options: PlandoOptions
     accessibility: Dict[int, Options.Accessibility]
@@ -141,6 +164,8 @@ class MultiWorld():
         self.seed = None
         self.seed_name: str = "Unavailable"
         self.precollected_items = {player: [] for player in self.player_ids}
+        self._sphere_data = {}
+        self._sphere_lock = threading.RLock()
         self.required_locations = []
         self.light_world_light_cone = False
         self.dark_world_light_cone = False
@@ -489,35 +514,63 @@ class MultiWorld():
 
         return False
 
-    def get_spheres(self) -> Iterator[Set[Location]]:
+    def get_sphere_data(self, collect_all: bool = False) -> SphereData:
         """
-        yields a set of locations for each logical sphere
-
-        If there are unreachable locations, the last sphere of reachable
-        locations is followed by an empty set, and then a set of all of the
-        unreachable locations.
+        Walks the logical spheres of the filled multiworld, collecting the advancement items of each sphere,
+        or every item if collect_all is set.
+        With cache_spheres set, the result is kept until an item gets placed, moved or changes classification, so
+        accessibility check and playthrough, or multidata and worlds asking for spheres, share one walk.
+        Safe to call from multiple threads.
         """
+        if not self.cache_spheres:
+            return self._walk_spheres(collect_all)
+        placements = (tuple((location.item, location.item.advancement) if location.item else None
+                            for location in self.get_locations()),
+                      tuple(itertools.chain.from_iterable(self.precollected_items.values())))
+        with self._sphere_lock:
+            cached = self._sphere_data.get(collect_all)
+            if not cached or cached[0] != placements:
+                cached = self._sphere_data[collect_all] = placements, self._walk_spheres(collect_all)
+            return cached[1]
+
+    def _walk_spheres(self, collect_all: bool) -> SphereData:
         state = CollectionState(self)
         locations = set(self.get_filled_locations())
+        spheres: List[Set[Location]] = []
+        states = [] if collect_all else [state.copy()]
 
         while locations:
-            sphere: Set[Location] = set()
-
-            for location in locations:
-                if location.can_reach(state):
-                    sphere.add(location)
-            yield sphere
+            sphere = {location for location in locations if location.can_reach(state)}
             if not sphere:
-                if locations:
-                    yield locations  # unreachable locations
                 break
-
             for location in sphere:
-                state.collect(location.item, True, location)
+                if collect_all or location.advancement:
+                    state.collect(location.item, True, location)
             locations -= sphere
+            spheres.append(sphere)
+            if not collect_all:
+                states.append(state.copy())
+
+        return SphereData(spheres, locations, states)
+
+    def get_spheres(self) -> Iterator[Set[Location]]:
+        """
+        yields a set of locations for each logical sphere
+
+        If there are unreachable locations, the last sphere of reachable
+        locations is followed by an empty set, and then a set of all of the
+        unreachable locations.
+        """
+        sphere_data = self.get_sphere_data(True)
+        for sphere in sphere_data.spheres:
+            yield sphere.copy()
+        if sphere_data.unreachable:
+            yield set()
+            yield sphere_data.unreachable.copy()
 
     def fulfills_accessibility(self, state: Optional[CollectionState] = None):
         """Check if accessibility rules are fulfilled with current or supplied state."""
+        use_cache = state is None
         if not state:
             state = CollectionState(self)
         players: Dict[str, Set[int]] = {
@@ -554,6 +607,21 @@ class MultiWorld():
 
         locations = [location for location in self.get_locations() if location_relevant(location)]
 
+        if use_cache and not players["locations"] and not any(
+                location.progress_type == LocationProgressType.EXCLUDED and location.advancement
+                for location in self.get_filled_locations()):
+            # the cached sphere walk collected the same advancement items as the sweep below would
+            sphere_data = self.get_sphere_data()
+            state = sphere_data.states[-1].copy()
+            unreachable = [location for location in locations if location in sphere_data.unreachable]
+            if locations and self.has_beaten_game(state) \
+                    and not any(location_condition(location) for location in unreachable):
+                return True
+            if unreachable:
+                logging.warning(f"Could not access required locations for accessibility check."
+                                f" Missing: {unreachable}")
+            return False
+
         while locations:
             sphere: List[Location] = []
             for n in range(len(locations) - 1, -1, -1):
@@ -582,27 +650,118 @@ class MultiWorld():
 PathValue = Tuple[str, Optional["PathValue"]]
 
 
+class TrackedItemCounter(Counter):
+    """
+    Counter used as `CollectionState.prog_items` for players whose world opts into `incremental_reachability`.
+    Remembers when each item name was last changed and, while `reads` is set, which item names got looked up.
+    """
+    serial: int
+    """increases with every change, so changes can be ordered against earlier rule evaluations"""
+    modified: Dict[str, int]
+    """serial of the last change of each item name"""
+    reads: Optional[Set[str]] = None
+
+    def __init__(self, *args: Any, **kwargs: Any) -> None:
+        self.serial = 0
+        self.modified = {}
+        super().__init__(*args, **kwargs)
+
+    def __getitem__(self, key: str) -> int:
+        if self.reads is not None:
+            self.reads.add(key)
+        return super().__getitem__(key)
+
+    def get(self, key: str, default: Any = None) -> Any:
+        if self.reads is not None:
+            self.reads.add(key)
+        return super().get(key, default)
+
+    def __contains__(self, key: object) -> bool:
+        if self.reads is not None:
+            self.reads.add(key)
+        return super().__contains__(key)
+
+    def __setitem__(self, key: str, value: int) -> None:
+        self.serial += 1
+        self.modified[key] = self.serial
+        super().__setitem__(key, value)
+
+    def __delitem__(self, key: str) -> None:
+        self.serial += 1
+        self.modified[key] = self.serial
+        super().__delitem__(key)
+
+    def update(self, iterable: Any = None, /, **kwds: int) -> None:
+        # Counter.update bypasses __setitem__ while empty, so always go through it here
+        if iterable is not None:
+            if not isinstance(iterable, Mapping):
+                iterable = Counter(iterable)
+            for key, count in iterable.items():
+                self[key] = count + dict.get(self, key, 0)
+        if kwds:
+            self.update(kwds)
+
+    def clear(self) -> None:
+        for key in tuple(self):
+            del self[key]
+
+    def copy(self) -> TrackedItemCounter:
+        ret = self.__class__()
+        dict.update(ret, self)
+        ret.serial = self.serial
+        ret.modified = self.modified.copy()
+        return ret
+
+    def __deepcopy__(self, memo: Dict[int, Any]) -> TrackedItemCounter:
+        return self.copy()
+
+    def record(self, rule: Callable[[CollectionState], bool], state: CollectionState) -> Tuple[bool, Set[str]]:
+        """Evaluates rule on state, returning its result and the item names it looked up in this Counter."""
+        outer = self.reads
+        self.reads = reads = set()
+        try:
+            return rule(state), reads
+        finally:
+            self.reads = outer
+            if outer is not None:
+                outer |= reads
+
+
 class CollectionState():
     prog_items: Dict[int, Counter[str]]
     multiworld: MultiWorld
     reachable_regions: Dict[int, Set[Region]]
     blocked_connections: Dict[int, Set[Entrance]]
+    blocked_dependencies: Dict[int, Dict[str, Set[Entrance]]]
+    """for incrementally tracked players, item name -> blocked connections whose access rule looked it up"""
+    dependency_serial: Dict[int, int]
+    """for incrementally tracked players, prog_items serial at the last update of reachable regions"""
     events: Set[Location]
     path: Dict[Union[Region, Entrance], PathValue]
     locations_checked: Set[Location]
     stale: Dict[int, bool]
+    _owned_items: Set[int]
+    """players whose prog_items are not shared with another state, see copy and own_prog_items"""
+    _owned_regions: Set[int]
+    """players whose reachable_regions, blocked_connections and blocked_dependencies are not shared"""
     additional_init_functions: List[Callable[[CollectionState, MultiWorld], None]] = []
     additional_copy_functions: List[Callable[[CollectionState, CollectionState], CollectionState]] = []
 
     def __init__(self, parent: MultiWorld):
-        self.prog_items = {player: Counter() for player in parent.get_all_ids()}
+        self.prog_items = {player: TrackedItemCounter()
+                           if getattr(parent.worlds.get(player), "incremental_reachability", False) else Counter()
+                           for player in parent.get_all_ids()}
         self.multiworld = parent
         self.reachable_regions = {player: set() for player in parent.get_all_ids()}
         self.blocked_connections = {player: set() for player in parent.get_all_ids()}
+        self.blocked_dependencies = {player: {} for player in parent.get_all_ids()}
+        self.dependency_serial = {player: 0 for player in parent.get_all_ids()}
         self.events = set()
         self.path = {}
         self.locations_checked = set()
         self.stale = {player: True for player in parent.get_all_ids()}
+        self._owned_items = set(parent.get_all_ids())
+        self._owned_regions = set(parent.get_all_ids())
         for function in self.additional_init_functions:
             function(self, parent)
         for items in parent.precollected_items.values():
@@ -611,6 +770,10 @@ class CollectionState():
 
     def update_reachable_regions(self, player: int):
         self.stale[player] = False
+        prog_items = self.prog_items[player]
+        if isinstance(prog_items, TrackedItemCounter):
+            self._update_reachable_regions_incremental(player, prog_items)
+            return
         reachable_regions = self.reachable_regions[player]
         blocked_connections = self.blocked_connections[player]
         queue = deque(self.blocked_connections[player])
@@ -618,6 +781,9 @@ class CollectionState():
 
         # init on first call - this can't be done on construction since the regions don't exist yet
         if start not in reachable_regions:
+            self._own_regions(player)
+            reachable_regions = self.reachable_regions[player]
+            blocked_connections = self.blocked_connections[player]
             reachable_regions.add(start)
             blocked_connections.update(start.exits)
             queue.extend(start.exits)
@@ -627,8 +793,19 @@ class CollectionState():
             connection = queue.popleft()
             new_region = connection.connected_region
             if new_region in reachable_regions:
-                blocked_connections.remove(connection)
+                reached = False
             elif connection.can_reach(self):
+                reached = True
+            else:
+                continue
+            # structures shared with copies are only unshared once something changes
+            if player not in self._owned_regions:
+                self._own_regions(player)
+                reachable_regions = self.reachable_regions[player]
+                blocked_connections = self.blocked_connections[player]
+            if not reached:
+                blocked_connections.remove(connection)
+            else:
                 assert new_region, f"tried to search through an Entrance \"{connection}\" with no Region"
                 reachable_regions.add(new_region)
                 blocked_connections.remove(connection)
@@ -641,20 +818,122 @@ class CollectionState():
                     if new_entrance in blocked_connections and new_entrance not in queue:
                         queue.append(new_entrance)
 
+    def update_stale_regions(self) -> None:
+        """
+        Updates the reachable regions of all stale players with incremental reachability, whose rules only depend on
+        their own player, concurrently on the multiworld's reachability_executor. Does nothing without an executor,
+        other players are updated lazily as usual.
+        """
+        executor = self.multiworld.reachability_executor
+        if not executor:
+            return
+        players = [player for player, stale in self.stale.items()
+                   if stale and isinstance(self.prog_items[player], TrackedItemCounter)]
+        if len(players) < 2:
+            return
+        # take ownership up front, so the workers only touch structures of their own player
+        for player in players:
+            self._own_regions(player)
+        for _ in executor.map(self.update_reachable_regions, players):
+            pass
+
+    def _update_reachable_regions_incremental(self, player: int, prog_items: TrackedItemCounter) -> None:
+        """Like update_reachable_regions, but only retries blocked connections that looked up a changed item name."""
+        start = self.multiworld.get_region("Menu", player)
+        queue: typing.Deque[Entrance] = deque()
+
+        if start not in self.reachable_regions[player]:
+            self._own_regions(player)
+            self.reachable_regions[player].add(start)
+            self.blocked_connections[player].update(start.exits)
+            queue.extend(start.exits)
+        else:
+            last_serial = self.dependency_serial[player]
+            modified = prog_items.modified
+            changed = [item_name for item_name in self.blocked_dependencies[player]
+                       if modified.get(item_name, 0) > last_serial]
+            if changed:
+                # nothing to retry leaves the structures shared with copies untouched
+                self._own_regions(player)
+            retry: Set[Entrance] = set()
+            for item_name in changed:
+                retry.update(self.blocked_dependencies[player].pop(item_name))
+            queue.extend(connection for connection in retry if connection in self.blocked_connections[player])
+        self.dependency_serial[player] = prog_items.serial
+        reachable_regions = self.reachable_regions[player]
+        blocked_connections = self.blocked_connections[player]
+        dependencies = self.blocked_dependencies[player]
+
+        while queue:
+            connection = queue.popleft()
+            new_region = connection.connected_region
+            if new_region in reachable_regions:
+                blocked_connections.discard(connection)
+                continue
+            reached, item_names = prog_items.record(connection.can_reach, self)
+            if reached:
+                assert new_region, f"tried to search through an Entrance \"{connection}\" with no Region"
+                reachable_regions.add(new_region)
+                blocked_connections.remove(connection)
+                blocked_connections.update(new_region.exits)
+                queue.extend(new_region.exits)
+                self.path[new_region] = (new_region.name, self.path.get(connection, None))
+
+                # Retry connections if the new region can unblock them
+                for new_entrance in self.multiworld.indirect_connections.get(new_region, set()):
+                    if new_entrance in blocked_connections and new_entrance not in queue:
+                        queue.append(new_entrance)
+            else:
+                for item_name in item_names:
+                    dependencies.setdefault(item_name, set()).add(connection)
+
     def copy(self) -> CollectionState:
-        ret = CollectionState(self.multiworld)
-        ret.prog_items = copy.deepcopy(self.prog_items)
-        ret.reachable_regions = {player: copy.copy(self.reachable_regions[player]) for player in
-                                 self.reachable_regions}
-        ret.blocked_connections = {player: copy.copy(self.blocked_connections[player]) for player in
-                                   self.blocked_connections}
+        """
+        Per-player structures are shared between the copy and this state until either of them changes them,
+        so copying only costs for the players that get touched afterward.
+        """
+        if self.multiworld.profiler:
+            self.multiworld.profiler.count("CollectionState.copy")
+        ret = CollectionState.__new__(CollectionState)
+        ret.multiworld = self.multiworld
+        ret.prog_items = self.prog_items.copy()
+        ret.reachable_regions = self.reachable_regions.copy()
+        ret.blocked_connections = self.blocked_connections.copy()
+        ret.blocked_dependencies = self.blocked_dependencies.copy()
+        ret.dependency_serial = self.dependency_serial.copy()
         ret.events = copy.copy(self.events)
         ret.path = copy.copy(self.path)
         ret.locations_checked = copy.copy(self.locations_checked)
+        # a copy holds the same items, so it is as up to date as this state
+        ret.stale = self.stale.copy()
+        ret._owned_items = set()
+        ret._owned_regions = set()
+        self._owned_items = set()
+        self._owned_regions = set()
+        for function in self.additional_init_functions:
+            function(ret, self.multiworld)
         for function in self.additional_copy_functions:
             ret = function(self, ret)
         return ret
 
+    def own_prog_items(self, player: int) -> None:
+        """
+        Unshares prog_items of player from copies of this state. Has to be called before changing them in place,
+        World.collect and World.remove do this automatically.
+        """
+        if player not in self._owned_items:
+            self.prog_items[player] = self.prog_items[player].copy()
+            self._owned_items.add(player)
+
+    def _own_regions(self, player: int) -> None:
+        """Unshares the region reachability structures of player, has to be called before changing them."""
+        if player not in self._owned_regions:
+            self.reachable_regions[player] = self.reachable_regions[player].copy()
+            self.blocked_connections[player] = self.blocked_connections[player].copy()
+            self.blocked_dependencies[player] = {item_name: connections.copy() for item_name, connections
+                                                 in self.blocked_dependencies[player].items()}
+            self._owned_regions.add(player)
+
     def can_reach(self,
                   spot: Union[Location, Entrance, Region, str],
                   resolution_hint: Optional[str] = None,
@@ -681,20 +960,59 @@ class CollectionState():
         return self.multiworld.get_region(spot, player).can_reach(self)
 
     def sweep_for_events(self, locations: Optional[Iterable[Location]] = None) -> None:
+        if self.multiworld.profiler:
+            self.multiworld.profiler.count("CollectionState.sweep_for_events")
         if locations is None:
             locations = self.multiworld.get_filled_locations()
         reachable_events = True
         # since the loop has a good chance to run more than once, only filter the events once
         locations = {location for location in locations if location.advancement and location not in self.events}
+        tracked_locations = {location for location in locations
+                             if isinstance(self.prog_items[location.player], TrackedItemCounter)}
+        locations -= tracked_locations
+        # failed tracked locations -> (prog_items serial, reachable region count, looked up item names)
+        blocked: Dict[Location, Tuple[int, int, Set[str]]] = {}
 
         while reachable_events:
+            self.update_stale_regions()
             reachable_events = {location for location in locations if location.can_reach(self)}
+            reachable_events.update(location for location in tracked_locations
+                                    if self._can_reach_tracked_location(location, blocked))
             locations -= reachable_events
+            tracked_locations -= reachable_events
             for event in reachable_events:
                 self.events.add(event)
                 assert isinstance(event.item, Item), "tried to collect Event with no Item"
                 self.collect(event.item, True, event)
 
+    def _can_reach_tracked_location(self, location: Location,
+                                    blocked: Dict[Location, Tuple[int, int, Set[str]]]) -> bool:
+        """
+        Location.can_reach for a location of an incrementally tracked player during a sweep.
+        A location that failed before is only re-evaluated if an item name its rule looked up changed
+        or if the player reached new regions since.
+        """
+        region = location.parent_region
+        assert region, "Can't reach location without region"
+        player = region.player
+        if self.stale[player]:
+            self.update_reachable_regions(player)
+        prog_items: TrackedItemCounter = self.prog_items[location.player]
+        region_count = len(self.reachable_regions[player])
+        if location in blocked:
+            serial, previous_region_count, item_names = blocked[location]
+            modified = prog_items.modified
+            if previous_region_count == region_count and \
+                    all(modified.get(item_name, 0) <= serial for item_name in item_names):
+                return False
+        if region not in self.reachable_regions[player]:
+            blocked[location] = (prog_items.serial, region_count, set())
+            return False
+        reached, item_names = prog_items.record(location.access_rule, self)
+        if not reached:
+            blocked[location] = (prog_items.serial, region_count, item_names)
+        return reached
+
     # item name related
     def has(self, item: str, player: int, count: int = 1) -> bool:
         return self.prog_items[player][item] >= count
@@ -792,6 +1110,7 @@ class CollectionState():
         if location:
             self.locations_checked.add(location)
 
+        self.own_prog_items(item.player)
         changed = self.multiworld.worlds[item.player].collect(self, item)
 
         if not changed and event:
@@ -806,11 +1125,14 @@ class CollectionState():
         return changed
 
     def remove(self, item: Item):
+        self.own_prog_items(item.player)
         changed = self.multiworld.worlds[item.player].remove(self, item)
         if changed:
             # invalidate caches, nothing can be trusted anymore now
             self.reachable_regions[item.player] = set()
             self.blocked_connections[item.player] = set()
+            self.blocked_dependencies[item.player] = {}
+            self._owned_regions.add(item.player)
             self.stale[item.player] = True
 
 
@@ -1218,36 +1540,34 @@ class Spoiler:
         prog_locations = {location for location in multiworld.get_filled_locations() if location.item.advancement}
         state_cache: List[Optional[CollectionState]] = [None]
         collection_spheres: List[Set[Location]] = []
-        state = CollectionState(multiworld)
+        sphere_data = multiworld.get_sphere_data()
         sphere_candidates = set(prog_locations)
         logging.debug('Building up collection spheres.')
-        while sphere_candidates:
-
-            # build up spheres of collection radius.
-            # Everything in each sphere is independent from each other in dependencies and only depends on lower spheres
-
-            sphere = {location for location in sphere_candidates if state.can_reach(location)}
-
-            for location in sphere:
-                state.collect(location.item, True, location)
+        # build up spheres of collection radius.
+        # Everything in each sphere is independent from each other in dependencies and only depends on lower spheres
+        for all_sphere, sphere_state in zip(sphere_data.spheres, sphere_data.states[1:]):
+            if not sphere_candidates:
+                break
+            sphere = {location for location in all_sphere if location.advancement}
 
             sphere_candidates -= sphere
             collection_spheres.append(sphere)
-            state_cache.append(state.copy())
+            state_cache.append(sphere_state)
 
             logging.debug('Calculated sphere %i, containing %i of %i progress items.', len(collection_spheres),
                           len(sphere),
                           len(prog_locations))
-            if not sphere:
-                logging.debug('The following items could not be reached: %s', ['%s (Player %d) at %s (Player %d)' % (
-                    location.item.name, location.item.player, location.name, location.player) for location in
-                                                                               sphere_candidates])
-                if any([multiworld.worlds[location.item.player].options.accessibility != 'minimal' for location in sphere_candidates]):
-                    raise RuntimeError(f'Not all progression items reachable ({sphere_candidates}). '
-                                       f'Something went terribly wrong here.')
-                else:
-                    self.unreachables = sphere_candidates
-                    break
+        if sphere_candidates:
+            collection_spheres.append(set())
+            state_cache.append(sphere_data.states[-1])
+            logging.debug('The following items could not be reached: %s', ['%s (Player %d) at %s (Player %d)' % (
+                location.item.name, location.item.player, location.name, location.player) for location in
+                                                                           sphere_candidates])
+            if any([multiworld.worlds[location.item.player].options.accessibility != 'minimal' for location in sphere_candidates]):
+                raise RuntimeError(f'Not all progression items reachable ({sphere_candidates}). '
+                                   f'Something went terribly wrong here.')
+            else:
+                self.unreachables = sphere_candidates
 
         # in the second phase, we cull each sphere such that the game is still beatable,
         # reducing each range of influence to the bare minimum required inside it
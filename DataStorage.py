@@ -0,0 +1,203 @@
+"""
+Server side data storage that clients write with Set, read with Get and watch with SetNotify.
+Stored values are never modified in place: operations that change a container work on a shallow copy,
+which shares all unchanged elements with the previous value. This keeps values handed out earlier,
+like the original_value of a SetReply or a value being saved, stable without deep copies.
+"""
+from __future__ import annotations
+
+import collections
+import copy
+import json
+import math
+import operator
+import typing
+import weakref
+
+if typing.TYPE_CHECKING:
+    from NetUtils import Endpoint
+
+
+class DataStorageError(Exception):
+    """A Set could not be applied, the stored value was not changed."""
+
+
+def remove_from_list(container, value):
+    try:
+        container.remove(value)
+    except ValueError:
+        pass
+    return container
+
+
+def pop_from_container(container, value):
+    try:
+        container.pop(value)
+    except ValueError:
+        pass
+    return container
+
+
+def update_dict(dictionary, entries):
+    dictionary.update(entries)
+    return dictionary
+
+
+# functions callable on storable data on the server by clients
+modify_functions = {
+    # generic:
+    "replace": lambda old, new: new,
+    "default": lambda old, new: old,
+    # numeric:
+    "add": operator.add,  # add together two objects, using python's "+" operator (works on strings and lists as append)
+    "mul": operator.mul,
+    "pow": operator.pow,
+    "mod": operator.mod,
+    "floor": lambda value, _: math.floor(value),
+    "ceil": lambda value, _: math.ceil(value),
+    "max": max,
+    "min": min,
+    # bitwise:
+    "xor": operator.xor,
+    "or": operator.or_,
+    "and": operator.and_,
+    "left_shift": operator.lshift,
+    "right_shift": operator.rshift,
+    # lists/dicts:
+    "remove": remove_from_list,
+    "pop": pop_from_container,
+    "update": update_dict,
+}
+
+in_place_functions = {"remove", "pop", "update"}
+"""operations that modify their container, only applied to copies owned by the Set"""
+shrinking_functions = {"remove", "pop", "default"}
+"""operations that can't make the encoded value larger"""
+
+_measure = json.JSONEncoder(ensure_ascii=False, check_circular=False, separators=(",", ":")).encode
+
+
+class DataStorage:
+    values: typing.Dict[str, typing.Any]
+    dirty: typing.Set[str]
+    """keys changed since the last take_dirty"""
+    value_limit: int
+    """largest encoded size of a key and its value, 0 for no limit"""
+    limit: int
+    """largest encoded size of all keys and values together, 0 for no limit"""
+    sizes: typing.Dict[str, int]
+    """
+    upper bound of the encoded size of each key and value, only tracked with limits.
+    Estimated from the operations to not encode whole values on every Set, measured once a limit is close.
+    """
+    total_size: int
+    subscribers: typing.Dict[str, typing.MutableSet[Endpoint]]
+    prefix_subscribers: typing.Dict[str, typing.MutableSet[Endpoint]]
+    """subscribers of all keys starting with a prefix, subscribed to as prefix*"""
+    prefix_lengths: typing.Set[int]
+
+    def __init__(self, value_limit: int = 0, limit: int = 0) -> None:
+        self.values = {}
+        self.dirty = set()
+        self.value_limit = value_limit
+        self.limit = limit
+        self.sizes = {}
+        self.total_size = 0
+        self.subscribers = collections.defaultdict(weakref.WeakSet)
+        self.prefix_subscribers = collections.defaultdict(weakref.WeakSet)
+        self.prefix_lengths = set()
+
+    def load(self, values: typing.Dict[str, typing.Any]) -> None:
+        """Replace all values, like when loading a save. Limits are not enforced on loaded values."""
+        self.values = values
+        self.dirty.clear()
+        if self.value_limit or self.limit:
+            self.sizes = {key: len(key) + self.measure(key, value) for key, value in values.items()}
+            self.total_size = sum(self.sizes.values())
+
+    def get(self, key: str, default: typing.Any = None) -> typing.Any:
+        return self.values.get(key, default)
+
+    def set(self, key: str, default: typing.Any,
+            operations: typing.Iterable[typing.Mapping[str, typing.Any]]) -> typing.Tuple[typing.Any, typing.Any]:
+        """Apply operations to the value of key, starting from default if it has none. Returns old and new value."""
+        original = value = self.values.get(key, default)
+        owned = False  # value is a copy made by this Set, so in place operations are safe
+        tracking_size = bool(self.value_limit or self.limit)
+        size: typing.Optional[int] = self.sizes.get(key) if key in self.values else None
+        for operation in operations:
+            try:
+                name = operation["operation"]
+                func = modify_functions[name]
+            except (KeyError, TypeError):
+                raise DataStorageError(f"Unknown operation {operation!r}")
+            argument = operation.get("value")
+            try:
+                if name in in_place_functions:
+                    if not owned:
+                        value = copy.copy(value)
+                        owned = True
+                    value = func(value, argument)
+                elif name == "add" and owned and type(value) is list and type(argument) is list:
+                    value += argument  # append to our copy, instead of copying again
+                else:
+                    value = func(value, argument)
+                    # add creates a new list, other results may be shared with the operation arguments
+                    owned = name == "add" and type(value) is list
+            except Exception as e:
+                raise DataStorageError(f"Could not apply {name} to {key}: {e!r}") from e
+            if tracking_size and size is not None and name not in shrinking_functions:
+                if name == "replace":
+                    size = len(key) + self.measure(key, argument)
+                elif name in ("add", "update") and type(value) in (list, dict, str, int):
+                    size += self.measure(key, argument)  # the encoded arguments can only grow by this much
+                else:
+                    size = None
+
+        if tracking_size:
+            if size is None or \
+                    (self.value_limit and size > self.value_limit) or \
+                    (self.limit and self.total_size - self.sizes.get(key, 0) + size > self.limit):
+                size = len(key) + self.measure(key, value)
+            if self.value_limit and size > self.value_limit:
+                raise DataStorageError(f"{key} would exceed the size limit of {self.value_limit} bytes per key")
+            total_size = self.total_size - self.sizes.get(key, 0) + size
+            if self.limit and total_size > self.limit:
+                raise DataStorageError(f"{key} would exceed the data storage size limit of {self.limit} bytes")
+            self.sizes[key] = size
+            self.total_size = total_size
+        self.values[key] = value
+        self.dirty.add(key)
+        return original, value
+
+    @staticmethod
+    def measure(key: str, value: typing.Any) -> int:
+        """Encoded size of value in bytes."""
+        try:
+            encoded = _measure(value)
+        except (TypeError, ValueError) as e:
+            raise DataStorageError(f"{key} can't be stored: {e}") from e
+        return len(encoded) if encoded.isascii() else len(encoded.encode())
+
+    def take_dirty(self) -> typing.Dict[str, typing.Any]:
+        """Values changed since the last call, for saving only what changed."""
+        keys = list(self.dirty)
+        self.dirty.difference_update(keys)
+        return {key: self.values[key] for key in keys}
+
+    def subscribe(self, endpoint: Endpoint, key: str) -> None:
+        """Notify endpoint of changes to key, or to all keys starting with a prefix, if key is prefix*."""
+        if key.endswith("*"):
+            prefix = key[:-1]
+            self.prefix_subscribers[prefix].add(endpoint)
+            self.prefix_lengths.add(len(prefix))
+        else:
+            self.subscribers[key].add(endpoint)
+
+    def get_subscribers(self, key: str) -> typing.Set[Endpoint]:
+        subscribers = set(self.subscribers.get(key, ()))
+        for length in self.prefix_lengths:
+            prefix_subscribers = self.prefix_subscribers.get(key[:length])
+            if prefix_subscribers:
+                subscribers.update(prefix_subscribers)
+        return subscribers
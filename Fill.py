@@ -1,6 +1,8 @@
 import collections
 import itertools
 import logging
+import math
+import time
 import typing
 from collections import Counter, deque
 
@@ -28,10 +30,68 @@ def sweep_from_pool(base_state: CollectionState, itempool: typing.Sequence[Item]
     return new_state
 
 
+class _ExplorationCache:
+    """
+    Maximum exploration states for the consecutive steps of fill_restrictive.
+    Every step takes the last queued item of each player, so the state of a step has one item per player less than
+    the state of the step before. States are built by collecting upward from base_state, each one swept on top of
+    the one below, and get handed out in reverse. Only every block_size-th state is kept, the states in between are
+    rebuilt from it one block at a time to bound memory use.
+    """
+    queues: typing.List[typing.Tuple[Item, ...]]
+    get_sweep_locations: typing.Callable[[], typing.Optional[typing.List[Location]]]
+    step: int
+    block_size: int
+    checkpoints: typing.Dict[int, CollectionState]
+    block: typing.List[CollectionState]
+
+    def __init__(self, base_state: CollectionState, queues: typing.Iterable[typing.Sequence[Item]],
+                 get_sweep_locations: typing.Callable[[], typing.Optional[typing.List[Location]]]) -> None:
+        self.queues = [tuple(queue) for queue in queues if queue]
+        self.get_sweep_locations = get_sweep_locations
+        self.step = 0
+        depth = max((len(queue) for queue in self.queues), default=0)
+        self.block_size = max(1, math.isqrt(depth))
+        self.checkpoints = {}
+        self.block = []
+
+        state = base_state.copy()
+        state.sweep_for_events(locations=get_sweep_locations())
+        for step in range(depth - 1, -1, -1):
+            if step != depth - 1:
+                state = self._advance(state, step, step + 1 in self.checkpoints)
+            if (depth - 1 - step) % self.block_size == 0:
+                self.checkpoints[step] = state
+
+    def _advance(self, state: CollectionState, step: int, keep: bool) -> CollectionState:
+        """Returns the state of step from the state of step + 1, which is copied first if it is to be kept."""
+        if keep:
+            state = state.copy()
+        for queue in self.queues:
+            index = len(queue) - 2 - step
+            if index >= 0:
+                state.collect(queue[index], True)
+        state.sweep_for_events(locations=self.get_sweep_locations())
+        return state
+
+    def pop(self) -> CollectionState:
+        """Returns the state of the next step, without the items placed so far."""
+        if not self.block:
+            top = min(step for step in self.checkpoints if step >= self.step)
+            state = self.checkpoints.pop(top)
+            self.block.append(state)
+            for step in range(top - 1, self.step - 1, -1):
+                state = self._advance(state, step, True)
+                self.block.append(state)
+        self.step += 1
+        return self.block.pop()
+
+
 def fill_restrictive(multiworld: MultiWorld, base_state: CollectionState, locations: typing.List[Location],
                      item_pool: typing.List[Item], single_player_placement: bool = False, lock: bool = False,
                      swap: bool = True, on_place: typing.Optional[typing.Callable[[Location], None]] = None,
-                     allow_partial: bool = False, allow_excluded: bool = False, name: str = "Unknown") -> None:
+                     allow_partial: bool = False, allow_excluded: bool = False, name: str = "Unknown",
+                     cache_exploration: bool = False) -> None:
     """
     :param multiworld: Multiworld to be filled.
     :param base_state: State assumed before fill.
@@ -44,6 +104,9 @@ def fill_restrictive(multiworld: MultiWorld, base_state: CollectionState, locati
     :param allow_partial: only place what is possible. Remaining items will be in the item_pool list.
     :param allow_excluded: if true and placement fails, it is re-attempted while ignoring excluded on Locations
     :param name: name of this fill step for progress logging purposes
+    :param cache_exploration: if true, keeps exploration states between placement steps instead of rebuilding them
+    from the whole remaining item_pool every step. Places the same, but needs more memory. Falls back to rebuilding
+    after the first swap.
     """
     unplaced_items: typing.List[Item] = []
     placements: typing.List[Location] = []
@@ -57,24 +120,48 @@ def fill_restrictive(multiworld: MultiWorld, base_state: CollectionState, locati
     total = min(len(item_pool), len(locations))
     placed = 0
 
-    while any(reachable_items.values()) and locations:
+    # with single player placement, each item only scans the locations of its own player,
+    # and filled locations get removed from locations after the fill instead of searching for them every placement
+    player_locations: typing.Dict[int, typing.List[Location]] = {}
+    filled_locations: typing.Set[Location] = set()
+    if single_player_placement:
+        for location in locations:
+            player_locations.setdefault(location.player, []).append(location)
+    unfilled_count = len(locations)
+
+    exploration_cache: typing.Optional[_ExplorationCache] = None
+    if cache_exploration and item_pool:
+        sweep_player = item_pool[0].player
+        exploration_cache = _ExplorationCache(
+            base_state, reachable_items.values(),
+            lambda: multiworld.get_filled_locations(sweep_player) if single_player_placement else None)
+
+    while any(reachable_items.values()) and unfilled_count:
         # grab one item per player
         items_to_place = [items.pop()
                           for items in reachable_items.values() if items]
         for item in items_to_place:
-            for p, pool_item in enumerate(item_pool):
-                if pool_item is item:
+            # each player's queue is in item_pool order, so its last item is found at the end of item_pool
+            for p in range(len(item_pool) - 1, -1, -1):
+                if item_pool[p] is item:
                     item_pool.pop(p)
                     break
-        maximum_exploration_state = sweep_from_pool(
-            base_state, item_pool + unplaced_items, multiworld.get_filled_locations(item.player)
-            if single_player_placement else None)
+        if exploration_cache:
+            maximum_exploration_state = exploration_cache.pop()
+            for unplaced_item in unplaced_items:
+                maximum_exploration_state.collect(unplaced_item, True)
+            maximum_exploration_state.sweep_for_events(locations=multiworld.get_filled_locations(item.player)
+                                                       if single_player_placement else None)
+        else:
+            maximum_exploration_state = sweep_from_pool(
+                base_state, item_pool + unplaced_items, multiworld.get_filled_locations(item.player)
+                if single_player_placement else None)
 
         has_beaten_game = multiworld.has_beaten_game(maximum_exploration_state)
 
         while items_to_place:
             # if we have run out of locations to fill,break out of this loop
-            if not locations:
+            if not unfilled_count:
                 unplaced_items += items_to_place
                 break
             item_to_place = items_to_place.pop(0)
@@ -89,12 +176,15 @@ def fill_restrictive(multiworld: MultiWorld, base_state: CollectionState, locati
             else:
                 perform_access_check = True
 
-            for i, location in enumerate(locations):
-                if (not single_player_placement or location.player == item_to_place.player) \
-                        and location.can_fill(maximum_exploration_state, item_to_place, perform_access_check):
+            candidates = player_locations.get(item_to_place.player, []) if single_player_placement else locations
+            for i, location in enumerate(candidates):
+                if location.can_fill(maximum_exploration_state, item_to_place, perform_access_check):
                     # popping by index is faster than removing by content,
-                    spot_to_fill = locations.pop(i)
+                    spot_to_fill = candidates.pop(i)
                     # skipping a scan for the element
+                    unfilled_count -= 1
+                    if single_player_placement:
+                        filled_locations.add(spot_to_fill)
                     break
 
             else:
@@ -143,6 +233,8 @@ def fill_restrictive(multiworld: MultiWorld, base_state: CollectionState, locati
                                 reachable_items[placed_item.player].appendleft(
                                     placed_item)
                                 item_pool.append(placed_item)
+                                # the queues changed, so cached states no longer line up with the steps
+                                exploration_cache = None
 
                                 # cleanup at the end to hopefully get better errors
                                 cleanup_required = True
@@ -172,6 +264,9 @@ def fill_restrictive(multiworld: MultiWorld, base_state: CollectionState, locati
     if total > 1000:
         _log_fill_progress(name, placed, total)
 
+    if filled_locations:
+        locations[:] = [location for location in locations if location not in filled_locations]
+
     if cleanup_required:
         # validate all placements and remove invalid ones
         state = sweep_from_pool(
@@ -430,7 +525,8 @@ def distribute_early_items(multiworld: MultiWorld,
 
 
 def distribute_items_restrictive(multiworld: MultiWorld,
-                                 panic_method: typing.Literal["swap", "raise", "start_inventory"] = "swap") -> None:
+                                 panic_method: typing.Literal["swap", "raise", "start_inventory"] = "swap",
+                                 cache_exploration: bool = False) -> None:
     fill_locations = sorted(multiworld.get_unfilled_locations())
     multiworld.random.shuffle(fill_locations)
     # get items to distribute
@@ -483,15 +579,18 @@ def distribute_items_restrictive(multiworld: MultiWorld,
         if panic_method == "swap":
             fill_restrictive(multiworld, multiworld.state, defaultlocations, progitempool,
                              swap=True,
-                             name="Progression", single_player_placement=multiworld.players == 1)
+                             name="Progression", single_player_placement=multiworld.players == 1,
+                             cache_exploration=cache_exploration)
         elif panic_method == "raise":
             fill_restrictive(multiworld, multiworld.state, defaultlocations, progitempool,
                              swap=False,
-                             name="Progression", single_player_placement=multiworld.players == 1)
+                             name="Progression", single_player_placement=multiworld.players == 1,
+                             cache_exploration=cache_exploration)
         elif panic_method == "start_inventory":
             fill_restrictive(multiworld, multiworld.state, defaultlocations, progitempool,
                              swap=False, allow_partial=True,
-                             name="Progression", single_player_placement=multiworld.players == 1)
+                             name="Progression", single_player_placement=multiworld.players == 1,
+                             cache_exploration=cache_exploration)
             if progitempool:
                 for item in progitempool:
                     logging.debug(f"Moved {item} to start_inventory to prevent fill failure.")
@@ -605,6 +704,48 @@ def flood_items(multiworld: MultiWorld) -> None:
                 break
 
 
+class _SphereLookahead:
+    """
+    The spheres following the current sphere of progression balancing, as explored by its balancing lookahead.
+    Stays valid as long as no items are moved, so following spheres and lookaheads continue from it instead of
+    exploring from the current sphere again.
+    """
+    multiworld: MultiWorld
+    state: CollectionState
+    unchecked_locations: typing.Set[Location]
+    spheres: typing.List[typing.Set[Location]]
+    """spheres[0] is the current sphere"""
+    beaten: typing.List[bool]
+    """beaten[i] is whether the game is beaten once the items of spheres[0] to spheres[i] are collected"""
+
+    def __init__(self, multiworld: MultiWorld, state: CollectionState, unchecked_locations: typing.Set[Location],
+                 sphere: typing.Set[Location]) -> None:
+        self.multiworld = multiworld
+        self.state = state.copy()
+        self.unchecked_locations = unchecked_locations.copy()
+        self.spheres = [sphere]
+        self.beaten = []
+
+    def get(self, index: int) -> typing.Tuple[typing.Set[Location], bool]:
+        """Returns the sphere after spheres[index], and whether the game is beaten before it."""
+        while len(self.beaten) <= index:
+            for location in self.spheres[-1]:
+                if location.advancement:
+                    self.state.collect(location.item, True, location)
+            self.beaten.append(self.multiworld.has_beaten_game(self.state))
+            sphere = {location for location in self.unchecked_locations if self.state.can_reach(location)}
+            self.unchecked_locations -= sphere
+            self.spheres.append(sphere)
+        return self.spheres[index + 1], self.beaten[index]
+
+    def pop(self) -> typing.Set[Location]:
+        """Moves on to the next sphere and returns it."""
+        sphere, _ = self.get(0)
+        del self.spheres[0]
+        del self.beaten[0]
+        return sphere
+
+
 def balance_multiworld_progression(multiworld: MultiWorld) -> None:
     # A system to reduce situations where players have no checks remaining, popularly known as "BK mode."
     # Overall progression balancing algorithm:
@@ -643,6 +784,8 @@ def balance_multiworld_progression(multiworld: MultiWorld) -> None:
         }
         sphere_num: int = 1
         moved_item_count: int = 0
+        # exploration of the spheres after the current one, reused until items get moved
+        lookahead: typing.Optional[_SphereLookahead] = None
 
         def get_sphere_locations(sphere_state: CollectionState,
                                  locations: typing.Set[Location]) -> typing.Set[Location]:
@@ -655,15 +798,31 @@ def balance_multiworld_progression(multiworld: MultiWorld) -> None:
         if len(total_locations_count) == 0:
             return
 
+        # time spent per stage of the current sphere, for debug logging
+        timings: typing.Dict[str, float] = {}
+        timer = time.perf_counter()
+
+        def lap(stage: str) -> None:
+            nonlocal timer
+            now = time.perf_counter()
+            timings[stage] = now - timer
+            timer = now
+
         while True:
+            timings.clear()
+            timer = time.perf_counter()
             # Gather non-locked locations.
             # This ensures that only shuffled locations get counted for progression balancing,
             #   i.e. the items the players will be checking.
-            sphere_locations = get_sphere_locations(state, unchecked_locations)
+            if lookahead:
+                sphere_locations = lookahead.pop()
+            else:
+                sphere_locations = get_sphere_locations(state, unchecked_locations)
             for location in sphere_locations:
                 unchecked_locations.remove(location)
                 if not location.locked:
                     reachable_locations_count[location.player] += 1
+            lap("sphere")
 
             logging.debug(f"Sphere {sphere_num}")
             logging.debug(f"Reachable locations: {reachable_locations_count}")
@@ -689,16 +848,15 @@ def balance_multiworld_progression(multiworld: MultiWorld) -> None:
                         and item_percentage(player, reachables) < threshold_percentages[player])
                 }
                 if balancing_players:
-                    balancing_state = state.copy()
-                    balancing_unchecked_locations = unchecked_locations.copy()
+                    if not lookahead:
+                        lookahead = _SphereLookahead(multiworld, state, unchecked_locations, sphere_locations)
                     balancing_reachables = reachable_locations_count.copy()
-                    balancing_sphere = sphere_locations.copy()
                     candidate_items: typing.Dict[int, typing.Set[Location]] = collections.defaultdict(set)
+                    lookahead_depth = 0
                     while True:
                         # Check locations in the current sphere and gather progression items to swap earlier
-                        for location in balancing_sphere:
+                        for location in lookahead.spheres[lookahead_depth]:
                             if location.advancement:
-                                balancing_state.collect(location.item, True, location)
                                 player = location.item.player
                                 # only replace items that end up in another player's world
                                 if (not location.locked and not location.item.skip_in_prog_balancing and
@@ -707,22 +865,23 @@ def balance_multiworld_progression(multiworld: MultiWorld) -> None:
                                         location.progress_type != LocationProgressType.PRIORITY):
                                     candidate_items[player].add(location)
                                     logging.debug(f"Candidate item: {location.name}, {location.item.name}")
-                        balancing_sphere = get_sphere_locations(balancing_state, balancing_unchecked_locations)
+                        balancing_sphere, balancing_beaten = lookahead.get(lookahead_depth)
                         for location in balancing_sphere:
-                            balancing_unchecked_locations.remove(location)
                             if not location.locked:
                                 balancing_reachables[location.player] += 1
-                        if multiworld.has_beaten_game(balancing_state) or all(
+                        if balancing_beaten or all(
                                 item_percentage(player, reachables) >= threshold_percentages[player]
                                 for player, reachables in balancing_reachables.items()
                                 if player in threshold_percentages):
                             break
                         elif not balancing_sphere:
                             raise RuntimeError('Not all required items reachable. Something went terribly wrong here.')
+                        lookahead_depth += 1
+                    lap("lookahead")
                     # Gather a set of locations which we can swap items into
                     unlocked_locations: typing.Dict[int, typing.Set[Location]] = collections.defaultdict(set)
-                    for l in unchecked_locations:
-                        if l not in balancing_unchecked_locations:
+                    for sphere in lookahead.spheres[1:lookahead_depth + 2]:
+                        for l in sphere:
                             unlocked_locations[l.player].add(l)
                     items_to_replace: typing.List[Location] = []
                     for player in balancing_players:
@@ -741,7 +900,7 @@ def balance_multiworld_progression(multiworld: MultiWorld) -> None:
 
                             reducing_state.sweep_for_events(locations=locations_to_test)
 
-                            if multiworld.has_beaten_game(balancing_state):
+                            if balancing_beaten:
                                 if not multiworld.has_beaten_game(reducing_state):
                                     items_to_replace.append(testing)
                             else:
@@ -749,6 +908,7 @@ def balance_multiworld_progression(multiworld: MultiWorld) -> None:
                                 p = item_percentage(player, reachable_locations_count[player] + len(reduced_sphere))
                                 if p < threshold_percentages[player]:
                                     items_to_replace.append(testing)
+                    lap("candidates")
 
                     old_moved_item_count = moved_item_count
 
@@ -777,17 +937,23 @@ def balance_multiworld_progression(multiworld: MultiWorld) -> None:
 
                     if old_moved_item_count < moved_item_count:
                         logging.debug(f"Moved {moved_item_count} items so far\n")
+                        # the following spheres changed
+                        lookahead = None
                         unlocked = {fresh for player in balancing_players for fresh in unlocked_locations[player]}
                         for location in get_sphere_locations(state, unlocked):
                             unchecked_locations.remove(location)
                             if not location.locked:
                                 reachable_locations_count[location.player] += 1
                             sphere_locations.add(location)
+                    lap("swaps")
 
             for location in sphere_locations:
                 if location.advancement:
                     state.collect(location.item, True, location)
             checked_locations |= sphere_locations
+            lap("collect")
+            logging.debug(f"Sphere {sphere_num - 1} took {sum(timings.values()):.3f}s: " +
+                          ", ".join(f"{stage} {seconds:.3f}s" for stage, seconds in timings.items()))
 
             if multiworld.has_beaten_game(state):
                 break
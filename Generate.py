@@ -1,6 +1,7 @@
 from __future__ import annotations
 
 import argparse
+import concurrent.futures
 import copy
 import logging
 import os
@@ -10,7 +11,7 @@ import sys
 import urllib.parse
 import urllib.request
 from collections import Counter
-from typing import Any, Dict, Tuple, Union
+from typing import Any, Dict, List, Sequence, Tuple, Union
 from itertools import chain
 
 import ModuleUpdate
@@ -52,6 +53,11 @@ def mystery_argparse():
     parser.add_argument("--skip_output", action="store_true",
                         help="Skips generation assertion and output stages and skips multidata and spoiler output. "
                              "Intended for debugging and testing purposes.")
+    parser.add_argument("--roll_processes", default=defaults.roll_processes, type=lambda value: max(int(value), 1),
+                        help="Processes to roll the options of player files with.")
+    parser.add_argument("--profile", action="store_true",
+                        help="Record time spent per world and stage, access rule calls and CollectionState "
+                             "operations, and write them to a json report next to the output.")
     args = parser.parse_args()
     if not os.path.isabs(args.weights_file_path):
         args.weights_file_path = os.path.join(args.player_files_path, args.weights_file_path)
@@ -108,6 +114,8 @@ def main(args=None) -> Tuple[argparse.Namespace, int]:
         meta_weights = None
     player_id = 1
     player_files = {}
+    # player files with errors, which are all reported together once every file was read and rolled
+    errors: Dict[str, Exception] = {}
     for file in os.scandir(args.player_files_path):
         fname = file.name
         if file.is_file() and not fname.startswith(".") and \
@@ -116,7 +124,7 @@ def main(args=None) -> Tuple[argparse.Namespace, int]:
             try:
                 weights_cache[fname] = read_weights_yamls(path)
             except Exception as e:
-                raise ValueError(f"File {fname} is invalid. Please fix your yaml.") from e
+                errors[fname] = e
 
     # sort dict for consistent results across platforms:
     weights_cache = {key: value for key, value in sorted(weights_cache.items(), key=lambda k: k[0].casefold())}
@@ -128,6 +136,9 @@ def main(args=None) -> Tuple[argparse.Namespace, int]:
                 player_files[player_id] = filename
                 player_id += 1
 
+    if errors and player_id == 1:
+        raise_invalid_files(errors)
+
     args.multi = max(player_id - 1, args.multi)
 
     if args.multi == 0:
@@ -155,10 +166,7 @@ def main(args=None) -> Tuple[argparse.Namespace, int]:
     erargs.outputpath = args.outputpath
     erargs.skip_prog_balancing = args.skip_prog_balancing
     erargs.skip_output = args.skip_output
-
-    settings_cache: Dict[str, Tuple[argparse.Namespace, ...]] = \
-        {fname: (tuple(roll_settings(yaml, args.plando) for yaml in yamls) if args.sameoptions else None)
-         for fname, yamls in weights_cache.items()}
+    erargs.profile = args.profile
 
     if meta_weights:
         for category_name, category_dict in meta_weights.items():
@@ -177,40 +185,66 @@ def main(args=None) -> Tuple[argparse.Namespace, int]:
                             else:
                                 yaml[category_name][key] = option
 
-    player_path_cache = {}
-    for player in range(1, args.multi + 1):
-        player_path_cache[player] = player_files.get(player, args.weights_file_path)
-    name_counter = Counter()
-    erargs.player_options = {}
-
+    # each file is rolled for a block of players, one per yaml in it
+    player_blocks: List[Tuple[int, str]] = []
     player = 1
     while player <= args.multi:
-        path = player_path_cache[player]
-        if path:
+        path = player_files.get(player, args.weights_file_path)
+        if path not in weights_cache:
+            raise RuntimeError(f'No weights specified for player {player}')
+        player_blocks.append((player, path))
+        player += len(weights_cache[path])
+
+    # every roll gets its own seed, drawn in player order, so the results don't depend on how rolls are spread over
+    # processes; with --sameoptions each file is rolled once for all its blocks
+    if args.sameoptions:
+        roll_paths: Dict[Union[int, str], str] = {path: path for path in weights_cache}
+    else:
+        roll_paths = dict(player_blocks)
+    roll_seeds = {key: random.getrandbits(64) for key in roll_paths}
+    rolled_settings: Dict[Union[int, str], Tuple[argparse.Namespace, ...]] = {}
+    pool = concurrent.futures.ProcessPoolExecutor(min(args.roll_processes, len(roll_paths))) \
+        if args.roll_processes > 1 and len(roll_paths) > 1 else None
+    try:
+        rolls = {key: pool.submit(roll_yamls, weights_cache[path], args.plando, roll_seeds[key])
+                 for key, path in roll_paths.items()} if pool else {}
+        for key, path in roll_paths.items():
             try:
-                settings: Tuple[argparse.Namespace, ...] = settings_cache[path] if settings_cache[path] else \
-                    tuple(roll_settings(yaml, args.plando) for yaml in weights_cache[path])
-                for settingsObject in settings:
-                    for k, v in vars(settingsObject).items():
-                        if v is not None:
-                            try:
-                                getattr(erargs, k)[player] = v
-                            except AttributeError:
-                                setattr(erargs, k, {player: v})
-                            except Exception as e:
-                                raise Exception(f"Error setting {k} to {v} for player {player}") from e
-
-                    if path == args.weights_file_path:  # if name came from the weights file, just use base player name
-                        erargs.name[player] = f"Player{player}"
-                    elif not erargs.name[player]:  # if name was not specified, generate it from filename
-                        erargs.name[player] = os.path.splitext(os.path.split(path)[-1])[0]
-                    erargs.name[player] = handle_name(erargs.name[player], player, name_counter)
-
-                    player += 1
+                rolled_settings[key] = rolls[key].result() if pool else \
+                    roll_yamls(weights_cache[path], args.plando, roll_seeds[key])
             except Exception as e:
-                raise ValueError(f"File {path} is invalid. Please fix your yaml.") from e
-        else:
-            raise RuntimeError(f'No weights specified for player {player}')
+                errors.setdefault(path, e)
+    finally:
+        if pool:
+            pool.shutdown()
+
+    name_counter = Counter()
+    erargs.player_options = {}
+
+    for first_player, path in player_blocks:
+        settings = rolled_settings.get(path if args.sameoptions else first_player)
+        if settings is None:
+            continue  # could not be rolled, reported below
+        try:
+            for player, settings_object in enumerate(settings, first_player):
+                for k, v in vars(settings_object).items():
+                    if v is not None:
+                        try:
+                            getattr(erargs, k)[player] = v
+                        except AttributeError:
+                            setattr(erargs, k, {player: v})
+                        except Exception as e:
+                            raise Exception(f"Error setting {k} to {v} for player {player}") from e
+
+                if path == args.weights_file_path:  # if name came from the weights file, just use base player name
+                    erargs.name[player] = f"Player{player}"
+                elif not erargs.name[player]:  # if name was not specified, generate it from filename
+                    erargs.name[player] = os.path.splitext(os.path.split(path)[-1])[0]
+                erargs.name[player] = handle_name(erargs.name[player], player, name_counter)
+        except Exception as e:
+            errors.setdefault(path, e)
+
+    raise_invalid_files(errors)
 
     if len(set(name.lower() for name in erargs.name.values())) != len(erargs.name):
         raise Exception(f"Names have to be unique. Names: {Counter(name.lower() for name in erargs.name.values())}")
@@ -253,6 +287,17 @@ def read_weights_yamls(path) -> Tuple[Any, ...]:
     return tuple(parse_yamls(yaml))
 
 
+def raise_invalid_files(errors: Dict[str, Exception]) -> None:
+    """Log the error of each invalid player file and raise one error naming all of them, if there are any."""
+    if not errors:
+        return
+    for filename, error in errors.items():
+        logging.error(f"File {filename} is invalid.", exc_info=error)
+    raise ValueError(f"{len(errors)} file{'s are' if len(errors) > 1 else ' is'} invalid. Please fix your yaml:\n" +
+                     "\n".join(f"{filename}: {error}" for filename, error in errors.items())) \
+        from next(iter(errors.values()))
+
+
 def interpret_on_off(value) -> bool:
     return {"on": True, "off": False}.get(value, value)
 
@@ -518,6 +563,17 @@ def roll_settings(weights: dict, plando_options: PlandoOptions = PlandoOptions.b
     return ret
 
 
+def roll_yamls(yamls: Sequence[dict], plando_options: PlandoOptions, seed: int) -> Tuple[argparse.Namespace, ...]:
+    """Roll the settings of each yaml of a file with its own seed, so the result is the same in any process.
+    The state of the global random is restored afterwards, so rolling in this process doesn't change it either."""
+    state = random.getstate()
+    try:
+        random.seed(seed)
+        return tuple(roll_settings(yaml, plando_options) for yaml in yamls)
+    finally:
+        random.setstate(state)
+
+
 def roll_alttp_settings(ret: argparse.Namespace, weights):
     ret.sprite_pool = weights.get('sprite_pool', [])
     ret.sprite = get_choice_legacy('sprite', weights, "Link")
@@ -544,6 +600,7 @@ def roll_alttp_settings(ret: argparse.Namespace, weights):
 
 
 if __name__ == '__main__':
+    Utils.freeze_support()  # option rolls and output jobs may run in a process pool
     import atexit
     confirmation = atexit.register(input, "Press enter to close.")
     erargs, seed = main()
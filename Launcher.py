@@ -23,8 +23,11 @@ from typing import Callable, Sequence, Union, Optional
 
 import Utils
 import settings
+from worlds import load_all_worlds
 from worlds.LauncherComponents import Component, components, Type, SuffixIdentifier, icon_paths
 
+load_all_worlds()  # worlds add their components on import
+
 if __name__ == "__main__":
     import ModuleUpdate
     ModuleUpdate.update()
@@ -1,18 +1,18 @@
 import collections
 import concurrent.futures
+import contextlib
 import logging
 import os
-import pickle
 import tempfile
 import time
 import zipfile
-import zlib
 from typing import Dict, List, Optional, Set, Tuple, Union
 
 import worlds
 from BaseClasses import CollectionState, Item, Location, LocationProgressType, MultiWorld, Region
 from Fill import balance_multiworld_progression, distribute_items_restrictive, distribute_planned, flood_items
 from Options import StartInventoryPool
+from Profiler import GenerationProfiler
 from Utils import __version__, output_path, version_tuple, get_settings
 from settings import get_settings
 from worlds import AutoWorld
@@ -32,7 +32,21 @@ def main(args, seed=None, baked_server_options: Optional[Dict[str, object]] = No
     start = time.perf_counter()
     # initialize the multiworld
     multiworld = MultiWorld(args.multi)
-
+    if args.profile:
+        multiworld.profiler = GenerationProfiler()
+    reachability_threads = get_settings().generator.reachability_threads
+    if reachability_threads > 1:
+        multiworld.reachability_executor = concurrent.futures.ThreadPoolExecutor(reachability_threads,
+                                                                                 "Reachability")
+    try:
+        return _generate(args, multiworld, seed, baked_server_options, start)
+    finally:
+        if multiworld.reachability_executor:
+            multiworld.reachability_executor.shutdown()
+            multiworld.reachability_executor = None
+
+
+def _generate(args, multiworld: MultiWorld, seed, baked_server_options: Dict[str, object], start: float) -> MultiWorld:
     logger = logging.getLogger()
     multiworld.set_seed(seed, args.race, str(args.outputname) if args.outputname else None)
     multiworld.plando_options = args.plando_options
@@ -49,30 +63,27 @@ def main(args, seed=None, baked_server_options: Optional[Dict[str, object]] = No
     multiworld.state = CollectionState(multiworld)
     logger.info('Archipelago Version %s  -  Seed: %s\n', __version__, multiworld.seed)
 
-    logger.info(f"Found {len(AutoWorld.AutoWorldRegister.world_types)} World Types:")
-    longest_name = max(len(text) for text in AutoWorld.AutoWorldRegister.world_types)
-
-    max_item = 0
-    max_location = 0
-    for cls in AutoWorld.AutoWorldRegister.world_types.values():
-        if cls.item_id_to_name:
-            max_item = max(max_item, max(cls.item_id_to_name))
-            max_location = max(max_location, max(cls.location_id_to_name))
-
-    item_digits = len(str(max_item))
-    location_digits = len(str(max_location))
-    item_count = len(str(max(len(cls.item_names) for cls in AutoWorld.AutoWorldRegister.world_types.values())))
-    location_count = len(str(max(len(cls.location_names) for cls in AutoWorld.AutoWorldRegister.world_types.values())))
-    del max_item, max_location
-
-    for name, cls in AutoWorld.AutoWorldRegister.world_types.items():
-        if not cls.hidden and len(cls.item_names) > 0:
-            logger.info(f" {name:{longest_name}}: {len(cls.item_names):{item_count}} "
-                        f"Items (IDs: {min(cls.item_id_to_name):{item_digits}} - "
-                        f"{max(cls.item_id_to_name):{item_digits}}) | "
-                        f"{len(cls.location_names):{location_count}} "
-                        f"Locations (IDs: {min(cls.location_id_to_name):{location_digits}} - "
-                        f"{max(cls.location_id_to_name):{location_digits}})")
+    # listed from the data packages, so worlds that are not part of this multiworld don't get imported
+    games = worlds.network_data_package["games"]
+    logger.info(f"Found {len(games)} World Types:")
+    longest_name = max(len(text) for text in games)
+
+    item_digits = len(str(max(max(package["item_name_to_id"].values(), default=0) for package in games.values())))
+    location_digits = len(str(max(max(package["location_name_to_id"].values(), default=0)
+                                  for package in games.values())))
+    item_count = len(str(max(len(package["item_name_to_id"]) for package in games.values())))
+    location_count = len(str(max(len(package["location_name_to_id"]) for package in games.values())))
+
+    for name, package in games.items():
+        item_ids = package["item_name_to_id"].values()
+        location_ids = package["location_name_to_id"].values()
+        if not worlds.world_info[name].hidden and item_ids:
+            logger.info(f" {name:{longest_name}}: {len(item_ids):{item_count}} "
+                        f"Items (IDs: {min(item_ids):{item_digits}} - "
+                        f"{max(item_ids):{item_digits}}) | "
+                        f"{len(location_ids):{location_count}} "
+                        f"Locations (IDs: {min(location_ids, default=0):{location_digits}} - "
+                        f"{max(location_ids, default=0):{location_digits}})")
 
     del item_digits, location_digits, item_count, location_count
 
@@ -120,6 +131,8 @@ def main(args, seed=None, baked_server_options: Optional[Dict[str, object]] = No
         multiworld.worlds[player].options.non_local_items.value -= set(multiworld.local_early_items[player])
 
     AutoWorld.call_all(multiworld, "set_rules")
+    if multiworld.profiler:
+        multiworld.profiler.wrap_rules(multiworld)
 
     for player in multiworld.player_ids:
         exclusion_rules(multiworld, player, multiworld.worlds[player].options.exclude_locations.value)
@@ -271,13 +284,16 @@ def main(args, seed=None, baked_server_options: Optional[Dict[str, object]] = No
     logger.info('Running Pre Main Fill.')
 
     AutoWorld.call_all(multiworld, "pre_fill")
+    if multiworld.profiler:
+        multiworld.profiler.wrap_rules(multiworld)  # catch rules changed since set_rules
 
     logger.info(f'Filling the multiworld with {len(multiworld.itempool)} items.')
 
     if multiworld.algorithm == 'flood':
         flood_items(multiworld)  # different algo, biased towards early game progress items
     elif multiworld.algorithm == 'balanced':
-        distribute_items_restrictive(multiworld, get_settings().generator.panic_method)
+        distribute_items_restrictive(multiworld, get_settings().generator.panic_method,
+                                     get_settings().generator.cache_exploration)
 
     AutoWorld.call_all(multiworld, 'post_fill')
 
@@ -288,8 +304,11 @@ def main(args, seed=None, baked_server_options: Optional[Dict[str, object]] = No
 
     # we're about to output using multithreading, so we're removing the global random state to prevent accidental use
     multiworld.random.passthrough = False
+    # worlds are done changing logic, so spheres can be shared between accessibility check, multidata and spoiler
+    multiworld.cache_spheres = True
 
     if args.skip_output:
+        write_profile(multiworld)
         logger.info('Done. Skipped output/spoiler generation. Total Time: %s', time.perf_counter() - start)
         return multiworld
 
@@ -298,16 +317,32 @@ def main(args, seed=None, baked_server_options: Optional[Dict[str, object]] = No
 
     output = tempfile.TemporaryDirectory()
     with output as temp_dir:
-        output_players = [player for player in multiworld.player_ids if AutoWorld.World.generate_output.__code__
-                          is not multiworld.worlds[player].generate_output.__code__]
-        with concurrent.futures.ThreadPoolExecutor(len(output_players) + 2) as pool:
+        output_players = [player for player in multiworld.player_ids
+                          if AutoWorld.World.generate_output.__code__
+                          is not multiworld.worlds[player].generate_output.__code__
+                          or AutoWorld.World.get_output_job.__code__
+                          is not multiworld.worlds[player].get_output_job.__code__]
+        output_processes = get_settings().generator.output_processes
+        job_pool: Optional[concurrent.futures.ProcessPoolExecutor] = None
+
+        def generate_output(player: int) -> None:
+            job = AutoWorld.call_single(multiworld, "get_output_job", player, temp_dir)
+            if not job:
+                AutoWorld.call_single(multiworld, "generate_output", player, temp_dir)
+            elif job_pool:
+                job_pool.submit(job).result()
+            else:
+                job()
+
+        with (concurrent.futures.ProcessPoolExecutor(output_processes) if output_processes > 1
+              else contextlib.nullcontext()) as job_pool, \
+                concurrent.futures.ThreadPoolExecutor(len(output_players) + 2) as pool:
             check_accessibility_task = pool.submit(multiworld.fulfills_accessibility)
 
             output_file_futures = [pool.submit(AutoWorld.call_stage, multiworld, "generate_output", temp_dir)]
             for player in output_players:
                 # skip starting a thread for methods that say "pass".
-                output_file_futures.append(
-                    pool.submit(AutoWorld.call_single, multiworld, "generate_output", player, temp_dir))
+                output_file_futures.append(pool.submit(generate_output, player))
 
             # collect ER hint info
             er_hint_data: Dict[int, Dict[int, str]] = {}
@@ -407,11 +442,8 @@ def main(args, seed=None, baked_server_options: Optional[Dict[str, object]] = No
                 }
                 AutoWorld.call_all(multiworld, "modify_multidata", multidata)
 
-                multidata = zlib.compress(pickle.dumps(multidata), 9)
-
                 with open(os.path.join(temp_dir, f'{outfilebase}.archipelago'), 'wb') as f:
-                    f.write(bytes([3]))  # version of format
-                    f.write(multidata)
+                    NetUtils.write_multidata(multidata, f)
 
             output_file_futures.append(pool.submit(write_multidata))
             if not check_accessibility_task.result():
@@ -440,5 +472,13 @@ def main(args, seed=None, baked_server_options: Optional[Dict[str, object]] = No
             for file in os.scandir(temp_dir):
                 zf.write(file.path, arcname=file.name)
 
+    write_profile(multiworld)
     logger.info('Done. Enjoy. Total Time: %s', time.perf_counter() - start)
     return multiworld
+
+
+def write_profile(multiworld: MultiWorld) -> None:
+    if multiworld.profiler:
+        profile_path = output_path(f"AP_{multiworld.seed_name}_profile.json")
+        multiworld.profiler.write_report(multiworld, profile_path)
+        logging.info(f"Wrote generation profile to {profile_path}")
@@ -4,17 +4,17 @@ import argparse
 import asyncio
 import collections
 import contextlib
-import copy
 import datetime
 import functools
 import hashlib
 import inspect
 import itertools
 import logging
-import math
 import operator
+import os
 import pickle
 import random
+import struct
 import threading
 import time
 import typing
@@ -40,66 +40,44 @@ import NetUtils
 import Utils
 from Utils import version_tuple, restricted_loads, Version, async_start, get_intended_text
 from NetUtils import Endpoint, ClientStatus, NetworkItem, decode, encode, NetworkPlayer, Permission, NetworkSlot, \
-    SlotType, LocationStore
+    SlotType, LocationStore, merge_encoded
+from DataStorage import DataStorage, DataStorageError
+# modify_functions used to be defined here, keep it importable from MultiServer
+from DataStorage import modify_functions  # noqa: F401
 
 min_client_version = Version(0, 1, 6)
 colorama.init()
 
 
-def remove_from_list(container, value):
-    try:
-        container.remove(value)
-    except ValueError:
-        pass
-    return container
-
-
-def pop_from_container(container, value):
-    try:
-        container.pop(value)
-    except ValueError:
-        pass
-    return container
-
-
-def update_dict(dictionary, entries):
-    dictionary.update(entries)
-    return dictionary
-
-
-# functions callable on storable data on the server by clients
-modify_functions = {
-    # generic:
-    "replace": lambda old, new: new,
-    "default": lambda old, new: old,
-    # numeric:
-    "add": operator.add,  # add together two objects, using python's "+" operator (works on strings and lists as append)
-    "mul": operator.mul,
-    "pow": operator.pow,
-    "mod": operator.mod,
-    "floor": lambda value, _: math.floor(value),
-    "ceil": lambda value, _: math.ceil(value),
-    "max": max,
-    "min": min,
-    # bitwise:
-    "xor": operator.xor,
-    "or": operator.or_,
-    "and": operator.and_,
-    "left_shift": operator.lshift,
-    "right_shift": operator.rshift,
-    # lists/dicts:
-    "remove": remove_from_list,
-    "pop": pop_from_container,
-    "update": update_dict,
-}
-
-
 def get_saving_second(seed_name: str, interval: int = 60) -> int:
     # save at expected times so other systems using savegame can expect it
     # represents the target second of the auto_save_interval at which to save
     return int(hashlib.sha256(seed_name.encode()).hexdigest(), 16) % interval
 
 
+save_journal_frame = struct.Struct("<I")
+"""length prefix of each entry in a save journal file"""
+
+
+def encode_save_journal_entry(entry: typing.Dict[str, typing.Any]) -> bytes:
+    return zlib.compress(pickle.dumps(entry))
+
+
+def apply_save_journal(savedata: typing.Dict[str, typing.Any], entries: typing.Iterable[bytes]) \
+        -> typing.Dict[str, typing.Any]:
+    """Replays encoded entries, as created by Context.get_save_journal_entry, onto a save snapshot in order."""
+    for data in entries:
+        entry = restricted_loads(zlib.decompress(data))
+        for key, (start, items) in entry.get("received_items", {}).items():
+            # received items are journaled by index, so replaying an entry twice does no harm
+            savedata["received_items"].setdefault(key, [])[start:] = items
+        for section in ("location_checks", "hints", "stored_data"):
+            savedata[section].update(entry.get(section, {}))
+        if "state" in entry:
+            savedata.update(restricted_loads(entry["state"]))
+    return savedata
+
+
 class Client(Endpoint):
     version = Version(0, 0, 0)
     tags: typing.List[str] = []
@@ -143,6 +121,19 @@ class Client(Endpoint):
 team_slot = typing.Tuple[int, int]
 
 
+class OutboxStats(typing.NamedTuple):
+    """What the last flush of Context.outbox sent."""
+    endpoints: int
+    messages: int
+    """encoded lists of messages queued"""
+    longest_queue: int
+    """most encoded lists of messages queued for one endpoint"""
+    frames: int
+    """distinct frames built, endpoints with the same queued messages share one"""
+    bytes: int
+    """sent to all endpoints together"""
+
+
 class Context:
     dumper = staticmethod(encode)
     loader = staticmethod(decode)
@@ -159,34 +150,36 @@ class Context:
     # team -> slot id -> list of clients authenticated to slot.
     clients: typing.Dict[int, typing.Dict[int, typing.List[Client]]]
     locations: LocationStore  # typing.Dict[int, typing.Dict[int, typing.Tuple[int, int, int]]]
-    location_checks: typing.Dict[typing.Tuple[int, int], typing.Set[int]]
+    location_checks: typing.Dict[typing.Tuple[int, int], NetUtils.LocationChecks]
     hints_used: typing.Dict[typing.Tuple[int, int], int]
     groups: typing.Dict[int, typing.Set[int]]
-    save_version = 2
-    stored_data: typing.Dict[str, object]
+    save_version = 3  # 3: location_checks are saved as bitmaps, see LocationChecks.bitmap
+    save_journal_compaction_size = 64 * 1024
+    """journal size in bytes below which it is never compacted into a new snapshot"""
+    data_storage: DataStorage
     read_data: typing.Dict[str, object]
-    stored_data_notification_clients: typing.Dict[str, typing.Set[Client]]
     slot_info: typing.Dict[int, NetworkSlot]
     generator_version = Version(0, 0, 0)
     checksums: typing.Dict[str, str]
     item_names: typing.Dict[str, typing.Dict[int, str]] = (
         collections.defaultdict(lambda: Utils.KeyedDefaultDict(lambda code: f'Unknown item (ID:{code})')))
-    item_name_groups: typing.Dict[str, typing.Dict[str, typing.Set[str]]]
+    item_name_groups: typing.Dict[str, typing.Dict[str, typing.Collection[str]]]
     location_names: typing.Dict[str, typing.Dict[int, str]] = (
         collections.defaultdict(lambda: Utils.KeyedDefaultDict(lambda code: f'Unknown location (ID:{code})')))
-    location_name_groups: typing.Dict[str, typing.Dict[str, typing.Set[str]]]
+    location_name_groups: typing.Dict[str, typing.Dict[str, typing.Collection[str]]]
     all_item_and_group_names: typing.Dict[str, typing.Set[str]]
     all_location_and_group_names: typing.Dict[str, typing.Set[str]]
     non_hintable_names: typing.Dict[str, typing.AbstractSet[str]]
-    spheres: typing.List[typing.Dict[int, typing.Set[int]]]
-    """ each sphere is { player: { location_id, ... } } """
+    _spheres: typing.List[typing.Dict[int, typing.Set[int]]]
+    _spheres_loader: typing.Optional[typing.Callable[[], typing.List[typing.Dict[int, typing.Set[int]]]]] = None
     logger: logging.Logger
 
 
     def __init__(self, host: str, port: int, server_password: str, password: str, location_check_points: int,
                  hint_cost: int, item_cheat: bool, release_mode: str = "disabled", collect_mode="disabled",
                  remaining_mode: str = "disabled", auto_shutdown: typing.SupportsFloat = 0, compatibility: int = 2,
-                 log_network: bool = False, logger: logging.Logger = logging.getLogger()):
+                 log_network: bool = False, logger: logging.Logger = logging.getLogger(),
+                 data_storage_value_limit: int = 0, data_storage_limit: int = 0):
         self.logger = logger
         super(Context, self).__init__()
         self.slot_info = {}
@@ -209,13 +202,23 @@ class Context:
         self.server = None
         self.countdown_timer = 0
         self.received_items = {}
+        self.new_item_slots: typing.Set[team_slot] = set()
+        self.item_delivery: typing.Optional[asyncio.Handle] = None
+        # encoded messages waiting to be sent at the end of the event loop tick, see queue_encoded_msgs
+        self.outbox: typing.Dict[Endpoint, typing.List[str]] = {}
+        self.outbox_flush: typing.Optional[asyncio.Handle] = None
+        self.outbox_stats = OutboxStats(0, 0, 0, 0, 0)
         self.start_inventory = {}
         self.name_aliases: typing.Dict[team_slot, str] = {}
-        self.location_checks = collections.defaultdict(set)
+        self.location_checks = Utils.KeyedDefaultDict(
+            lambda team_slot: NetUtils.LocationChecks(self.locations.get_location_ids(team_slot[1])))
         self.hint_cost = hint_cost
         self.location_check_points = location_check_points
         self.hints_used = collections.defaultdict(int)
         self.hints: typing.Dict[team_slot, typing.Set[NetUtils.Hint]] = collections.defaultdict(set)
+        # (team, finding player, location) -> (slot, hint) for not found hints in hints[team, slot]
+        self.hint_index: typing.Dict[typing.Tuple[int, int, int], typing.Set[typing.Tuple[int, NetUtils.Hint]]] = \
+            collections.defaultdict(set)
         self.release_mode: str = release_mode
         self.remaining_mode: str = remaining_mode
         self.collect_mode: str = collect_mode
@@ -234,6 +237,14 @@ class Context:
         self.auto_save_interval = 60  # in seconds
         self.auto_saver_thread: typing.Optional[threading.Thread] = None
         self.save_dirty = False
+        # changes since the last snapshot are appended to a journal, see get_save_journal_entry
+        self.save_journal_token: typing.Optional[str] = None  # None means the next save writes a snapshot
+        self.save_journal_size = 0
+        self.save_snapshot_size = 0
+        self.journaled_item_counts: typing.Dict[typing.Tuple[int, int, bool], int] = {}
+        self.journaled_check_counts: typing.Dict[team_slot, int] = {}
+        self.journaled_state = b""
+        self.unsaved_hints: typing.Set[team_slot] = set()
         self.tags = ['AP']
         self.games: typing.Dict[int, str] = {}
         self.minimum_client_versions: typing.Dict[int, Version] = {}
@@ -241,8 +252,7 @@ class Context:
         self.groups = {}
         self.group_collected: typing.Dict[int, typing.Set[int]] = {}
         self.random = random.Random()
-        self.stored_data = {}
-        self.stored_data_notification_clients = collections.defaultdict(weakref.WeakSet)
+        self.data_storage = DataStorage(data_storage_value_limit, data_storage_limit)
         self.read_data = {}
         self.spheres = []
 
@@ -259,20 +269,17 @@ class Context:
 
     # Data package retrieval
     def _load_game_data(self):
+        # from the data packages and world index, so the worlds don't have to be imported
         import worlds
-        self.gamespackage = worlds.network_data_package["games"]
-
-        self.item_name_groups = {world_name: world.item_name_groups for world_name, world in
-                                 worlds.AutoWorldRegister.world_types.items()}
-        self.location_name_groups = {world_name: world.location_name_groups for world_name, world in
-                                     worlds.AutoWorldRegister.world_types.items()}
-        for world_name, world in worlds.AutoWorldRegister.world_types.items():
-            self.non_hintable_names[world_name] = world.hint_blacklist
-
-        for game_package in self.gamespackage.values():
-            # remove groups from data sent to clients
-            del game_package["item_name_groups"]
-            del game_package["location_name_groups"]
+        self.gamespackage = {}
+        for game_name, game_package in worlds.network_data_package["games"].items():
+            self.item_name_groups[game_name] = game_package["item_name_groups"]
+            self.location_name_groups[game_name] = game_package["location_name_groups"]
+            # groups are not part of the data sent to clients
+            self.gamespackage[game_name] = {key: value for key, value in game_package.items()
+                                            if key not in ("item_name_groups", "location_name_groups")}
+        for game_name, info in worlds.world_info.items():
+            self.non_hintable_names[game_name] = info.hint_blacklist
 
     def _init_game_data(self):
         for game_name, game_package in self.gamespackage.items():
@@ -304,25 +311,20 @@ class Context:
     async def send_msgs(self, endpoint: Endpoint, msgs: typing.Iterable[dict]) -> bool:
         if not endpoint.socket or not endpoint.socket.open:
             return False
-        msg = self.dumper(msgs)
-        try:
-            await endpoint.socket.send(msg)
-        except websockets.ConnectionClosed:
-            self.logger.exception(f"Exception during send_msgs, could not send {msg}")
-            await self.disconnect(endpoint)
-            return False
-        else:
-            if self.log_network:
-                self.logger.info(f"Outgoing message: {msg}")
-            return True
+        return await self.send_encoded_msgs(endpoint, self.dumper(msgs))
 
     async def send_encoded_msgs(self, endpoint: Endpoint, msg: str) -> bool:
         if not endpoint.socket or not endpoint.socket.open:
             return False
+        queued = self.outbox.pop(endpoint, None)
+        if queued:
+            # send messages queued for this endpoint first, so they don't arrive after this one
+            queued.append(msg)
+            msg = merge_encoded(queued)
         try:
             await endpoint.socket.send(msg)
         except websockets.ConnectionClosed:
-            self.logger.exception("Exception during send_encoded_msgs")
+            self.logger.exception(f"Exception during send_encoded_msgs, could not send {msg}")
             await self.disconnect(endpoint)
             return False
         else:
@@ -331,6 +333,10 @@ class Context:
             return True
 
     async def broadcast_send_encoded_msgs(self, endpoints: typing.Iterable[Endpoint], msg: str) -> bool:
+        return self.send_frame(endpoints, msg)
+
+    def send_frame(self, endpoints: typing.Iterable[Endpoint], msg: str) -> bool:
+        """Send an encoded list of messages to endpoints right away, without waiting for them to receive it."""
         sockets = []
         for endpoint in endpoints:
             if endpoint.socket and endpoint.socket.open:
@@ -338,17 +344,68 @@ class Context:
         try:
             websockets.broadcast(sockets, msg)
         except RuntimeError:
-            self.logger.exception("Exception during broadcast_send_encoded_msgs")
+            self.logger.exception("Exception during send_frame")
             return False
         else:
             if self.log_network:
                 self.logger.info(f"Outgoing broadcast: {msg}")
             return True
 
+    def queue_encoded_msgs(self, endpoints: typing.Iterable[Endpoint], msg: str):
+        """
+        Queue an encoded list of messages for endpoints.
+        All messages queued for an endpoint during an event loop tick are sent together in one frame.
+        """
+        outbox = self.outbox
+        for endpoint in endpoints:
+            if endpoint.socket and endpoint.socket.open:
+                queued = outbox.get(endpoint)
+                if queued is None:
+                    outbox[endpoint] = [msg]
+                else:
+                    queued.append(msg)
+        if outbox and not self.outbox_flush:
+            try:
+                loop = asyncio.get_running_loop()
+            except RuntimeError:
+                self.flush_outbox()
+            else:
+                self.outbox_flush = loop.call_soon(self.flush_outbox)
+
+    def flush_outbox(self):
+        """Send the messages queued by queue_encoded_msgs, one frame per endpoint."""
+        if self.item_delivery:
+            # received items of this tick go into the same frames,
+            # queueing them doesn't schedule another flush as long as outbox_flush is still set
+            self.item_delivery.cancel()
+            deliver_new_items(self)
+        self.outbox_flush = None
+        outbox, self.outbox = self.outbox, {}
+        if not outbox:
+            return
+        # endpoints with the same queued messages, like all clients of a team after broadcast_team, share a frame
+        frames: typing.Dict[typing.Tuple[int, ...], typing.Tuple[typing.List[str], typing.List[Endpoint]]] = {}
+        for endpoint, queued in outbox.items():
+            key = tuple(map(id, queued))  # queued strings are kept alive by outbox until frames are sent
+            if key in frames:
+                frames[key][1].append(endpoint)
+            else:
+                frames[key] = (queued, [endpoint])
+
+        sent_bytes = 0
+        for queued, endpoints in frames.values():
+            frame = merge_encoded(queued)
+            self.send_frame(endpoints, frame)
+            sent_bytes += (len(frame) if frame.isascii() else len(frame.encode())) * len(endpoints)
+        self.outbox_stats = OutboxStats(len(outbox), sum(map(len, outbox.values())),
+                                        max(map(len, outbox.values()), default=0), len(frames), sent_bytes)
+        if self.log_network:
+            self.logger.info(f"Outgoing batch: {self.outbox_stats}")
+
     def broadcast_all(self, msgs: typing.List[dict]):
         msgs = self.dumper(msgs)
         endpoints = (endpoint for endpoint in self.endpoints if endpoint.auth)
-        async_start(self.broadcast_send_encoded_msgs(endpoints, msgs))
+        self.queue_encoded_msgs(endpoints, msgs)
 
     def broadcast_text_all(self, text: str, additional_arguments: dict = {}):
         self.logger.info("Notice (all): %s" % text)
@@ -357,13 +414,14 @@ class Context:
     def broadcast_team(self, team: int, msgs: typing.List[dict]):
         msgs = self.dumper(msgs)
         endpoints = (endpoint for endpoint in itertools.chain.from_iterable(self.clients[team].values()))
-        async_start(self.broadcast_send_encoded_msgs(endpoints, msgs))
+        self.queue_encoded_msgs(endpoints, msgs)
 
     def broadcast(self, endpoints: typing.Iterable[Client], msgs: typing.List[dict]):
         msgs = self.dumper(msgs)
-        async_start(self.broadcast_send_encoded_msgs(endpoints, msgs))
+        self.queue_encoded_msgs(endpoints, msgs)
 
     async def disconnect(self, endpoint: Client):
+        self.outbox.pop(endpoint, None)
         if endpoint in self.endpoints:
             self.endpoints.remove(endpoint)
         if endpoint.slot and endpoint in self.clients[endpoint.team][endpoint.slot]:
@@ -374,14 +432,14 @@ class Context:
         if not client.auth:
             return
         self.logger.info("Notice (Player %s in team %d): %s" % (client.name, client.team + 1, text))
-        async_start(self.send_msgs(client, [{"cmd": "PrintJSON", "data": [{ "text": text }], **additional_arguments}]))
+        self.queue_encoded_msgs((client,), self.dumper([{"cmd": "PrintJSON", "data": [{ "text": text }],
+                                                          **additional_arguments}]))
 
     def notify_client_multiple(self, client: Client, texts: typing.List[str], additional_arguments: dict = {}):
         if not client.auth:
             return
-        async_start(self.send_msgs(client,
-                                   [{"cmd": "PrintJSON", "data": [{ "text": text }], **additional_arguments}
-                                    for text in texts]))
+        self.queue_encoded_msgs((client,), self.dumper([{"cmd": "PrintJSON", "data": [{ "text": text }],
+                                                          **additional_arguments} for text in texts]))
 
     # loading
     def load(self, multidatapath: str, use_embedded_server_options: bool = False):
@@ -402,10 +460,12 @@ class Context:
         self.data_filename = multidatapath
 
     @staticmethod
-    def decompress(data: bytes) -> dict:
+    def decompress(data: bytes) -> typing.MutableMapping[str, typing.Any]:
         format_version = data[0]
-        if format_version > 3:
+        if format_version > NetUtils.multidata_format_version:
             raise Utils.VersionException("Incompatible multidata.")
+        if format_version >= 4:
+            return NetUtils.Multidata(data)
         return restricted_loads(zlib.decompress(data[1:]))
 
     def _load(self, decoded_obj: dict, game_data_packages: typing.Dict[str, typing.Any],
@@ -457,6 +517,8 @@ class Context:
 
         for slot, hints in decoded_obj["precollected_hints"].items():
             self.hints[0, slot].update(hints)
+            for hint in hints:
+                self.index_hint(0, slot, hint)
 
         # declare slots that aren't players as done
         for slot, slot_info in self.slot_info.items():
@@ -480,13 +542,16 @@ class Context:
                 del data["location_name_groups"]
             del data["item_name_groups"]  # remove from data package, but keep in self.item_name_groups
         self._init_game_data()
-        for game_name, data in self.item_name_groups.items():
+        for game_name in self.item_name_groups:
             self.read_data[f"item_name_groups_{game_name}"] = lambda lgame=game_name: self.item_name_groups[lgame]
-        for game_name, data in self.location_name_groups.items():
+        for game_name in self.location_name_groups:
             self.read_data[f"location_name_groups_{game_name}"] = lambda lgame=game_name: self.location_name_groups[lgame]
 
-        # sorted access spheres
-        self.spheres = decoded_obj.get("spheres", [])
+        # sorted access spheres, only unpacked once needed
+        if isinstance(decoded_obj, NetUtils.Multidata):
+            self._spheres_loader = decoded_obj.pop_loader("spheres", [])
+        else:
+            self.spheres = decoded_obj.get("spheres", [])
 
     # saving
 
@@ -503,31 +568,97 @@ class Context:
 
     def _save(self, exit_save: bool = False) -> bool:
         try:
-            encoded_save = pickle.dumps(self.get_save())
-            with open(self.save_filename, "wb") as f:
-                f.write(zlib.compress(encoded_save))
+            self._write_save(exit_save)
         except Exception as e:
+            self.save_journal_token = None  # the journal may be missing changes now
             self.logger.exception(e)
             return False
         else:
             return True
 
+    def _write_save(self, exit_save: bool = False) -> None:
+        """Append changes to the save journal, or write a new snapshot once the journal outgrew the last one."""
+        if exit_save or self.save_journal_token is None or \
+                self.save_journal_size > max(self.save_snapshot_size, self.save_journal_compaction_size):
+            self.save_journal_token = os.urandom(8).hex()
+            self.reset_save_journal()
+            savedata = self.get_save()
+            savedata["journal"] = self.save_journal_token
+            self.save_snapshot_size = self._write_save_snapshot(savedata)
+            self.save_journal_size = 0
+        else:
+            entry = self.get_save_journal_entry()
+            if entry:
+                self.save_journal_size += self._write_save_journal(encode_save_journal_entry(entry))
+
+    @property
+    def save_journal_filename(self) -> str:
+        return self.save_filename + ".journal"
+
+    def _write_save_snapshot(self, savedata: typing.Dict[str, typing.Any]) -> int:
+        """Write a full save, replacing the journal. Returns the size written."""
+        data = zlib.compress(pickle.dumps(savedata))
+        temp_filename = self.save_filename + ".tmp"
+        with open(temp_filename, "wb") as f:
+            f.write(data)
+        os.replace(temp_filename, self.save_filename)
+        token = self.save_journal_token.encode()
+        with open(self.save_journal_filename, "wb") as f:
+            f.write(save_journal_frame.pack(len(token)) + token)
+        return len(data)
+
+    def _write_save_journal(self, data: bytes) -> int:
+        """Append an encoded journal entry. Returns the size written."""
+        with open(self.save_journal_filename, "ab") as f:
+            f.write(save_journal_frame.pack(len(data)) + data)
+        return save_journal_frame.size + len(data)
+
+    def _read_save(self) -> typing.Dict[str, typing.Any]:
+        with open(self.save_filename, "rb") as f:
+            data = f.read()
+        savedata = restricted_loads(zlib.decompress(data))
+        self.save_snapshot_size = len(data)
+        try:
+            with open(self.save_journal_filename, "rb") as f:
+                journal = f.read()
+        except FileNotFoundError:
+            return savedata
+
+        frames: typing.List[bytes] = []
+        position = 0
+        while position + save_journal_frame.size <= len(journal):
+            size, = save_journal_frame.unpack_from(journal, position)
+            if position + save_journal_frame.size + size > len(journal):
+                break
+            position += save_journal_frame.size
+            frames.append(journal[position:position + size])
+            position += size
+        # the first frame names the snapshot the journal continues from
+        if not frames or frames[0] != savedata.get("journal", "").encode():
+            self.logger.warning("Ignoring save journal, as it does not belong to the save file.")
+            return savedata
+        apply_save_journal(savedata, frames[1:])
+        if position == len(journal):
+            self.save_journal_token = savedata["journal"]
+            self.save_journal_size = len(journal)
+        else:
+            self.logger.warning("Save journal ends in an incomplete entry, which was skipped.")
+        return savedata
+
     def init_save(self, enabled: bool = True):
         self.saving = enabled
         if self.saving:
             if not self.save_filename:
-                import os
                 name, ext = os.path.splitext(self.data_filename)
                 self.save_filename = name + '.apsave' if ext.lower() in ('.archipelago', '.zip') \
                     else self.data_filename + '_' + 'apsave'
             try:
-                with open(self.save_filename, 'rb') as f:
-                    save_data = restricted_loads(zlib.decompress(f.read()))
-                    self.set_save(save_data)
+                self.set_save(self._read_save())
             except FileNotFoundError:
                 self.logger.error('No save data found, starting a new game')
             except Exception as e:
                 self.logger.exception(e)
+            self.reset_save_journal()
             self._start_async_saving()
 
     def _start_async_saving(self, atexit_save: bool = True):
@@ -559,14 +690,21 @@ class Context:
                 atexit.register(self._save, True)  # make sure we save on exit too
 
     def get_save(self) -> dict:
-        self.recheck_hints()
-        d = {
+        d = self.get_save_state()
+        d.update({
+            "received_items": self.received_items,
+            "hints": dict(self.hints),
+            "location_checks": {key: checks.bitmap for key, checks in list(self.location_checks.items())},
+            "stored_data": self.data_storage.values,
+        })
+        return d
+
+    def get_save_state(self) -> dict:
+        """Part of the save that is journaled as a whole whenever it changes."""
+        return {
             "version": self.save_version,
             "connect_names": self.connect_names,
-            "received_items": self.received_items,
             "hints_used": dict(self.hints_used),
-            "hints": dict(self.hints),
-            "location_checks": dict(self.location_checks),
             "name_aliases": self.name_aliases,
             "client_game_state": dict(self.client_game_state),
             "client_activity_timers": tuple(
@@ -575,16 +713,54 @@ class Context:
                 (key, value.timestamp()) for key, value in self.client_connection_timers.items()),
             "random_state": self.random.getstate(),
             "group_collected": dict(self.group_collected),
-            "stored_data": self.stored_data,
             "game_options": {"hint_cost": self.hint_cost, "location_check_points": self.location_check_points,
                              "server_password": self.server_password, "password": self.password,
                              "release_mode": self.release_mode,
                              "remaining_mode": self.remaining_mode, "collect_mode": self.collect_mode,
                              "item_cheat": self.item_cheat, "compatibility": self.compatibility}
-
         }
 
-        return d
+    def get_save_journal_entry(self) -> typing.Dict[str, typing.Any]:
+        """
+        Collects changes since the last snapshot or journal entry, empty if there are none.
+        Runs on the auto save thread, so change marks are cleared before reading what they mark.
+        """
+        entry: typing.Dict[str, typing.Any] = {}
+        received_items = {}
+        for key, items in list(self.received_items.items()):
+            start, end = self.journaled_item_counts.get(key, 0), len(items)
+            if end > start:
+                received_items[key] = start, items[start:end]
+                self.journaled_item_counts[key] = end
+        if received_items:
+            entry["received_items"] = received_items
+        location_checks = {}
+        for key, checks in list(self.location_checks.items()):
+            count = len(checks)
+            if count != self.journaled_check_counts.get(key, 0):
+                location_checks[key] = checks.bitmap
+                self.journaled_check_counts[key] = count
+        if location_checks:
+            entry["location_checks"] = location_checks
+        hint_keys = list(self.unsaved_hints)
+        if hint_keys:
+            self.unsaved_hints.difference_update(hint_keys)
+            entry["hints"] = {key: set(self.hints[key]) for key in hint_keys}
+        stored_data = self.data_storage.take_dirty()
+        if stored_data:
+            entry["stored_data"] = stored_data
+        state = pickle.dumps(self.get_save_state())
+        if state != self.journaled_state:
+            entry["state"] = self.journaled_state = state
+        return entry
+
+    def reset_save_journal(self):
+        """Mark the current state as saved, so following journal entries only contain later changes."""
+        self.unsaved_hints.clear()
+        self.data_storage.dirty.clear()
+        self.journaled_item_counts = {key: len(items) for key, items in list(self.received_items.items())}
+        self.journaled_check_counts = {key: len(checks) for key, checks in list(self.location_checks.items())}
+        self.journaled_state = b""
 
     def set_save(self, savedata: dict):
         if self.connect_names != savedata["connect_names"]:
@@ -603,7 +779,13 @@ class Context:
         self.client_activity_timers.update(
             {tuple(key): datetime.datetime.fromtimestamp(value, datetime.timezone.utc) for key, value
              in savedata["client_activity_timers"]})
-        self.location_checks.update(savedata["location_checks"])
+        for key, checks in savedata["location_checks"].items():
+            location_ids = self.locations.get_location_ids(key[1])
+            if isinstance(checks, int):
+                self.location_checks[key] = NetUtils.LocationChecks(location_ids, checks)
+            else:  # save version 2 kept sets
+                self.location_checks[key] = location_checks = NetUtils.LocationChecks(location_ids)
+                location_checks |= set(checks).intersection(location_ids)
         self.random.setstate(savedata["random_state"])
 
         if "game_options" in savedata:
@@ -621,7 +803,8 @@ class Context:
             self.group_collected = savedata["group_collected"]
 
         if "stored_data" in savedata:
-            self.stored_data = savedata["stored_data"]
+            self.data_storage.load(savedata["stored_data"])
+        self.recheck_hints()  # index loaded hints
         # count items and slots from lists for items_handling = remote
         self.logger.info(
             f'Loaded save file with {sum([len(v) for k, v in self.received_items.items() if k[2]])} received items '
@@ -641,11 +824,44 @@ class Context:
                     hint.re_check(self, hint_team) for hint in
                     self.hints[hint_team, hint_slot]
                 }
+                for hint in self.hints[hint_team, hint_slot]:
+                    self.index_hint(hint_team, hint_slot, hint)
+
+    def index_hint(self, team: int, slot: int, hint: NetUtils.Hint):
+        """Remember a hint in hints[team, slot], so that checking its location marks it found."""
+        if not hint.found:
+            self.hint_index[team, hint.finding_player, hint.location].add((slot, hint))
+
+    def update_found_hints(self, team: int, finding_player: int, locations: typing.Iterable[int]) -> typing.Set[int]:
+        """Mark hints for newly checked locations as found. Returns the slots whose hints changed."""
+        changed_slots: typing.Set[int] = set()
+        for location in locations:
+            for slot, hint in self.hint_index.pop((team, finding_player, location), ()):
+                hints = self.hints[team, slot]
+                # hints compare with their found state, so this fails if the hint was rechecked since indexing
+                if hint in hints:
+                    hints.remove(hint)
+                    hints.add(hint._replace(found=True))
+                    changed_slots.add(slot)
+        return changed_slots
 
     def get_rechecked_hints(self, team: int, slot: int):
         self.recheck_hints(team, slot)
         return self.hints[team, slot]
 
+    @property
+    def spheres(self) -> typing.List[typing.Dict[int, typing.Set[int]]]:
+        """ each sphere is { player: { location_id, ... } } """
+        if self._spheres_loader:
+            self._spheres = self._spheres_loader()
+            self._spheres_loader = None
+        return self._spheres
+
+    @spheres.setter
+    def spheres(self, spheres: typing.List[typing.Dict[int, typing.Set[int]]]) -> None:
+        self._spheres = spheres
+        self._spheres_loader = None
+
     def get_sphere(self, player: int, location_id: int) -> int:
         """Get sphere of a location, -1 if spheres are not available."""
         if self.spheres:
@@ -699,7 +915,8 @@ class Context:
         new_hint_events: typing.Set[int] = set()
         concerns = collections.defaultdict(list)
         for hint in sorted(hints, key=operator.attrgetter('found'), reverse=True):
-            data = (hint, hint.as_network_message())
+            # encoded once, as all clients concerned get the same message
+            data = (hint, self.dumper([hint.as_network_message()]))
             for player in self.slot_set(hint.receiving_player):
                 concerns[player].append(data)
             if not hint.local and data not in concerns[hint.finding_player]:
@@ -710,9 +927,11 @@ class Context:
                 # we can check once if hint already exists
                 if hint not in self.hints[team, hint.finding_player]:
                     self.hints[team, hint.finding_player].add(hint)
+                    self.index_hint(team, hint.finding_player, hint)
                     new_hint_events.add(hint.finding_player)
                     for player in self.slot_set(hint.receiving_player):
                         self.hints[team, player].add(hint)
+                        self.index_hint(team, player, hint)
                         new_hint_events.add(player)
 
             self.logger.info("Notice (Team #%d): %s" % (team + 1, format_hint(self, team, hint)))
@@ -723,9 +942,8 @@ class Context:
                 clients = self.clients[team].get(slot)
                 if not clients:
                     continue
-                client_hints = [datum[1] for datum in sorted(hint_data, key=lambda x: x[0].finding_player != slot)]
-                for client in clients:
-                    async_start(self.send_msgs(client, client_hints))
+                for datum in sorted(hint_data, key=lambda x: x[0].finding_player != slot):
+                    self.queue_encoded_msgs(clients, datum[1])
 
     # "events"
 
@@ -747,14 +965,15 @@ class Context:
         }])
 
     def on_changed_hints(self, team: int, slot: int):
+        self.unsaved_hints.add((team, slot))
         key: str = f"_read_hints_{team}_{slot}"
-        targets: typing.Set[Client] = set(self.stored_data_notification_clients[key])
+        targets: typing.Set[Client] = self.data_storage.get_subscribers(key)
         if targets:
             self.broadcast(targets, [{"cmd": "SetReply", "key": key, "value": self.hints[team, slot]}])
 
     def on_client_status_change(self, team: int, slot: int):
         key: str = f"_read_client_status_{team}_{slot}"
-        targets: typing.Set[Client] = set(self.stored_data_notification_clients[key])
+        targets: typing.Set[Client] = self.data_storage.get_subscribers(key)
         if targets:
             self.broadcast(targets, [{"cmd": "SetReply", "key": key, "value": self.client_game_state[team, slot]}])
 
@@ -763,9 +982,7 @@ def update_aliases(ctx: Context, team: int):
     cmd = ctx.dumper([{"cmd": "RoomUpdate",
                        "players": ctx.get_players_package()}])
 
-    for clients in ctx.clients[team].values():
-        for client in clients:
-            async_start(ctx.send_encoded_msgs(client, cmd))
+    ctx.queue_encoded_msgs(itertools.chain.from_iterable(ctx.clients[team].values()), cmd)
 
 
 async def server(websocket, path: str = "/", ctx: Context = None):
@@ -813,8 +1030,7 @@ async def on_client_connected(ctx: Context, client: Client):
         'permissions': get_permissions(ctx),
         'hint_cost': ctx.hint_cost,
         'location_check_points': ctx.location_check_points,
-        'datapackage_checksums': {game: game_data["checksum"] for game, game_data
-                                  in ctx.gamespackage.items() if game in games and "checksum" in game_data},
+        'datapackage_checksums': {game: checksum for game, checksum in ctx.checksums.items() if game in games},
         'seed_name': ctx.seed_name,
         'time': time.time(),
     }])
@@ -940,20 +1156,39 @@ def get_start_inventory(ctx: Context, player: int, remote_start_inventory: bool)
 
 
 def send_new_items(ctx: Context):
-    for team, clients in ctx.clients.items():
-        for slot, clients in clients.items():
-            for client in clients:
-                if client.no_items:
-                    continue
-                start_inventory = get_start_inventory(ctx, slot, client.remote_start_inventory)
-                items = get_received_items(ctx, team, slot, client.remote_items)
-                if len(start_inventory) + len(items) > client.send_index:
+    """Schedule sending items to slots in ctx.new_item_slots, so all items of an event loop tick go out together."""
+    if ctx.item_delivery:
+        return
+    try:
+        loop = asyncio.get_running_loop()
+    except RuntimeError:
+        deliver_new_items(ctx)
+    else:
+        ctx.item_delivery = loop.call_soon(deliver_new_items, ctx)
+
+
+def deliver_new_items(ctx: Context):
+    ctx.item_delivery = None
+    new_item_slots, ctx.new_item_slots = ctx.new_item_slots, set()
+    for team, slot in new_item_slots:
+        # clients of a slot that are in sync get the same message
+        msgs: typing.Dict[typing.Tuple[int, bool, bool], str] = {}
+        for client in ctx.clients[team].get(slot, ()):
+            if client.no_items:
+                continue
+            start_inventory = get_start_inventory(ctx, slot, client.remote_start_inventory)
+            items = get_received_items(ctx, team, slot, client.remote_items)
+            if len(start_inventory) + len(items) > client.send_index:
+                key = client.send_index, client.remote_items, client.remote_start_inventory
+                msg = msgs.get(key)
+                if msg is None:
                     first_new_item = max(0, client.send_index - len(start_inventory))
-                    async_start(ctx.send_msgs(client, [{
+                    msg = msgs[key] = ctx.dumper([{
                         "cmd": "ReceivedItems",
                         "index": client.send_index,
-                        "items": start_inventory[client.send_index:] + items[first_new_item:]}]))
-                    client.send_index = len(start_inventory) + len(items)
+                        "items": start_inventory[client.send_index:] + items[first_new_item:]}])
+                ctx.queue_encoded_msgs((client,), msg)
+                client.send_index = len(start_inventory) + len(items)
 
 
 def update_checked_locations(ctx: Context, team: int, slot: int):
@@ -1001,6 +1236,7 @@ def send_items_to(ctx: Context, team: int, target_slot: int, *items: NetworkItem
             if item.player != target_slot:
                 get_received_items(ctx, team, target, False).append(item)
             get_received_items(ctx, team, target, True).append(item)
+        ctx.new_item_slots.add((team, target))
 
 
 def register_location_checks(ctx: Context, team: int, slot: int, locations: typing.Iterable[int],
@@ -1028,10 +1264,8 @@ def register_location_checks(ctx: Context, team: int, slot: int, locations: typi
             "hint_points": get_slot_points(ctx, team, slot),
             "checked_locations": new_locations,  # send back new checks only
         }])
-        old_hints = ctx.hints[team, slot].copy()
-        ctx.recheck_hints(team, slot)
-        if old_hints != ctx.hints[team, slot]:
-            ctx.on_changed_hints(team, slot)
+        for hint_slot in ctx.update_found_hints(team, slot, new_locations):
+            ctx.on_changed_hints(team, hint_slot)
         ctx.save()
 
 
@@ -1388,7 +1622,8 @@ class ClientMessageProcessor(CommonCommandProcessor):
             if filter_text:
                 location_groups = self.ctx.location_name_groups[self.ctx.games[self.client.slot]]
                 if filter_text in location_groups:  # location group name
-                    names = [name for name in names if name in location_groups[filter_text]]
+                    group = frozenset(location_groups[filter_text])
+                    names = [name for name in names if name in group]
                 else:
                     names = [name for name in names if filter_text in name]
             texts = [f'Missing: {name}' for name in names]
@@ -1414,7 +1649,8 @@ class ClientMessageProcessor(CommonCommandProcessor):
             if filter_text:
                 location_groups = self.ctx.location_name_groups[self.ctx.games[self.client.slot]]
                 if filter_text in location_groups:  # location group name
-                    names = [name for name in names if name in location_groups[filter_text]]
+                    group = frozenset(location_groups[filter_text])
+                    names = [name for name in names if name in group]
                 else:
                     names = [name for name in names if filter_text in name]
             texts = [f'Checked: {name}' for name in names]
@@ -1458,6 +1694,7 @@ class ClientMessageProcessor(CommonCommandProcessor):
                 new_item = NetworkItem(names[item_name], -1, self.client.slot)
                 get_received_items(self.ctx, self.client.team, self.client.slot, False).append(new_item)
                 get_received_items(self.ctx, self.client.team, self.client.slot, True).append(new_item)
+                self.ctx.new_item_slots.add((self.client.team, self.client.slot))
                 self.ctx.broadcast_text_all(
                     'Cheat console: sending "' + item_name + '" to ' + self.ctx.get_aliased_name(self.client.team,
                                                                                                  self.client.slot),
@@ -1722,8 +1959,7 @@ async def process_client_cmd(ctx: Context, client: Client, args: dict):
     elif cmd == "GetDataPackage":
         exclusions = args.get("exclusions", [])
         if "games" in args:
-            games = {name: game_data for name, game_data in ctx.gamespackage.items()
-                     if name in set(args.get("games", []))}
+            games = {name: ctx.gamespackage[name] for name in set(args.get("games", [])) if name in ctx.gamespackage}
             await ctx.send_msgs(client, [{"cmd": "DataPackage",
                                           "data": {"games": games}}])
         # TODO: remove exclusions behaviour around 0.5.0
@@ -1738,7 +1974,7 @@ async def process_client_cmd(ctx: Context, client: Client, args: dict):
 
         else:
             await ctx.send_msgs(client, [{"cmd": "DataPackage",
-                                          "data": {"games": ctx.gamespackage}}])
+                                          "data": {"games": dict(ctx.gamespackage)}}])
 
     elif client.auth:
         if cmd == "ConnectUpdate":
@@ -1843,25 +2079,26 @@ async def process_client_cmd(ctx: Context, client: Client, args: dict):
             keys = args["keys"]
             args["keys"] = {
                 key: ctx.read_data.get(key[6:], lambda: None)() if key.startswith("_read_") else
-                     ctx.stored_data.get(key, None)
+                     ctx.data_storage.get(key)
                 for key in keys
             }
             await ctx.send_msgs(client, [args])
 
         elif cmd == "Set":
-            if "key" not in args or args["key"].startswith("_read_") or \
+            if not isinstance(args.get("key"), str) or args["key"].startswith("_read_") or \
                     "operations" not in args or not type(args["operations"]) == list:
                 await ctx.send_msgs(client, [{'cmd': 'InvalidPacket', "type": "arguments",
                                               "text": 'Set', "original_cmd": cmd}])
                 return
+            try:
+                args["original_value"], args["value"] = \
+                    ctx.data_storage.set(args["key"], args.get("default", 0), args["operations"])
+            except DataStorageError as e:
+                await ctx.send_msgs(client, [{'cmd': 'InvalidPacket', "type": "arguments",
+                                              "text": f"Set: {e}", "original_cmd": cmd}])
+                return
             args["cmd"] = "SetReply"
-            value = ctx.stored_data.get(args["key"], args.get("default", 0))
-            args["original_value"] = copy.copy(value)
-            for operation in args["operations"]:
-                func = modify_functions[operation["operation"]]
-                value = func(value, operation["value"])
-            ctx.stored_data[args["key"]] = args["value"] = value
-            targets = set(ctx.stored_data_notification_clients[args["key"]])
+            targets = ctx.data_storage.get_subscribers(args["key"])
             if args.get("want_reply", True):
                 targets.add(client)
             if targets:
@@ -1874,7 +2111,8 @@ async def process_client_cmd(ctx: Context, client: Client, args: dict):
                                               "text": 'SetNotify', "original_cmd": cmd}])
                 return
             for key in args["keys"]:
-                ctx.stored_data_notification_clients[key].add(client)
+                if isinstance(key, str):
+                    ctx.data_storage.subscribe(client, key)
 
 
 def update_client_status(ctx: Context, client: Client, new_status: ClientStatus):
@@ -2200,11 +2438,11 @@ class ServerCommandProcessor(CommonCommandProcessor):
         """Debug Tool: list writable datastorage keys and approximate the size of their values with pickle."""
         total: int = 0
         texts = []
-        for key, value in self.ctx.stored_data.items():
+        for key, value in self.ctx.data_storage.values.items():
             size = len(pickle.dumps(value))
             total += size
             texts.append(f"Key: {key} | Size: {size}B")
-        texts.insert(0, f"Found {len(self.ctx.stored_data)} keys, "
+        texts.insert(0, f"Found {len(self.ctx.data_storage.values)} keys, "
                         f"approximately totaling {Utils.format_SI_prefix(total, power=1024)}B")
         self.output("\n".join(texts))
 
@@ -2284,6 +2522,10 @@ def parse_args() -> argparse.Namespace:
     #0 -> recommended for tournaments to force a level playing field, only allow an exact version match
     """)
     parser.add_argument('--log_network', default=defaults["log_network"], action="store_true")
+    parser.add_argument('--data_storage_value_limit', default=defaults["data_storage_value_limit"], type=int,
+                        help="largest size in bytes of a data storage key and its value, 0 for no limit")
+    parser.add_argument('--data_storage_limit', default=defaults["data_storage_limit"], type=int,
+                        help="largest size in bytes of all data storage keys and values together, 0 for no limit")
     args = parser.parse_args()
     return args
 
@@ -2328,7 +2570,8 @@ async def main(args: argparse.Namespace):
     ctx = Context(args.host, args.port, args.server_password, args.password, args.location_check_points,
                   args.hint_cost, not args.disable_item_cheat, args.release_mode, args.collect_mode,
                   args.remaining_mode,
-                  args.auto_shutdown, args.compatibility, args.log_network)
+                  args.auto_shutdown, args.compatibility, args.log_network,
+                  data_storage_value_limit=args.data_storage_value_limit, data_storage_limit=args.data_storage_limit)
     data_filename = args.multidata
 
     if not data_filename:
@@ -1,8 +1,13 @@
 from __future__ import annotations
 
+import bisect
+import io
+import pickle
+import struct
 import typing
 import enum
 import warnings
+import zlib
 from json import JSONEncoder, JSONDecoder
 
 import websockets
@@ -105,6 +110,13 @@ def encode(obj: typing.Any) -> str:
     return _encode(_scan_for_TypedTuples(obj))
 
 
+def merge_encoded(msgs: typing.Sequence[str]) -> str:
+    """Merge encoded lists of messages, like a single encode of all their messages would."""
+    if len(msgs) == 1:
+        return msgs[0]
+    return "[" + ",".join(msg[1:-1] for msg in msgs if msg != "[]") + "]"
+
+
 def get_any_version(data: dict) -> Version:
     data = {key.lower(): value for key, value in data.items()}  # .NET version classes have capitalized keys
     return Version(int(data["major"]), int(data["minor"]), int(data["build"]))
@@ -347,6 +359,93 @@ class Hint(typing.NamedTuple):
         return self.receiving_player == self.finding_player
 
 
+def _bit_indices(bits: typing.Iterable[int], size: int, value: bool = True) -> typing.Iterator[int]:
+    """Indices of the bits that are set, or clear if value is False, among the first size bits of a bitmap."""
+    flip = 0 if value else 0xff
+    for byte_index, byte in enumerate(bits):
+        byte ^= flip
+        if byte:
+            start = byte_index << 3
+            for bit in range(min(8, size - start)):
+                if byte >> bit & 1:
+                    yield start + bit
+
+
+class LocationChecks(typing.MutableSet[int]):
+    """
+    Checked locations of a slot as a bitmap over the slot's location ids in ascending order, the order LocationStore
+    keeps them in. Bit i is bit i & 7 of bits[i >> 3], which LocationStore reads directly for get_checked, get_missing
+    and get_remaining. Only locations of the slot can be added.
+    """
+    __slots__ = ("locations", "bits", "_count")
+
+    locations: typing.Sequence[int]
+    """location ids of the slot in ascending order, see LocationStore.get_location_ids"""
+    bits: bytearray
+    _count: int
+
+    def __init__(self, locations: typing.Sequence[int], bitmap: int = 0) -> None:
+        if bitmap < 0 or bitmap >> len(locations):
+            raise ValueError(f"Bitmap {bitmap:#x} does not fit {len(locations)} locations")
+        self.locations = locations
+        self.bits = bytearray(bitmap.to_bytes((len(locations) + 7) // 8, "little"))
+        self._count = bin(bitmap).count("1")
+
+    @classmethod
+    def _from_iterable(cls, iterable: typing.Iterable[int]) -> typing.Set[int]:
+        # results of set operations like checks - other are plain sets
+        return set(iterable)
+
+    @property
+    def bitmap(self) -> int:
+        """The checks as one integer, bit i is set if the i-th lowest location id of the slot was checked."""
+        return int.from_bytes(self.bits, "little")
+
+    def _index(self, location: object) -> int:
+        if not isinstance(location, int):
+            return -1
+        index = bisect.bisect_left(self.locations, location)
+        if index < len(self.locations) and self.locations[index] == location:
+            return index
+        return -1
+
+    def __contains__(self, location: object) -> bool:
+        index = self._index(location)
+        return index >= 0 and bool(self.bits[index >> 3] >> (index & 7) & 1)
+
+    def __iter__(self) -> typing.Iterator[int]:
+        locations = self.locations
+        return (locations[index] for index in _bit_indices(self.bits, len(locations)))
+
+    def __len__(self) -> int:
+        return self._count
+
+    def add(self, location: int) -> None:
+        index = self._index(location)
+        if index < 0:
+            raise KeyError(f"{location} is not a location of this slot")
+        mask = 1 << (index & 7)
+        if not self.bits[index >> 3] & mask:
+            self.bits[index >> 3] |= mask
+            self._count += 1
+
+    def discard(self, location: int) -> None:
+        index = self._index(location)
+        if index >= 0:
+            mask = 1 << (index & 7)
+            if self.bits[index >> 3] & mask:
+                self.bits[index >> 3] ^= mask
+                self._count -= 1
+
+    def missing(self) -> typing.List[int]:
+        """Location ids of the slot that were not checked, in ascending order."""
+        locations = self.locations
+        return [locations[index] for index in _bit_indices(self.bits, len(locations), False)]
+
+    def __repr__(self) -> str:
+        return f"{self.__class__.__name__}({sorted(self)!r})"
+
+
 class _LocationStore(dict, typing.MutableMapping[int, typing.Dict[int, typing.Tuple[int, int, int]]]):
     def __init__(self, values: typing.MutableMapping[int, typing.Dict[int, typing.Tuple[int, int, int]]]):
         super().__init__(values)
@@ -360,49 +459,187 @@ class _LocationStore(dict, typing.MutableMapping[int, typing.Dict[int, typing.Tu
         if len(self.get(0, {})):
             raise ValueError("Invalid player id 0 for location")
 
-    def find_item(self, slots: typing.Set[int], seeked_item_id: int
-                  ) -> typing.Generator[typing.Tuple[int, int, int, int, int], None, None]:
+        self._location_ids: typing.Dict[int, typing.List[int]] = {}
+        # receiver -> item -> (sender, location, item, receiver, flags), not updated if the store is modified
+        self._receivers: typing.Dict[int, typing.Dict[int, typing.List[typing.Tuple[int, int, int, int, int]]]] = {}
         for finding_player, check_data in self.items():
             for location_id, (item_id, receiving_player, item_flags) in check_data.items():
-                if receiving_player in slots and item_id == seeked_item_id:
-                    yield finding_player, location_id, item_id, receiving_player, item_flags
+                self._receivers.setdefault(receiving_player, {}).setdefault(item_id, []).append(
+                    (finding_player, location_id, item_id, receiving_player, item_flags))
+
+    def find_item(self, slots: typing.Set[int], seeked_item_id: int
+                  ) -> typing.Generator[typing.Tuple[int, int, int, int, int], None, None]:
+        for slot in slots:
+            yield from self._receivers.get(slot, {}).get(seeked_item_id, ())
 
     def get_for_player(self, slot: int) -> typing.Dict[int, typing.Set[int]]:
         import collections
         all_locations: typing.Dict[int, typing.Set[int]] = collections.defaultdict(set)
-        for source_slot, location_data in self.items():
-            for location_id, values in location_data.items():
-                if values[1] == slot:
-                    all_locations[source_slot].add(location_id)
+        for entries in self._receivers.get(slot, {}).values():
+            for source_slot, location_id, *_ in entries:
+                all_locations[source_slot].add(location_id)
         return all_locations
 
-    def get_checked(self, state: typing.Dict[typing.Tuple[int, int], typing.Set[int]], team: int, slot: int
+    def get_location_ids(self, slot: int) -> typing.Sequence[int]:
+        """Location ids of a slot in ascending order, what the slot's LocationChecks are aligned to."""
+        if slot not in self._location_ids:
+            self._location_ids[slot] = sorted(self.get(slot, ()))
+        return self._location_ids[slot]
+
+    def get_checked(self, state: typing.Dict[typing.Tuple[int, int], LocationChecks], team: int, slot: int
                     ) -> typing.List[int]:
-        checked = state[team, slot]
-        if not checked:
-            # This optimizes the case where everyone connects to a fresh game at the same time.
-            return []
-        return [location_id for
-                location_id in self[slot] if
-                location_id in checked]
-
-    def get_missing(self, state: typing.Dict[typing.Tuple[int, int], typing.Set[int]], team: int, slot: int
+        return list(state[team, slot])
+
+    def get_missing(self, state: typing.Dict[typing.Tuple[int, int], LocationChecks], team: int, slot: int
                     ) -> typing.List[int]:
-        checked = state[team, slot]
-        if not checked:
-            # This optimizes the case where everyone connects to a fresh game at the same time.
-            return list(self[slot])
-        return [location_id for
-                location_id in self[slot] if
-                location_id not in checked]
-
-    def get_remaining(self, state: typing.Dict[typing.Tuple[int, int], typing.Set[int]], team: int, slot: int
+        return state[team, slot].missing()
+
+    def get_remaining(self, state: typing.Dict[typing.Tuple[int, int], LocationChecks], team: int, slot: int
                       ) -> typing.List[int]:
-        checked = state[team, slot]
         player_locations = self[slot]
         return sorted([player_locations[location_id][0] for
-                       location_id in player_locations if
-                       location_id not in checked])
+                       location_id in state[team, slot].missing()])
+
+multidata_format_version = 4
+"""First byte of a .archipelago file. Version 4 stores each top-level key of the multidata as its own zlib-compressed
+pickle section, so it can be written and read without building the whole pickle in memory."""
+_section_header = struct.Struct("<HQ")  # length of name, length of compressed section
+
+
+class _CompressingWriter:
+    """File-like object that zlib-compresses everything pickle writes to it into file."""
+
+    def __init__(self, file: typing.BinaryIO, level: int) -> None:
+        self.file = file
+        self.compressor = zlib.compressobj(level)
+
+    def write(self, data: bytes) -> int:
+        self.file.write(self.compressor.compress(data))
+        return len(data)
+
+    def flush(self) -> None:
+        self.file.write(self.compressor.flush())
+
+
+class _DecompressingReader(io.RawIOBase):
+    """Raw stream decompressing a zlib-compressed buffer in chunks, so the unpickler never sees the whole data."""
+    chunk_size = 1 << 16
+
+    def __init__(self, data: memoryview) -> None:
+        self.data = data
+        self.position = 0
+        self.decompressor = zlib.decompressobj()
+        self.buffer = b""
+
+    def readable(self) -> bool:
+        return True
+
+    def readinto(self, b: typing.Any) -> int:
+        while not self.buffer and not self.decompressor.eof:
+            if self.decompressor.unconsumed_tail:
+                chunk = self.decompressor.unconsumed_tail
+            else:
+                if self.position >= len(self.data):
+                    raise EOFError("Multidata section ended early.")
+                chunk = self.data[self.position:self.position + self.chunk_size]
+                self.position += len(chunk)
+            self.buffer = self.decompressor.decompress(chunk, len(b))
+        size = min(len(b), len(self.buffer))
+        b[:size] = self.buffer[:size]
+        self.buffer = self.buffer[size:]
+        return size
+
+
+def write_multidata(multidata: typing.Mapping[str, typing.Any], file: typing.BinaryIO, level: int = 9) -> None:
+    """
+    Writes multidata in the current .archipelago format to a seekable binary file.
+    Sections of a loaded Multidata that were never accessed are copied over without unpacking them.
+    """
+    raw_sections = multidata._sections if isinstance(multidata, Multidata) else {}
+    file.write(bytes([multidata_format_version]))
+    for key in multidata:
+        name = key.encode("utf-8")
+        header_position = file.tell()
+        file.write(_section_header.pack(len(name), 0))
+        file.write(name)
+        start = file.tell()
+        if key in raw_sections:
+            file.write(raw_sections[key])
+        else:
+            writer = _CompressingWriter(file, level)
+            pickle.dump(multidata[key], writer)
+            writer.flush()
+        end = file.tell()
+        file.seek(header_position)
+        file.write(_section_header.pack(len(name), end - start))
+        file.seek(end)
+
+
+def dump_multidata(multidata: typing.Mapping[str, typing.Any], level: int = 9) -> bytes:
+    """Returns multidata in the current .archipelago format."""
+    buffer = io.BytesIO()
+    write_multidata(multidata, buffer, level)
+    return buffer.getvalue()
+
+
+def _load_section(section: typing.Union[bytes, memoryview]) -> typing.Any:
+    from Utils import RestrictedUnpickler
+    return RestrictedUnpickler(io.BufferedReader(_DecompressingReader(section))).load()
+
+
+class Multidata(typing.MutableMapping[str, typing.Any]):
+    """
+    Multidata read from a .archipelago file of format version 4 or newer.
+    Sections only get decompressed and unpickled on first access, unused ones stay compressed.
+    """
+    _sections: typing.Dict[str, memoryview]
+    _loaded: typing.Dict[str, typing.Any]
+
+    def __init__(self, data: bytes) -> None:
+        self._sections = {}
+        self._loaded = {}
+        view = memoryview(data)
+        position = 1
+        while position < len(view):
+            name_length, section_length = _section_header.unpack_from(view, position)
+            position += _section_header.size
+            name = bytes(view[position:position + name_length]).decode("utf-8")
+            position += name_length
+            self._sections[name] = view[position:position + section_length]
+            position += section_length
+
+    def __getitem__(self, key: str) -> typing.Any:
+        if key not in self._loaded:
+            self._loaded[key] = _load_section(self._sections.pop(key))
+        return self._loaded[key]
+
+    def pop_loader(self, key: str, default: typing.Any = None) -> typing.Callable[[], typing.Any]:
+        """
+        Removes a section and returns a function that loads it, so it can be unpickled later without keeping the rest
+        of the multidata alive. Only a copy of the compressed section is kept until then.
+        """
+        if key in self._sections:
+            section = bytes(self._sections.pop(key))
+            return lambda: _load_section(section)
+        value = self._loaded.pop(key, default)
+        return lambda: value
+
+    def __setitem__(self, key: str, value: typing.Any) -> None:
+        self._sections.pop(key, None)
+        self._loaded[key] = value
+
+    def __delitem__(self, key: str) -> None:
+        if self._sections.pop(key, None) is None:
+            del self._loaded[key]
+
+    def __iter__(self) -> typing.Iterator[str]:
+        return iter([*self._loaded, *self._sections])
+
+    def __len__(self) -> int:
+        return len(self._loaded) + len(self._sections)
+
+    def __contains__(self, key: object) -> bool:
+        return key in self._loaded or key in self._sections
 
 
 if typing.TYPE_CHECKING:  # type-check with pure python implementation until we have a typing stub
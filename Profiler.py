@@ -0,0 +1,115 @@
+from __future__ import annotations
+
+import collections
+import json
+import time
+import typing
+
+if typing.TYPE_CHECKING:
+    from BaseClasses import CollectionState, Entrance, Location, MultiWorld
+
+
+class _RuleStats:
+    __slots__ = ("calls", "seconds", "depth")
+
+    def __init__(self) -> None:
+        self.calls = 0
+        self.seconds = 0.0
+        self.depth = 0
+
+
+class _TimedRule:
+    """Wraps an access rule to count its calls and time spent in it."""
+    __slots__ = ("rule", "stats")
+
+    def __init__(self, rule: typing.Callable[[CollectionState], bool], stats: _RuleStats) -> None:
+        self.rule = rule
+        self.stats = stats
+
+    def __call__(self, state: CollectionState) -> bool:
+        stats = self.stats
+        if stats.depth:
+            # rule got wrapped again after being combined with another rule, only count the outermost call
+            return self.rule(state)
+        stats.depth += 1
+        start = time.perf_counter()
+        try:
+            return self.rule(state)
+        finally:
+            stats.seconds += time.perf_counter() - start
+            stats.calls += 1
+            stats.depth -= 1
+
+
+class GenerationProfiler:
+    """
+    Collects where generation spends its time: every world method and stage method called through AutoWorld,
+    calls to and time in each access rule, and counts of expensive CollectionState operations.
+    Enabled by setting it as MultiWorld.profiler, see Generate's --profile.
+    """
+    stages: typing.Dict[str, typing.Dict[typing.Union[int, str], float]]
+    """method name -> player, or game for stage methods -> seconds"""
+    counters: typing.Counter[str]
+    rules: typing.Dict[typing.Tuple[str, int, str], _RuleStats]
+    """(kind, player, name) -> stats"""
+
+    def __init__(self) -> None:
+        self.start = time.perf_counter()
+        self.stages = collections.defaultdict(lambda: collections.defaultdict(float))
+        self.counters = collections.Counter()
+        self.rules = {}
+
+    def add_call(self, method: typing.Callable[..., typing.Any], seconds: float, player: typing.Optional[int]) -> None:
+        """Record a world method call, or a stage method call if there is no player."""
+        if player:
+            self.stages[method.__name__][player] += seconds
+        else:
+            self.stages[method.__name__][getattr(method.__self__, "game", method.__qualname__)] += seconds
+
+    def count(self, name: str) -> None:
+        self.counters[name] += 1
+
+    def wrap_rules(self, multiworld: MultiWorld) -> None:
+        """Wrap access rules of all locations and entrances, can be repeated to catch rules changed in between."""
+        spots: typing.Iterable[typing.Tuple[str, typing.Iterable[typing.Union[Location, Entrance]]]] = (
+            ("location", multiworld.get_locations()), ("entrance", multiworld.get_entrances()))
+        for kind, kind_spots in spots:
+            for spot in kind_spots:
+                if isinstance(spot.access_rule, _TimedRule):
+                    continue
+                key = kind, spot.player, spot.name
+                stats = self.rules.get(key)
+                if not stats:
+                    stats = self.rules[key] = _RuleStats()
+                spot.access_rule = _TimedRule(spot.access_rule, stats)
+
+    def get_report(self, multiworld: MultiWorld) -> typing.Dict[str, typing.Any]:
+        def player_info(player: int) -> typing.Dict[str, typing.Any]:
+            return {"name": multiworld.player_name[player], "game": multiworld.game[player]}
+
+        rules = [{"type": kind, "player": player, "name": name, "calls": stats.calls, "seconds": stats.seconds}
+                 for (kind, player, name), stats in self.rules.items() if stats.calls]
+        rules.sort(key=lambda rule: rule["seconds"], reverse=True)
+        rules_by_player: typing.Dict[int, typing.Dict[str, typing.Any]] = {}
+        for rule in rules:
+            player_rules = rules_by_player.setdefault(rule["player"], {**player_info(rule["player"]),
+                                                                       "calls": 0, "seconds": 0.0})
+            player_rules["calls"] += rule["calls"]
+            player_rules["seconds"] += rule["seconds"]
+
+        return {
+            "seed": multiworld.seed,
+            "seconds": time.perf_counter() - self.start,
+            "stages": {
+                stage: {str(key): ({**player_info(key), "seconds": seconds} if isinstance(key, int) else seconds)
+                        for key, seconds in times.items()}
+                for stage, times in self.stages.items()
+            },
+            "counters": dict(self.counters),
+            "rules_by_player": {str(player): data for player, data in rules_by_player.items()},
+            "rules": rules,
+        }
+
+    def write_report(self, multiworld: MultiWorld, path: str) -> None:
+        with open(path, "w") as f:
+            json.dump(self.get_report(multiworld), f, indent=2)
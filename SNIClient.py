@@ -20,6 +20,7 @@ from CommonClient import CommonContext, server_loop, ClientCommandProcessor, gui
 import Utils
 from Utils import async_start
 from MultiServer import mark_raw
+from worlds._memory_watch import MemoryChange, MemoryWatcher, notify
 if typing.TYPE_CHECKING:
     from worlds.AutoSNIClient import SNIClient
 
@@ -128,6 +129,7 @@ class SNIContext(CommonContext):
     snes_recv_queue: "asyncio.Queue[bytes]"
     snes_request_lock: asyncio.Lock
     snes_write_buffer: typing.List[typing.Tuple[int, bytes]]
+    snes_watches: MemoryWatcher
     snes_connector_lock: threading.Lock
     death_state: DeathState
     killing_player_task: "typing.Optional[asyncio.Task[None]]"
@@ -154,6 +156,7 @@ class SNIContext(CommonContext):
         self.snes_recv_queue = asyncio.Queue()
         self.snes_request_lock = asyncio.Lock()
         self.snes_write_buffer = []
+        self.snes_watches = MemoryWatcher()
         self.snes_connector_lock = threading.Lock()
         self.death_state = DeathState.alive  # for death link flop behaviour
         self.killing_player_task = None
@@ -502,6 +505,7 @@ async def snes_recv_loop(ctx: SNIContext) -> None:
         ctx.snes_state = SNESState.SNES_DISCONNECTED
         ctx.snes_recv_queue = asyncio.Queue()
         ctx.hud_message_queue = []
+        ctx.snes_watches.reset()
 
         ctx.rom = None
 
@@ -511,18 +515,19 @@ async def snes_recv_loop(ctx: SNIContext) -> None:
             ctx.snes_autoreconnect_task = asyncio.create_task(snes_autoreconnect(ctx), name="snes auto-reconnect")
 
 
-async def snes_read(ctx: SNIContext, address: int, size: int) -> typing.Optional[bytes]:
-    try:
-        await ctx.snes_request_lock.acquire()
-
-        if (
-            ctx.snes_state != SNESState.SNES_ATTACHED or
-            ctx.snes_socket is None or
-            not ctx.snes_socket.open or
-            ctx.snes_socket.closed
-        ):
-            return None
+async def _snes_read_ranges(ctx: SNIContext, ranges: typing.Sequence[typing.Tuple[int, int]]) \
+        -> typing.Optional[typing.List[bytes]]:
+    """Sends a GetAddress per range without waiting for the data in between, then splits the data that comes back.
+    The caller holds snes_request_lock."""
+    if (
+        ctx.snes_state != SNESState.SNES_ATTACHED or
+        ctx.snes_socket is None or
+        not ctx.snes_socket.open or
+        ctx.snes_socket.closed
+    ):
+        return None
 
+    for address, size in ranges:
         GetAddress_Request: SNESRequest = {
             "Opcode": "GetAddress",
             "Space": "SNES",
@@ -533,25 +538,54 @@ async def snes_read(ctx: SNIContext, address: int, size: int) -> typing.Optional
         except ConnectionClosed:
             return None
 
-        data: bytes = bytes()
-        while len(data) < size:
-            try:
-                data += await asyncio.wait_for(ctx.snes_recv_queue.get(), 5)
-            except asyncio.TimeoutError:
-                break
-
-        if len(data) != size:
-            snes_logger.error('Error reading %s, requested %d bytes, received %d' % (hex(address), size, len(data)))
-            if len(data):
-                snes_logger.error(str(data))
-                snes_logger.warning('Communication Failure with SNI')
-            if ctx.snes_socket is not None and not ctx.snes_socket.closed:
-                await ctx.snes_socket.close()
-            return None
+    size = sum(size for _, size in ranges)
+    data: bytes = bytes()
+    while len(data) < size:
+        try:
+            data += await asyncio.wait_for(ctx.snes_recv_queue.get(), 5)
+        except asyncio.TimeoutError:
+            break
 
-        return data
+    if len(data) != size:
+        snes_logger.error('Error reading %s, requested %d bytes, received %d' % (hex(ranges[0][0]), size, len(data)))
+        if len(data):
+            snes_logger.error(str(data))
+            snes_logger.warning('Communication Failure with SNI')
+        if ctx.snes_socket is not None and not ctx.snes_socket.closed:
+            await ctx.snes_socket.close()
+        return None
+
+    results: typing.List[bytes] = []
+    offset = 0
+    for _, size in ranges:
+        results.append(data[offset:offset + size])
+        offset += size
+    return results
+
+
+async def snes_read(ctx: SNIContext, address: int, size: int) -> typing.Optional[bytes]:
+    try:
+        await ctx.snes_request_lock.acquire()
+        results = await _snes_read_ranges(ctx, [(address, size)])
+        return results[0] if results else None
+    finally:
+        ctx.snes_request_lock.release()
+
+
+async def snes_read_watches(ctx: SNIContext) -> typing.List[MemoryChange]:
+    """Reads the ranges of ctx.snes_watches with a single round trip and returns the watches that changed."""
+    if not ctx.snes_watches:
+        return []
+    try:
+        await ctx.snes_request_lock.acquire()
+        results = await _snes_read_ranges(ctx, [(address, size) for address, size, _ in ctx.snes_watches.reads])
     finally:
         ctx.snes_request_lock.release()
+    if results is None:
+        # don't leave the bytes of an earlier read around as if they were current
+        ctx.snes_watches.reset()
+        return []
+    return ctx.snes_watches.update(results)
 
 
 async def snes_write(ctx: SNIContext, write_list: typing.List[typing.Tuple[int, bytes]]) -> bool:
@@ -610,10 +644,12 @@ async def game_watcher(ctx: SNIContext) -> None:
             ctx.death_link_allow_survive = False
 
             from worlds.AutoSNIClient import AutoSNIClientRegister
+            ctx.snes_watches.clear()
             ctx.client_handler = await AutoSNIClientRegister.get_handler(ctx)
 
             if not ctx.client_handler:
                 continue
+            ctx.client_handler.watch_memory(ctx)
 
             if not ctx.rom:
                 continue
@@ -649,6 +685,7 @@ async def game_watcher(ctx: SNIContext) -> None:
 
         perf_counter = time.perf_counter()
 
+        await notify(await snes_read_watches(ctx))
         await ctx.client_handler.game_watcher(ctx)
 
 
@@ -24,6 +24,10 @@ app.jinja_env.filters['all'] = all
 app.config["SELFHOST"] = True  # application process is in charge of running the websites
 app.config["GENERATORS"] = 8  # maximum concurrent world gens
 app.config["HOSTERS"] = 8  # maximum concurrent room hosters
+# room hosters listen on this port + their index for notifications of commands entered on the website.
+# Set to None to only look for commands by polling the database.
+app.config["ROOM_COMMAND_PORT"] = 38282
+app.config["ROOM_COMMAND_ADDRESS"] = "127.0.0.1"
 app.config["SELFLAUNCH"] = True  # application process is in charge of launching Rooms.
 app.config["SELFLAUNCHCERT"] = None  # can point to a SSL Certificate to encrypt Room websocket connections
 app.config["SELFLAUNCHKEY"] = None  # can point to a SSL Certificate Key to encrypt Room websocket connections
@@ -79,6 +83,7 @@ def register():
     # has automatic patch integration
     import worlds.AutoWorld
     import worlds.Files
+    worlds.load_all_worlds()  # every game has its pages
     app.jinja_env.filters['supports_apdeltapatch'] = lambda game_name: \
         game_name in worlds.Files.AutoPatchRegister.patch_types
 
@@ -0,0 +1,66 @@
+"""
+Notifies room hosting processes of new Commands for their rooms, so they don't have to wait for the next database poll.
+Each hoster listens on ROOM_COMMAND_PORT + its index for datagrams containing the id of one of its rooms.
+Notifications are best effort, hosters still poll the database for Commands as a fallback.
+"""
+from __future__ import annotations
+
+import logging
+import select
+import socket
+import typing
+from uuid import UUID
+
+Address = typing.Tuple[str, int]
+
+
+def get_room_hoster(config: typing.Mapping[str, typing.Any], room_id: UUID) -> int:
+    """Index of the hoster a room gets hosted by."""
+    return room_id.int % config["HOSTERS"]
+
+
+def get_hoster_address(config: typing.Mapping[str, typing.Any], hoster: int) -> typing.Optional[Address]:
+    """Address a hoster listens on for notifications, None if notifications are disabled."""
+    port = config.get("ROOM_COMMAND_PORT")
+    if not port:
+        return None
+    return config.get("ROOM_COMMAND_ADDRESS", "127.0.0.1"), port + hoster
+
+
+def notify_room(config: typing.Mapping[str, typing.Any], room_id: UUID) -> None:
+    """Tell the hoster of a room to fetch the room's Commands, which have to be committed already."""
+    address = get_hoster_address(config, get_room_hoster(config, room_id))
+    if address:
+        try:
+            with socket.socket(socket.AF_INET, socket.SOCK_DGRAM) as sock:
+                sock.sendto(room_id.bytes, address)
+        except OSError as e:
+            logging.debug(f"Could not notify room {room_id}: {e}")  # will be picked up by polling
+
+
+def open_listener(address: Address) -> typing.Optional[socket.socket]:
+    """Socket to receive notifications on, None if the address is not available."""
+    sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+    try:
+        sock.bind(address)
+    except OSError as e:
+        sock.close()
+        logging.warning(f"Could not listen for room commands on {address[0]}:{address[1]}, "
+                        f"falling back to polling: {e}")
+        return None
+    sock.setblocking(False)
+    return sock
+
+
+def read_notifications(sock: socket.socket, timeout: float) -> typing.Set[UUID]:
+    """Waits up to timeout for notifications and returns the ids of all notified rooms."""
+    room_ids: typing.Set[UUID] = set()
+    if select.select([sock], [], [], timeout)[0]:
+        while True:
+            try:
+                data = sock.recv(64)
+            except (BlockingIOError, InterruptedError):
+                break
+            if len(data) == 16:
+                room_ids.add(UUID(bytes=data))
+    return room_ids
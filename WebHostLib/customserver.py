@@ -19,10 +19,13 @@ from pony.orm import commit, db_session, select
 
 import Utils
 
-from MultiServer import Context, server, auto_shutdown, ServerCommandProcessor, ClientMessageProcessor, load_server_cert
+from MultiServer import Context, server, auto_shutdown, ServerCommandProcessor, ClientMessageProcessor, \
+    apply_save_journal, load_server_cert
 from Utils import restricted_loads, cache_argsless
+from .commandchannel import Address, open_listener, read_notifications
+from .gamedata import GameData, RoomView, write_game_data
 from .locker import Locker
-from .models import Command, GameDataPackage, Room, db
+from .models import Command, GameDataPackage, Room, SaveJournal, db, UUID
 
 
 class CustomClientMessageProcessor(ClientMessageProcessor):
@@ -59,37 +62,71 @@ class DBCommandProcessor(ServerCommandProcessor):
 
 class WebHostContext(Context):
     room_id: int
+    game_data: GameData
+    shared_games: typing.Set[str]
+    """games of this room that use the shared game data"""
 
-    def __init__(self, static_server_data: dict, logger: logging.Logger):
-        # static server data is used during _load_game_data to load required data,
+    def __init__(self, game_data: GameData, logger: logging.Logger):
+        # game data is mapped from a file shared by all room processes and used during _load_game_data,
         # without needing to import worlds system, which takes quite a bit of memory
-        self.static_server_data = static_server_data
+        self.game_data = game_data
         super(WebHostContext, self).__init__("", 0, "", "", 1,
                                              40, True, "enabled", "enabled",
                                              "enabled", 0, 2, logger=logger)
-        del self.static_server_data
         self.main_loop = asyncio.get_running_loop()
+        self.db_command_processor = DBCommandProcessor(self)
         self.video = {}
         self.tags = ["AP", "WebHost"]
 
     def _load_game_data(self):
-        for key, value in self.static_server_data.items():
-            # NOTE: attributes are mutable and shared, so they will have to be copied before being modified
-            setattr(self, key, value)
-        self.non_hintable_names = collections.defaultdict(frozenset, self.non_hintable_names)
-
-    def listen_to_db_commands(self):
-        cmdprocessor = DBCommandProcessor(self)
-
-        while not self.exit_event.is_set():
-            with db_session:
-                commands = select(command for command in Command if command.room.id == self.room_id)
-                if commands:
-                    for command in commands:
-                        self.main_loop.call_soon_threadsafe(cmdprocessor, command.commandtext)
-                        command.delete()
-                    commit()
-            time.sleep(5)
+        game_data = self.game_data
+        self.shared_games = {"Archipelago"}
+        self.gamespackage = RoomView(self.shared_games, game_data.package)
+        self.item_name_groups = RoomView(self.shared_games, lambda game: game_data.name_groups(game)[0])
+        self.location_name_groups = RoomView(self.shared_games, lambda game: game_data.name_groups(game)[1])
+        self.non_hintable_names = collections.defaultdict(frozenset, game_data.non_hintable_names)
+
+    def _init_game_data(self):
+        game_data = self.game_data
+        self.item_names = RoomView(self.shared_games, game_data.item_names,
+                                   lambda: Utils.KeyedDefaultDict(lambda code: f"Unknown item (ID:{code})"))
+        self.location_names = RoomView(self.shared_games, game_data.location_names,
+                                       lambda: Utils.KeyedDefaultDict(lambda code: f"Unknown location (ID:{code})"))
+        self.all_item_and_group_names = RoomView(self.shared_games, game_data.all_item_and_group_names)
+        self.all_location_and_group_names = RoomView(self.shared_games, game_data.all_location_and_group_names)
+        for game_name in self.shared_games:
+            checksum = game_data.checksum(game_name)
+            if checksum:
+                self.checksums[game_name] = checksum
+
+        # custom data packages are only used by this room, so they are looked up like in the base Context
+        for game_name, game_package in self.gamespackage.custom.items():
+            if "checksum" in game_package:
+                self.checksums[game_name] = game_package["checksum"]
+            item_names = self.item_names[game_name] = \
+                Utils.KeyedDefaultDict(lambda code: f"Unknown item (ID:{code})")
+            item_names.update(game_data.item_names("Archipelago").items())
+            item_names.update((item_id, item_name) for item_name, item_id
+                              in game_package["item_name_to_id"].items())
+            location_names = self.location_names[game_name] = \
+                Utils.KeyedDefaultDict(lambda code: f"Unknown location (ID:{code})")
+            location_names.update(game_data.location_names("Archipelago").items())
+            location_names.update((location_id, location_name) for location_name, location_id
+                                  in game_package["location_name_to_id"].items())
+            self.all_item_and_group_names[game_name] = \
+                set(game_package["item_name_to_id"]) | set(self.item_name_groups[game_name])
+            self.all_location_and_group_names[game_name] = \
+                set(game_package["location_name_to_id"]) | set(self.location_name_groups.get(game_name, []))
+
+    def item_names_for_game(self, game: str) -> typing.Optional[typing.Mapping[str, int]]:
+        if game in self.gamespackage.custom:
+            return self.gamespackage.custom[game]["item_name_to_id"]
+        return self.game_data.item_name_to_id(game) if game in self.shared_games else None
+
+    def location_names_for_game(self, game: str) -> typing.Optional[typing.Mapping[str, int]]:
+        if game in self.gamespackage.custom:
+            return self.gamespackage.custom[game]["location_name_to_id"]
+        return self.game_data.location_name_to_id(game) if game in self.shared_games else None
 
     @db_session
     def load(self, room_id: int):
@@ -103,19 +140,12 @@ class WebHostContext(Context):
         multidata = self.decompress(room.seed.multidata)
         game_data_packages = {}
 
-        static_gamespackage = self.gamespackage  # this is shared across all rooms
-        static_item_name_groups = self.item_name_groups
-        static_location_name_groups = self.location_name_groups
-        self.gamespackage = {"Archipelago": static_gamespackage.get("Archipelago", {})}  # this may be modified by _load
-        self.item_name_groups = {"Archipelago": static_item_name_groups.get("Archipelago", {})}
-        self.location_name_groups = {"Archipelago": static_location_name_groups.get("Archipelago", {})}
-
         for game in list(multidata.get("datapackage", {})):
             game_data = multidata["datapackage"][game]
             if "checksum" in game_data:
-                if static_gamespackage.get(game, {}).get("checksum") == game_data["checksum"]:
-                    # non-custom. remove from multidata and use static data
-                    # games package could be dropped from static data once all rooms embed data package
+                if self.game_data.checksum(game) == game_data["checksum"]:
+                    # non-custom. remove from multidata and use shared data
+                    # games package could be dropped from shared data once all rooms embed data package
                     del multidata["datapackage"][game]
                 else:
                     row = GameDataPackage.get(checksum=game_data["checksum"])
@@ -124,73 +154,127 @@ class WebHostContext(Context):
                         continue
                     else:
                         self.logger.warning(f"Did not find game_data_package for {game}: {game_data['checksum']}")
-            self.gamespackage[game] = static_gamespackage.get(game, {})
-            self.item_name_groups[game] = static_item_name_groups.get(game, {})
-            self.location_name_groups[game] = static_location_name_groups.get(game, {})
-
-        if not game_data_packages:
-            # all static -> use the static dicts directly
-            self.gamespackage = static_gamespackage
-            self.item_name_groups = static_item_name_groups
-            self.location_name_groups = static_location_name_groups
+            if game in self.game_data.games:
+                self.shared_games.add(game)  # embedded data package set by _load still takes precedence
+        # rooms from before data packages were embedded rely on the static data for all their games
+        self.shared_games.update(slot.game for slot in multidata["slot_info"].values()
+                                 if slot.game in self.game_data.games)
+
         return self._load(multidata, game_data_packages, True)
 
     @db_session
     def init_save(self, enabled: bool = True):
         self.saving = enabled
         if self.saving:
-            savegame_data = Room.get(id=self.room_id).multisave
-            if savegame_data:
-                self.set_save(restricted_loads(Room.get(id=self.room_id).multisave))
+            room = Room.get(id=self.room_id)
+            if room.multisave:
+                savedata = load_room_save(room)
+                self.set_save(savedata)
+                # journal entries are written in the same transaction as the room, so they can't be stale
+                self.save_journal_token = savedata.get("journal")
+                self.save_snapshot_size = len(room.multisave)
+                self.save_journal_size = sum(len(entry.data) for entry in room.save_journal)
+            self.reset_save_journal()
             self._start_async_saving(atexit_save=False)
-        threading.Thread(target=self.listen_to_db_commands, daemon=True).start()
 
-    @db_session
     def _save(self, exit_save: bool = False) -> bool:
-        room = Room.get(id=self.room_id)
-        room.multisave = pickle.dumps(self.get_save())
-        # saving only occurs on activity, so we can "abuse" this information to mark this as last_activity
-        if not exit_save:  # we don't want to count a shutdown as activity, which would restart the server again
-            room.last_activity = datetime.datetime.utcnow()
+        try:
+            with db_session:
+                self._write_save(exit_save)
+                # saving only occurs on activity, so we can "abuse" this information to mark this as last_activity
+                if not exit_save:  # we don't want to count a shutdown as activity, which would restart the server
+                    Room.get(id=self.room_id).last_activity = datetime.datetime.utcnow()
+        except BaseException:
+            self.save_journal_token = None  # the journal may be missing changes now
+            raise
         return True
 
-    def get_save(self) -> dict:
-        d = super(WebHostContext, self).get_save()
+    def _write_save_snapshot(self, savedata: typing.Dict[str, typing.Any]) -> int:
+        room = Room.get(id=self.room_id)
+        room.multisave = data = pickle.dumps(savedata)
+        select(entry for entry in SaveJournal if entry.room == room).delete(bulk=True)
+        return len(data)
+
+    def _write_save_journal(self, data: bytes) -> int:
+        SaveJournal(room=Room.get(id=self.room_id), data=data)
+        return len(data)
+
+    def get_save_state(self) -> dict:
+        d = super(WebHostContext, self).get_save_state()
         d["video"] = [(tuple(playerslot), videodata) for playerslot, videodata in self.video.items()]
         return d
 
 
+def load_room_save(room: Room) -> typing.Dict[str, typing.Any]:
+    """Room.multisave with the changes from its journal applied. Requires a db_session."""
+    if not room.multisave:
+        return {}
+    journal = select(entry for entry in SaveJournal if entry.room == room).order_by(SaveJournal.id)
+    return apply_save_journal(restricted_loads(room.multisave), (entry.data for entry in journal))
+
+
+class CommandListener(threading.Thread):
+    """
+    Delivers Commands from the database to the rooms hosted by this process.
+    Rooms are looked up once notified through the command channel, see commandchannel,
+    all rooms are polled as a fallback in case a notification got lost or the channel is disabled.
+    """
+    poll_interval: typing.ClassVar[float] = 5
+    fallback_poll_interval: typing.ClassVar[float] = 30
+    """poll interval if notifications are enabled"""
+
+    def __init__(self, rooms: typing.Dict[UUID, WebHostContext], address: typing.Optional[Address]):
+        super().__init__(name="CommandListener", daemon=True)
+        self.rooms = rooms
+        self.socket = open_listener(address) if address else None
+
+    def run(self):
+        poll_interval = self.fallback_poll_interval if self.socket else self.poll_interval
+        next_poll = time.monotonic() + poll_interval
+        while True:
+            timeout = next_poll - time.monotonic()
+            if timeout <= 0:
+                next_poll = time.monotonic() + poll_interval
+                room_ids = set(self.rooms)
+            elif self.socket:
+                room_ids = read_notifications(self.socket, timeout)
+                room_ids.intersection_update(self.rooms)
+            else:
+                time.sleep(timeout)
+                continue
+            if room_ids:
+                try:
+                    self.deliver(room_ids)
+                except Exception as e:
+                    logging.exception(e)  # keep listening, the commands are retried on the next poll
+
+    def notify(self, room_id: UUID):
+        """Look up Commands of a room soon, like the web process does through the command channel."""
+        if self.socket:
+            self.socket.sendto(room_id.bytes, self.socket.getsockname())
+
+    @db_session
+    def deliver(self, room_ids: typing.Collection[UUID]):
+        room_ids = tuple(room_ids)
+        commands = select(command for command in Command if command.room.id in room_ids).order_by(Command.id)
+        for command in commands:
+            ctx = self.rooms.get(command.room.id)
+            if ctx:
+                ctx.main_loop.call_soon_threadsafe(ctx.db_command_processor, command.commandtext)
+                command.delete()
+        commit()
+
+
 def get_random_port():
     return random.randint(49152, 65535)
 
 
 @cache_argsless
-def get_static_server_data() -> dict:
+def get_game_data_path() -> str:
+    """Writes the game data of all worlds to be shared by room processes, see gamedata. Returns the file's path."""
     import worlds
-    data = {
-        "non_hintable_names": {
-            world_name: world.hint_blacklist
-            for world_name, world in worlds.AutoWorldRegister.world_types.items()
-        },
-        "gamespackage": {
-            world_name: {
-                key: value
-                for key, value in game_package.items()
-                if key not in ("item_name_groups", "location_name_groups")
-            }
-            for world_name, game_package in worlds.network_data_package["games"].items()
-        },
-        "item_name_groups": {
-            world_name: world.item_name_groups
-            for world_name, world in worlds.AutoWorldRegister.world_types.items()
-        },
-        "location_name_groups": {
-            world_name: world.location_name_groups
-            for world_name, world in worlds.AutoWorldRegister.world_types.items()
-        },
-    }
-
-    return data
+    return write_game_data(Utils.cache_path(), worlds.network_data_package["games"],
+                           {game: info.hint_blacklist for game, info in worlds.world_info.items()})
 
 
 def set_up_logging(room_id) -> logging.Logger:
@@ -213,9 +297,10 @@ def set_up_logging(room_id) -> logging.Logger:
     return logger
 
 
-def run_server_process(name: str, ponyconfig: dict, static_server_data: dict,
+def run_server_process(name: str, ponyconfig: dict, game_data_path: str,
                        cert_file: typing.Optional[str], cert_key_file: typing.Optional[str],
-                       host: str, rooms_to_run: multiprocessing.Queue, rooms_shutting_down: multiprocessing.Queue):
+                       host: str, rooms_to_run: multiprocessing.Queue, rooms_shutting_down: multiprocessing.Queue,
+                       command_address: typing.Optional[Address] = None):
     Utils.init_logging(name)
     try:
         import resource
@@ -236,19 +321,25 @@ def run_server_process(name: str, ponyconfig: dict, static_server_data: dict,
         raise Exception("Worlds system should not be loaded in the custom server.")
 
     import gc
+    game_data = GameData(game_data_path)
     ssl_context = load_server_cert(cert_file, cert_key_file) if cert_file else None
     del cert_file, cert_key_file, ponyconfig
     gc.collect()  # free intermediate objects used during setup
 
     loop = asyncio.get_event_loop()
+    rooms: typing.Dict[UUID, WebHostContext] = {}
+    command_listener = CommandListener(rooms, command_address)
+    command_listener.start()
 
     async def start_room(room_id):
         with Locker(f"RoomLocker {room_id}"):
             try:
                 logger = set_up_logging(room_id)
-                ctx = WebHostContext(static_server_data, logger)
+                ctx = WebHostContext(game_data, logger)
                 ctx.load(room_id)
                 ctx.init_save()
+                rooms[room_id] = ctx
+                command_listener.notify(room_id)  # commands may have been sent while the room was not running
                 try:
                     ctx.server = websockets.serve(
                         functools.partial(server, ctx=ctx), ctx.host, ctx.port, ssl=ssl_context)
@@ -297,6 +388,7 @@ def run_server_process(name: str, ponyconfig: dict, static_server_data: dict,
                     ctx._save()
                     setattr(asyncio.current_task(), "save", None)
             finally:
+                rooms.pop(room_id, None)
                 try:
                     ctx.save_dirty = False  # make sure the saving thread does not write to DB after final wakeup
                     ctx.exit_event.set()  # make sure the saving thread stops at some point
@@ -0,0 +1,305 @@
+"""
+Read-only, memory-mapped tables of the static game data used by room servers.
+The file is written once by the autolauncher and mapped by every room server process, so the name tables are shared
+through the page cache instead of each process holding its own dicts of every game. It is named by the checksums of the
+data packages it was built from and kept in the cache folder, so it is only built again once a world changed.
+Each name table is an array of ids sorted by id, an array of indices sorted by name and a string table.
+"""
+from __future__ import annotations
+
+import array
+import bisect
+import functools
+import hashlib
+import mmap
+import os
+import pickle
+import struct
+import typing
+
+_magic = b"APGD\x01"
+_header = struct.Struct("<Q")  # length of the pickled index following it
+_checksummed_fields = ("item_name_to_id", "location_name_to_id", "item_name_groups", "location_name_groups")
+
+V = typing.TypeVar("V")
+
+
+class NameTable:
+    """Names of one kind, items or locations, of one game."""
+    __slots__ = ("ids", "order", "offsets", "names")
+
+    def __init__(self, body: memoryview, start: int, count: int) -> None:
+        position = start + 8 * count
+        self.ids = body[start:position].cast("q")
+        self.order = body[position:position + 4 * count].cast("I")  # indices sorted by name
+        position += 4 * count
+        self.offsets = body[position:position + 4 * (count + 1)].cast("I")  # of each name in names
+        position += 4 * (count + 1)
+        self.names = body[position:position + self.offsets[count]]
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    def name(self, index: int) -> str:
+        return str(self.names[self.offsets[index]:self.offsets[index + 1]], "utf-8")
+
+    def find_id(self, code: int) -> int:
+        index = bisect.bisect_left(self.ids, code)
+        if index < len(self.ids) and self.ids[index] == code:
+            return index
+        return -1
+
+    def find_name(self, name: str) -> int:
+        key = name.encode()
+        low, high = 0, len(self.order)
+        while low < high:
+            middle = (low + high) // 2
+            index = self.order[middle]
+            if self.names[self.offsets[index]:self.offsets[index + 1]].tobytes() < key:
+                low = middle + 1
+            else:
+                high = middle
+        if low < len(self.order):
+            index = self.order[low]
+            if self.names[self.offsets[index]:self.offsets[index + 1]] == key:
+                return index
+        return -1
+
+    @staticmethod
+    def write(body: bytearray, name_to_id: typing.Mapping[str, int]) -> typing.Tuple[int, int]:
+        """Append a table to body. Returns its start and count."""
+        entries = sorted(name_to_id.items(), key=lambda entry: entry[1])
+        names = [name.encode() for name, _ in entries]
+        offsets = array.array("I", [0])
+        for name in names:
+            offsets.append(offsets[-1] + len(name))
+        body.extend(bytes(-len(body) % 8))  # align ids
+        start = len(body)
+        body.extend(array.array("q", [code for _, code in entries]).tobytes())
+        body.extend(array.array("I", sorted(range(len(names)), key=names.__getitem__)).tobytes())
+        body.extend(offsets.tobytes())
+        body.extend(b"".join(names))
+        return start, len(entries)
+
+
+class IdToName(typing.Mapping[int, str]):
+    """
+    Lookup of names by id in tables tried in order, like Context.item_names[game].
+    Unknown ids are not contained, but still get a name.
+    """
+
+    def __init__(self, tables: typing.Sequence[NameTable], unknown: str) -> None:
+        self.tables = tables
+        self.unknown = unknown
+
+    def __getitem__(self, code: int) -> str:
+        for table in self.tables:
+            index = table.find_id(code)
+            if index >= 0:
+                return table.name(index)
+        return self.unknown.format(code)
+
+    def __contains__(self, code: object) -> bool:
+        return isinstance(code, int) and any(table.find_id(code) >= 0 for table in self.tables)
+
+    def __iter__(self) -> typing.Iterator[int]:
+        for table in self.tables:
+            yield from table.ids
+
+    def __len__(self) -> int:
+        return sum(len(table) for table in self.tables)
+
+
+class NameToId(typing.Mapping[str, int]):
+    """Lookup of ids by name, like a game's item_name_to_id."""
+
+    def __init__(self, table: NameTable) -> None:
+        self.table = table
+
+    def __getitem__(self, name: str) -> int:
+        index = self.table.find_name(name) if isinstance(name, str) else -1
+        if index < 0:
+            raise KeyError(name)
+        return self.table.ids[index]
+
+    def __contains__(self, name: object) -> bool:
+        return isinstance(name, str) and self.table.find_name(name) >= 0
+
+    def __iter__(self) -> typing.Iterator[str]:
+        return map(self.table.name, range(len(self.table)))
+
+    def __len__(self) -> int:
+        return len(self.table)
+
+
+class RoomView(typing.MutableMapping[str, V]):
+    """
+    Per-room view of one kind of shared game data, limited to games.
+    Games set by the room, like custom games, take precedence. Missing games are created with default, if given.
+    """
+
+    def __init__(self, games: typing.Collection[str], get_shared: typing.Callable[[str], V],
+                 default: typing.Optional[typing.Callable[[], V]] = None) -> None:
+        self.games = games
+        self.get_shared = get_shared
+        self.default = default
+        self.custom: typing.Dict[str, V] = {}
+
+    def __getitem__(self, game: str) -> V:
+        if game in self.custom:
+            return self.custom[game]
+        if game in self.games:
+            return self.get_shared(game)
+        if self.default:
+            value = self.custom[game] = self.default()
+            return value
+        raise KeyError(game)
+
+    def __setitem__(self, game: str, value: V) -> None:
+        self.custom[game] = value
+
+    def __delitem__(self, game: str) -> None:
+        del self.custom[game]
+
+    def __contains__(self, game: object) -> bool:
+        return game in self.custom or game in self.games
+
+    def __iter__(self) -> typing.Iterator[str]:
+        yield from self.custom
+        yield from (game for game in self.games if game not in self.custom)
+
+    def __len__(self) -> int:
+        return len(self.custom) + sum(game not in self.custom for game in self.games)
+
+
+class GameData:
+    """Shared game data file mapped into this process."""
+    games: typing.Dict[str, typing.Dict[str, typing.Any]]
+    """game -> checksum, table locations and any other small data package fields"""
+    non_hintable_names: typing.Dict[str, typing.FrozenSet[str]]
+
+    def __init__(self, path: str) -> None:
+        with open(path, "rb") as f:
+            self._mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        view = memoryview(self._mmap)
+        if view[:len(_magic)] != _magic:
+            raise ValueError(f"{path} is not a game data file")
+        index_start = len(_magic) + _header.size
+        index_size, = _header.unpack_from(view, len(_magic))
+        index = pickle.loads(view[index_start:index_start + index_size])
+        self.games = index["games"]
+        self.non_hintable_names = index["non_hintable_names"]
+        self._body = view[index["body"]:]
+
+    @functools.lru_cache(maxsize=None)
+    def table(self, game: str, kind: str) -> NameTable:
+        return NameTable(self._body, *self.games[game][kind])
+
+    @functools.lru_cache(maxsize=None)
+    def item_names(self, game: str) -> IdToName:
+        """Item names of game, falling back to Archipelago's."""
+        return IdToName([self.table(game, "items"), self.table("Archipelago", "items")], "Unknown item (ID:{})")
+
+    @functools.lru_cache(maxsize=None)
+    def location_names(self, game: str) -> IdToName:
+        """Location names of game, falling back to Archipelago's."""
+        return IdToName([self.table(game, "locations"), self.table("Archipelago", "locations")],
+                        "Unknown location (ID:{})")
+
+    @functools.lru_cache(maxsize=None)
+    def item_name_to_id(self, game: str) -> NameToId:
+        return NameToId(self.table(game, "items"))
+
+    @functools.lru_cache(maxsize=None)
+    def location_name_to_id(self, game: str) -> NameToId:
+        return NameToId(self.table(game, "locations"))
+
+    @functools.lru_cache(maxsize=None)
+    def name_groups(self, game: str) -> typing.Tuple[typing.Dict[str, typing.Set[str]], typing.Dict[str, typing.Set[str]]]:
+        """Item and location name groups of game, only unpickled once used."""
+        start, size = self.games[game]["groups"]
+        return pickle.loads(self._body[start:start + size])
+
+    @functools.lru_cache(maxsize=None)
+    def all_item_and_group_names(self, game: str) -> typing.FrozenSet[str]:
+        return frozenset(self.item_name_to_id(game)) | frozenset(self.name_groups(game)[0])
+
+    @functools.lru_cache(maxsize=None)
+    def all_location_and_group_names(self, game: str) -> typing.FrozenSet[str]:
+        return frozenset(self.location_name_to_id(game)) | frozenset(self.name_groups(game)[1])
+
+    def checksum(self, game: str) -> typing.Optional[str]:
+        return self.games[game]["package"].get("checksum") if game in self.games else None
+
+    def package(self, game: str) -> typing.Dict[str, typing.Any]:
+        """Data package of game as sent to clients, built on each call."""
+        return {
+            "item_name_to_id": dict(self.item_name_to_id(game)),
+            "location_name_to_id": dict(self.location_name_to_id(game)),
+            **self.games[game]["package"],
+        }
+
+
+def game_data_key(games_package: typing.Mapping[str, typing.Mapping[str, typing.Any]],
+                  non_hintable_names: typing.Mapping[str, typing.AbstractSet[str]]) -> str:
+    """
+    Identifies the game data file of these games, from the data package checksums instead of the tables they cover,
+    so an existing file is found without building it again. Games without a checksum are hashed in full.
+    """
+    key = hashlib.sha256(_magic)
+    for game in sorted(games_package):
+        package = games_package[game]
+        checksum = package.get("checksum")
+        key.update(pickle.dumps((
+            game,
+            checksum if checksum else sorted((field, repr(value)) for field, value in package.items()),
+            sorted((field, repr(value)) for field, value in package.items() if field not in _checksummed_fields),
+            sorted(non_hintable_names.get(game, ())),
+        )))
+    return key.hexdigest()[:16]
+
+
+def write_game_data(directory: str, games_package: typing.Mapping[str, typing.Mapping[str, typing.Any]],
+                    non_hintable_names: typing.Mapping[str, typing.AbstractSet[str]]) -> str:
+    """
+    Write a game data file of games_package, including its name groups, into directory, if there is none for the
+    same data yet. Returns its path.
+    """
+    os.makedirs(directory, exist_ok=True)
+    path = os.path.join(directory, f"game_data_{game_data_key(games_package, non_hintable_names)}.apgd")
+    if os.path.exists(path):
+        return path
+
+    body = bytearray()
+    games: typing.Dict[str, typing.Dict[str, typing.Any]] = {}
+    for game, package in games_package.items():
+        groups = pickle.dumps((dict(package.get("item_name_groups", {})),
+                               dict(package.get("location_name_groups", {}))))
+        games[game] = {
+            "items": NameTable.write(body, package["item_name_to_id"]),
+            "locations": NameTable.write(body, package["location_name_to_id"]),
+            "groups": (len(body), len(groups)),
+            "package": {key: value for key, value in package.items() if key not in _checksummed_fields},
+        }
+        body.extend(groups)
+    index = {
+        "games": games,
+        "non_hintable_names": {game: frozenset(names) for game, names in non_hintable_names.items()},
+        "body": 0,
+    }
+    # the body starts after the index, which contains the body's start, so it is pickled until the size is stable
+    while True:
+        pickled_index = pickle.dumps(index)
+        body_start = len(_magic) + _header.size + len(pickled_index)
+        body_start += -body_start % 8
+        if body_start == index["body"]:
+            break
+        index["body"] = body_start
+    data = _magic + _header.pack(len(pickled_index)) + pickled_index
+    data += bytes(body_start - len(data)) + body
+
+    temp_path = f"{path}.{os.getpid()}.tmp"
+    with open(temp_path, "wb") as f:
+        f.write(data)
+    os.replace(temp_path, path)
+    return path
@@ -8,6 +8,7 @@ from pony.orm import count, commit, db_session
 
 from worlds.AutoWorld import AutoWorldRegister
 from . import app, cache
+from .commandchannel import notify_room
 from .models import Seed, Room, Command, UUID, uuid4
 
 
@@ -143,6 +144,7 @@ def host_room(room: UUID):
             if cmd:
                 Command(room=room, commandtext=cmd)
                 commit()
+                notify_room(app.config, room.id)
         return redirect(url_for("host_room", room=room.id))
 
     now = datetime.datetime.utcnow()
@@ -1,7 +1,7 @@
 import datetime
 import collections
 from dataclasses import dataclass
-from typing import Any, Callable, Dict, List, Optional, Set, Tuple, NamedTuple, Counter
+from typing import AbstractSet, Any, Callable, Dict, List, Optional, Set, Tuple, NamedTuple, Counter
 from uuid import UUID
 from email.utils import parsedate_to_datetime
 
@@ -9,9 +9,10 @@ from flask import render_template, make_response, Response, request
 from werkzeug.exceptions import abort
 
 from MultiServer import Context, get_saving_second
-from NetUtils import ClientStatus, Hint, NetworkItem, NetworkSlot, SlotType
+from NetUtils import ClientStatus, Hint, LocationChecks, NetworkItem, NetworkSlot, SlotType
 from Utils import restricted_loads, KeyedDefaultDict
 from . import app, cache
+from .customserver import load_room_save
 from .models import GameDataPackage, Room
 
 # Multisave is currently updated, at most, every minute.
@@ -57,7 +58,7 @@ class TrackerData:
         """Initialize a new RoomMultidata object for the current room."""
         self.room = room
         self._multidata = Context.decompress(room.seed.multidata)
-        self._multisave = restricted_loads(room.multisave) if room.multisave else {}
+        self._multisave = load_room_save(room)
         self._tracker_cache = {}
 
         self.item_name_to_id: Dict[str, Dict[str, int]] = {}
@@ -109,14 +110,26 @@ class TrackerData:
         """Retrieves a list of all item codes a given slot starts with."""
         return self._multidata["precollected_items"][player]
 
-    def get_player_checked_locations(self, team: int, player: int) -> Set[int]:
+    @_cache_results
+    def get_player_checked_locations(self, team: int, player: int) -> AbstractSet[int]:
         """Retrieves the set of all locations marked complete by this player."""
-        return self._multisave.get("location_checks", {}).get((team, player), set())
+        checks = self._multisave.get("location_checks", {}).get((team, player), set())
+        if isinstance(checks, int):
+            checks = LocationChecks(sorted(self.get_player_locations(team, player)), checks)
+        return checks
+
+    def get_player_checked_count(self, team: int, player: int) -> int:
+        """Retrieves the number of locations marked complete by this player, without looking at the locations."""
+        checks = self._multisave.get("location_checks", {}).get((team, player), set())
+        return bin(checks).count("1") if isinstance(checks, int) else len(checks)
 
     @_cache_results
     def get_player_missing_locations(self, team: int, player: int) -> Set[int]:
         """Retrieves the set of all locations not marked complete by this player."""
-        return set(self.get_player_locations(team, player)) - self.get_player_checked_locations(team, player)
+        checks = self.get_player_checked_locations(team, player)
+        if isinstance(checks, LocationChecks):
+            return set(checks.missing())
+        return set(self.get_player_locations(team, player)) - checks
 
     def get_player_received_items(self, team: int, player: int) -> List[NetworkItem]:
         """Returns all items received to this player in order of received."""
@@ -187,7 +200,7 @@ class TrackerData:
     def get_team_locations_checked_count(self) -> Dict[int, int]:
         """Retrieves a dictionary of checked player locations each team has."""
         return {
-            team: sum(len(self.get_player_checked_locations(team, player)) for player in players)
+            team: sum(self.get_player_checked_count(team, player) for player in players)
             for team, players in self.get_all_players().items()
         }
 
@@ -242,7 +255,7 @@ class TrackerData:
     def get_room_locations_complete(self) -> Dict[TeamPlayer, int]:
         """Retrieves a dictionary of all locations complete per player."""
         return {
-            (team, player): len(self.get_player_checked_locations(team, player))
+            (team, player): self.get_player_checked_count(team, player)
             for team, players in self.get_all_players().items() for player in players
         }
 
@@ -955,7 +968,7 @@ if "Ocarina of Time" in network_data_package["games"]:
             return full_name
 
         locations = tracker_data.get_player_locations(team, player)
-        checked_locations = tracker_data.get_player_checked_locations(team, player).intersection(set(locations))
+        checked_locations = tracker_data.get_player_checked_locations(team, player) & set(locations)
         location_info = {}
         checks_done = {}
         checks_in_area = {}
@@ -976,7 +989,7 @@ if "Ocarina of Time" in network_data_package["games"]:
         checks_in_area["Total"] = sum(checks_in_area.values())
 
         # Give skulltulas on non-tracked locations
-        non_tracked_locations = tracker_data.get_player_checked_locations(team, player).difference(set(locations))
+        non_tracked_locations = tracker_data.get_player_checked_locations(team, player) - set(locations)
         for id in non_tracked_locations:
             if "GS" in lookup_and_trim(id, ""):
                 display_data["token_count"] += 1
@@ -1,6 +1,5 @@
 #cython: language_level=3
 #distutils: language = c
-#distutils: depends = intset.h
 
 """
 Provides faster implementation of some core parts.
@@ -14,6 +13,7 @@ from cpython cimport PyObject
 from typing import Any, Dict, Iterable, Iterator, Generator, Sequence, Tuple, TypeVar, Union, Set, List, TYPE_CHECKING
 from cymem.cymem cimport Pool
 from libc.stdint cimport int64_t, uint32_t
+from libc.stdlib cimport qsort
 from collections import defaultdict
 
 cdef extern from *:
@@ -31,28 +31,6 @@ ctypedef int64_t ap_id_t
 cdef ap_player_t MAX_PLAYER_ID = 1000000  # limit the size of indexing array
 cdef size_t INVALID_SIZE = <size_t>(-1)  # this is all 0xff... adding 1 results in 0, but it's not negative
 
-# configure INTSET for player
-cdef extern from *:
-    """
-    #define INTSET_NAME ap_player_set
-    #define INTSET_TYPE uint32_t  // has to match ap_player_t
-    """
-
-# create INTSET for player
-cdef extern from "intset.h":
-    """
-    #undef INTSET_NAME
-    #undef INTSET_TYPE
-    """
-    ctypedef struct ap_player_set:
-        pass
-
-    ap_player_set* ap_player_set_new(size_t bucket_count) nogil
-    void ap_player_set_free(ap_player_set* set) nogil
-    bint ap_player_set_add(ap_player_set* set, ap_player_t val) nogil
-    bint ap_player_set_contains(ap_player_set* set, ap_player_t val) nogil
-
-
 cdef struct LocationEntry:
     # layout is so that
     # 64bit player: location+sender and item+receiver 128bit comparisons, if supported
@@ -69,6 +47,22 @@ cdef struct IndexEntry:
     size_t count
 
 
+cdef struct ReceiverSortEntry:
+    ap_player_t receiver
+    ap_id_t item
+    size_t entry
+
+
+cdef int compare_receiver_sort_entries(const void* a, const void* b) noexcept nogil:
+    cdef const ReceiverSortEntry* x = <const ReceiverSortEntry*>a
+    cdef const ReceiverSortEntry* y = <const ReceiverSortEntry*>b
+    if x.receiver != y.receiver:
+        return -1 if x.receiver < y.receiver else 1
+    if x.item != y.item:
+        return -1 if x.item < y.item else 1
+    return -1 if x.entry < y.entry else (1 if x.entry > y.entry else 0)
+
+
 @cython.auto_pickle(False)
 cdef class LocationStore:
     """Compact store for locations and their items in a MultiServer"""
@@ -77,6 +71,7 @@ cdef class LocationStore:
     # This implementation is a flat list of (sender, location, item, receiver, flags) using native integers
     # as well as some mapping arrays used to speed up stuff, saving a lot of memory while speeding up hints.
     # Using std::map might be worth investigating, but memory overhead would be ~100% compared to arrays.
+    # For lookups by receiver there is a second array of entry indices, sorted by receiver and item.
 
     cdef Pool _mem
     cdef object _len
@@ -84,6 +79,9 @@ cdef class LocationStore:
     cdef size_t entry_count
     cdef IndexEntry* sender_index  # 16KB/1000 players
     cdef size_t sender_index_size
+    cdef size_t* receiver_entries  # 800KB/100k items, entry indices sorted by (receiver, item)
+    cdef IndexEntry* receiver_index  # 16KB/1000 players, slices of receiver_entries
+    cdef size_t receiver_index_size
     cdef list _keys  # ~36KB/1000 players, speed up iter (28 per int + 8 per list entry)
     cdef list _items  # ~64KB/1000 players, speed up items (56 per tuple + 8 per list entry)
     cdef list _proxies  # ~92KB/1000 players, speed up self[player] (56 per struct + 28 per len + 8 per list entry)
@@ -92,7 +90,8 @@ cdef class LocationStore:
     def get_size(self):
         from sys import getsizeof
         size = getsizeof(self) + getsizeof(self._mem) + getsizeof(self._len) \
-                + sizeof(LocationEntry) * self.entry_count + sizeof(IndexEntry) * self.sender_index_size
+                + sizeof(LocationEntry) * self.entry_count + sizeof(IndexEntry) * self.sender_index_size \
+                + sizeof(size_t) * self.entry_count + sizeof(IndexEntry) * self.receiver_index_size
         size += getsizeof(self._keys) + getsizeof(self._items) + getsizeof(self._proxies)
         size += sum(sizeof(key) for key in self._keys)
         size += sum(sizeof(item) for item in self._items)
@@ -109,6 +108,7 @@ cdef class LocationStore:
 
         # iterate over everything to get all maxima and validate everything
         cdef size_t max_sender = INVALID_SIZE  # keep track of highest used player id for indexing
+        cdef size_t max_receiver = 0  # groups can receive items, so this can be higher than max_sender
         cdef size_t sender_count = 0
         cdef size_t count = 0
         for sender, locations in locations_dict.items():
@@ -123,6 +123,8 @@ cdef class LocationStore:
                 receiver = data[1]
                 if receiver < 1 or receiver > MAX_PLAYER_ID:
                     raise ValueError(f"Invalid player id {receiver} for item")
+                if receiver > max_receiver:
+                    max_receiver = receiver
                 count += 1
             sender_count += 1
 
@@ -140,6 +142,8 @@ cdef class LocationStore:
         self.entries = <LocationEntry*>self._mem.alloc(count, sizeof(LocationEntry))
         self.sender_index = <IndexEntry*>self._mem.alloc(max_sender + 1, sizeof(IndexEntry))
         self._raw_proxies = <PyObject**>self._mem.alloc(max_sender + 1, sizeof(PyObject*))
+        self.receiver_entries = <size_t*>self._mem.alloc(count, sizeof(size_t))
+        self.receiver_index = <IndexEntry*>self._mem.alloc(max_receiver + 1, sizeof(IndexEntry))
 
         # build entries and index
         cdef size_t i = 0
@@ -158,6 +162,22 @@ cdef class LocationStore:
                 self.sender_index[sender].count += 1
                 i += 1
 
+        # build receiver index
+        cdef ReceiverSortEntry* receiver_sort = <ReceiverSortEntry*>self._mem.alloc(count, sizeof(ReceiverSortEntry))
+        cdef IndexEntry* receiver_slice
+        for i in range(count):
+            receiver_sort[i].receiver = self.entries[i].receiver
+            receiver_sort[i].item = self.entries[i].item
+            receiver_sort[i].entry = i
+        qsort(receiver_sort, count, sizeof(ReceiverSortEntry), compare_receiver_sort_entries)
+        for i in range(count):
+            receiver_slice = &self.receiver_index[receiver_sort[i].receiver]
+            if not receiver_slice.count:
+                receiver_slice.start = i
+            receiver_slice.count += 1
+            self.receiver_entries[i] = receiver_sort[i].entry
+        self._mem.free(receiver_sort)
+
         # build pyobject caches
         self._proxies.append(None)  # player 0
         assert self.sender_index[0].count == 0
@@ -173,6 +193,7 @@ cdef class LocationStore:
             self._raw_proxies[i] = <PyObject*>proxy
 
         self.sender_index_size = max_sender + 1
+        self.receiver_index_size = max_receiver + 1
         self.entry_count = count
         self._len = sender_count
 
@@ -205,97 +226,138 @@ cdef class LocationStore:
     # specialized accessors
     def find_item(self, slots: Set[int], seeked_item_id: int) -> Generator[Tuple[int, int, int, int, int], None, None]:
         cdef ap_id_t item = seeked_item_id
-        cdef ap_player_t receiver
-        cdef ap_player_set* receivers
-        cdef size_t slot_count = len(slots)
-        if slot_count == 1:
-            # specialized implementation for single slot
-            receiver = list(slots)[0]
-            with nogil:
-                for entry in self.entries[:self.entry_count]:
-                    if entry.item == item and entry.receiver == receiver:
-                        with gil:
-                            yield entry.sender, entry.location, entry.item, entry.receiver, entry.flags
-        elif slot_count:
-            # generic implementation with lookup in set
-            receivers = ap_player_set_new(min(1023, slot_count))  # limit top level struct to 16KB
-            if not receivers:
-                raise MemoryError()
-            try:
-                for receiver in slots:
-                    if not ap_player_set_add(receivers, receiver):
-                        raise MemoryError()
-                with nogil:
-                    for entry in self.entries[:self.entry_count]:
-                        if entry.item == item and ap_player_set_contains(receivers, entry.receiver):
-                            with gil:
-                                yield entry.sender, entry.location, entry.item, entry.receiver, entry.flags
-            finally:
-                ap_player_set_free(receivers)
+        cdef LocationEntry* entry
+        cdef size_t receiver
+        cdef size_t l, r, m
+        for slot in slots:
+            if slot < 1 or slot >= self.receiver_index_size:
+                continue
+            receiver = slot
+            # binary search for the first entry of item in the receiver's slice, which is sorted by item
+            l = self.receiver_index[receiver].start
+            r = l + self.receiver_index[receiver].count
+            while l < r:
+                m = (l + r) // 2
+                if self.entries[self.receiver_entries[m]].item < item:
+                    l = m + 1
+                else:
+                    r = m
+            r = self.receiver_index[receiver].start + self.receiver_index[receiver].count
+            while l < r:
+                entry = self.entries + self.receiver_entries[l]
+                if entry.item != item:
+                    break
+                yield entry.sender, entry.location, entry.item, entry.receiver, entry.flags
+                l += 1
 
     def get_for_player(self, slot: int) -> Dict[int, Set[int]]:
-        cdef ap_player_t receiver = slot
         all_locations: Dict[int, Set[int]] = {}
-        with nogil:
-            for entry in self.entries[:self.entry_count]:
-                if entry.receiver == receiver:
-                    with gil:
-                        sender: int = entry.sender
-                        if sender not in all_locations:
-                            all_locations[sender] = set()
-                        all_locations[sender].add(entry.location)
+        if slot < 1 or slot >= self.receiver_index_size:
+            return all_locations
+        cdef LocationEntry* entry
+        cdef size_t receiver = slot
+        cdef size_t start = self.receiver_index[receiver].start
+        cdef size_t count = self.receiver_index[receiver].count
+        cdef size_t i
+        for i in range(start, start + count):
+            entry = self.entries + self.receiver_entries[i]
+            sender: int = entry.sender
+            if sender not in all_locations:
+                all_locations[sender] = set()
+            all_locations[sender].add(entry.location)
         return all_locations
 
+    def get_location_ids(self, slot: int) -> Sequence[int]:
+        """Location ids of a slot in ascending order, what the slot's LocationChecks are aligned to."""
+        return LocationIds(self, slot)
+
     if TYPE_CHECKING:
-        State = Dict[Tuple[int, int], Set[int]]
+        from NetUtils import LocationChecks
+        State = Dict[Tuple[int, int], LocationChecks]
     else:
         State = Union[Tuple[int, int], Set[int], defaultdict]
 
-    def get_checked(self, state: State, team: int, slot: int) -> List[int]:
-        # This used to validate checks actually exist. A remnant from the past.
-        # If the order of locations becomes relevant at some point, we could not do sorted(set), so leaving it.
-        cdef set checked = state[team, slot]
+    # Location checks are a bitmap aligned to the slot's entries, so these walk the bitmap a byte at a time,
+    # skipping bytes without any matching bit, instead of probing a set for each location.
+    cdef const unsigned char[:] _get_bits(self, object checks, size_t count):
+        cdef const unsigned char[:] bits = checks.bits
+        if <size_t>bits.shape[0] != (count + 7) // 8:
+            raise ValueError("Location checks are not aligned to the locations of this slot")
+        return bits
 
-        if not len(checked):
-            # Skips loop if none have been checked.
-            # This optimizes the case where everyone connects to a fresh game at the same time.
-            return []
-
-        # Unless the set is close to empty, it's cheaper to use the python set directly, so we do that.
+    cdef list _select(self, const unsigned char[:] bits, size_t start, size_t count, unsigned char flip, bint items):
+        cdef list result = []
         cdef LocationEntry* entry
+        cdef size_t byte_index, index
+        cdef unsigned char byte
+        cdef int bit
+        for byte_index in range(<size_t>bits.shape[0]):
+            byte = bits[byte_index] ^ flip
+            if not byte:
+                continue
+            for bit in range(8):
+                if byte >> bit & 1:
+                    index = (byte_index << 3) + bit
+                    if index >= count:
+                        break
+                    entry = self.entries + start + index
+                    result.append(entry.item if items else entry.location)
+        return result
+
+    def get_checked(self, state: State, team: int, slot: int) -> List[int]:
         cdef ap_player_t sender = slot
         cdef size_t start = self.sender_index[sender].start
         cdef size_t count = self.sender_index[sender].count
-        return [entry.location for
-                entry in self.entries[start:start+count] if
-                entry.location in checked]
+        checks = state[team, slot]
+        if not len(checks):
+            # This optimizes the case where everyone connects to a fresh game at the same time.
+            return []
+        return self._select(self._get_bits(checks, count), start, count, 0, False)
 
     def get_missing(self, state: State, team: int, slot: int) -> List[int]:
         cdef LocationEntry* entry
         cdef ap_player_t sender = slot
         cdef size_t start = self.sender_index[sender].start
         cdef size_t count = self.sender_index[sender].count
-        cdef set checked = state[team, slot]
-        if not len(checked):
-            # Skip `in` if none have been checked.
+        checks = state[team, slot]
+        if not len(checks):
             # This optimizes the case where everyone connects to a fresh game at the same time.
             return [entry.location for
                     entry in self.entries[start:start + count]]
-        else:
-            # Unless the set is close to empty, it's cheaper to use the python set directly, so we do that.
-            return [entry.location for
-                    entry in self.entries[start:start + count] if
-                    entry.location not in checked]
+        return self._select(self._get_bits(checks, count), start, count, 0xff, False)
 
     def get_remaining(self, state: State, team: int, slot: int) -> List[int]:
-        cdef LocationEntry* entry
         cdef ap_player_t sender = slot
         cdef size_t start = self.sender_index[sender].start
         cdef size_t count = self.sender_index[sender].count
-        cdef set checked = state[team, slot]
-        return sorted([entry.item for
-                       entry in self.entries[start:start+count] if
-                       entry.location not in checked])
+        checks = state[team, slot]
+        return sorted(self._select(self._get_bits(checks, count), start, count, 0xff, True))
+
+
+@cython.auto_pickle(False)
+@cython.internal  # unsafe. disable direct import
+cdef class LocationIds:
+    """Sequence of a slot's location ids in ascending order, without copying them out of the store"""
+    cdef LocationStore _store
+    cdef size_t _start
+    cdef size_t _count
+
+    def __init__(self, store: LocationStore, slot: int) -> None:
+        self._store = store
+        if 0 < slot < store.sender_index_size:
+            self._start = store.sender_index[slot].start
+            self._count = store.sender_index[slot].count
+
+    def __len__(self) -> int:
+        return self._count
+
+    def __getitem__(self, index: int) -> int:
+        cdef Py_ssize_t i = index
+        if i < 0:
+            i += self._count
+        if i < 0 or <size_t>i >= self._count:
+            raise IndexError("location index out of range")
+        return self._store.entries[self._start + i].location
 
 
 @cython.auto_pickle(False)
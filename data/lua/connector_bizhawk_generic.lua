@@ -20,7 +20,7 @@ OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
 SOFTWARE.
 ]]
 
-local SCRIPT_VERSION = 1
+local SCRIPT_VERSION = 2
 
 -- Set to log incoming requests
 -- Will cause lag due to large console output
@@ -37,6 +37,16 @@ field `type`. The value of `type` determines what other fields may exist.
 To get the script version, instead of JSON, send "VERSION" to get the script
 version directly (e.g. "2").
 
+A message can also be an object holding the list of requests in `requests`
+along with an `id`, which is sent back with the list of responses in
+`responses` so the client can match them up. This lets the client send more
+messages before the previous ones were answered. All messages that have
+arrived are handled on the same frame, in the order they were received.
+
+If the object has `binary` set to true, each `READ_RESPONSE` has a `size`
+instead of a `value`, and the read bytes of all of them follow the JSON line
+as raw data, in order. This is faster than base64 for large reads.
+
 #### Ex. 1
 
 Request: `[{"type": "PING"}]`
@@ -97,6 +107,24 @@ Response:
 
 ---
 
+#### Ex. 5
+
+Request:
+
+```json
+{"id": 7, "binary": true, "requests": [
+    {"type": "READ", "address": 500, "size": 4, "domain": "ROM"}
+]}
+```
+
+Response (followed by the 4 bytes `test`):
+
+```json
+{"id": 7, "responses": [{"type": "READ_RESPONSE", "size": 4}]}
+```
+
+---
+
 ### Supported Request Types
 
 - `PING`  
@@ -236,6 +264,8 @@ Response:
 
     Additional Fields:
     - `value` (`string`): A base64 string representing the read data
+    - `size` (`int`): The number of bytes read, instead of `value` if the
+    message asked for binary data
 
 - `WRITE_RESPONSE`  
     Acknowledges `WRITE`.
@@ -320,6 +350,17 @@ end
 
 local message_queue = new_queue()
 
+local unpack = table.unpack or unpack
+
+function bytes_to_string (bytes)
+    local chunks = {}
+    -- string.char takes every byte as an argument, so convert in chunks to stay below the argument limit
+    for i = 1, #bytes, 4096 do
+        chunks[#chunks + 1] = string.char(unpack(bytes, i, math.min(i + 4095, #bytes)))
+    end
+    return table.concat(chunks)
+end
+
 function lock ()
     locked = true
     client_socket:settimeout(2)
@@ -418,7 +459,8 @@ request_handlers = {
         local res = {}
 
         res["type"] = "READ_RESPONSE"
-        res["value"] = base64.encode(memory.read_bytes_as_array(req["address"], req["size"], req["domain"]))
+        -- Encoded in send_receive, depending on whether the message asked for binary data
+        res["value"] = memory.read_bytes_as_array(req["address"], req["size"], req["domain"])
 
         return res
     end,
@@ -469,6 +511,7 @@ function process_request (req)
 end
 
 -- Receive data from AP client and send message back
+-- Returns true if a message was handled
 function send_receive ()
     local message, err = client_socket:receive()
 
@@ -478,15 +521,15 @@ function send_receive ()
             print("Connection to client closed")
         end
         current_state = STATE_NOT_CONNECTED
-        return
+        return false
     elseif err == "timeout" then
         unlock()
-        return
+        return false
     elseif err ~= nil then
         print(err)
         current_state = STATE_NOT_CONNECTED
         unlock()
-        return
+        return false
     end
 
     -- Reset timeout timer
@@ -502,6 +545,14 @@ function send_receive ()
     else
         local res = {}
         local data = json.decode(message)
+        local id = nil
+        local binary = false
+        if data["requests"] ~= nil then
+            id = data["id"]
+            binary = data["binary"] == true
+            data = data["requests"]
+        end
+
         local failed_guard_response = nil
         for i, req in ipairs(data) do
             if failed_guard_response ~= nil then
@@ -523,8 +574,27 @@ function send_receive ()
             end
         end
 
-        client_socket:send(json.encode(res).."\n")
+        local payload = {}
+        for i, response in ipairs(res) do
+            if response["type"] == "READ_RESPONSE" then
+                if binary then
+                    payload[#payload + 1] = bytes_to_string(response["value"])
+                    response["size"] = #response["value"]
+                    response["value"] = nil
+                else
+                    response["value"] = base64.encode(response["value"])
+                end
+            end
+        end
+
+        if id ~= nil then
+            client_socket:send(json.encode({id = id, responses = res}).."\n"..table.concat(payload))
+        else
+            client_socket:send(json.encode(res).."\n")
+        end
     end
+
+    return true
 end
 
 function initialize_server ()
@@ -590,9 +660,10 @@ function main ()
                 end
             end
         else
+            -- Handle every message that has arrived, so pipelined messages don't each wait for another frame
             repeat
-                send_receive()
-            until not locked
+                local received = send_receive()
+            until not locked and not received
 
             if timeout_timer <= 0 then
                 print("Client timed out")
@@ -22,24 +22,22 @@ __all__ = [
 
 no_gui = False
 skip_autosave = False
-_world_settings_name_cache: Dict[str, str] = {}  # TODO: cache on disk and update when worlds change
+_world_settings_name_cache: Dict[str, str] = {}  # settings key -> game, from the world index
 _world_settings_name_cache_updated = False
 _lock = Lock()
 
 
 def _update_cache() -> None:
-    """Load all worlds and update world_settings_name_cache"""
+    """Update world_settings_name_cache from the world index, without importing the worlds"""
     global _world_settings_name_cache_updated
     if _world_settings_name_cache_updated:
         return
 
     try:
-        from worlds.AutoWorld import AutoWorldRegister
-        for world in AutoWorldRegister.world_types.values():
-            annotation = world.__annotations__.get("settings", None)
-            if annotation is None or annotation == "ClassVar[Optional['Group']]":
-                continue
-            _world_settings_name_cache[world.settings_key] = f"{world.__module__}.{world.__name__}"
+        from worlds import world_info
+        for info in world_info.values():
+            if info.has_settings:
+                _world_settings_name_cache[info.settings_key] = info.game
     finally:
         _world_settings_name_cache_updated = True
 
@@ -586,6 +584,12 @@ class ServerOptions(Group):
         OFF = 0
         ON = 1
 
+    class DataStorageValueLimit(int):
+        """Largest size in bytes a data storage key and its value may have when encoded, 0 for no limit"""
+
+    class DataStorageLimit(int):
+        """Largest size in bytes all data storage keys and values together may have when encoded, 0 for no limit"""
+
     host: Optional[str] = None
     port: int = 38281
     password: Optional[str] = None
@@ -603,6 +607,8 @@ class ServerOptions(Group):
     auto_shutdown: AutoShutdown = AutoShutdown(0)
     compatibility: Compatibility = Compatibility(2)
     log_network: LogNetwork = LogNetwork(0)
+    data_storage_value_limit: DataStorageValueLimit = DataStorageValueLimit(0)
+    data_storage_limit: DataStorageLimit = DataStorageLimit(0)
 
 
 class GeneratorOptions(Group):
@@ -662,6 +668,32 @@ class GeneratorOptions(Group):
         start_inventory -> Move remaining items to start_inventory, generate additional filler items to fill locations.
         """
 
+    class CacheExploration(Bool):
+        """
+        Keep exploration states between placements of the progression fill instead of rebuilding them every step.
+        Results are the same, generation of big multiworlds is faster, but uses more memory.
+        """
+
+    class ReachabilityThreads(int):
+        """
+        Threads to update region reachability of worlds that support incremental reachability with, 1 to disable.
+        Such worlds don't depend on each other, so they can be updated in parallel. This only uses multiple cores on
+        free-threaded Python builds.
+        """
+
+    class OutputProcesses(int):
+        """
+        Processes to run output jobs of worlds that support them with, 1 to run them in the output threads instead.
+        This lets CPU-bound patching of many worlds use multiple cores.
+        """
+
+    class RollProcesses(int):
+        """
+        Processes to roll the options of player files with, 1 to roll them in the generator process instead.
+        Each player file is rolled with its own seed derived from the generation seed, so results are the same either
+        way.
+        """
+
     enemizer_path: EnemizerPath = EnemizerPath("EnemizerCLI/EnemizerCLI.Core")  # + ".exe" is implied on Windows
     player_files_path: PlayerFilesPath = PlayerFilesPath("Players")
     players: Players = Players(0)
@@ -671,6 +703,10 @@ class GeneratorOptions(Group):
     race: Race = Race(0)
     plando_options: PlandoOptions = PlandoOptions("bosses, connections, texts")
     panic_method: PanicMethod = PanicMethod("swap")
+    cache_exploration: Union[CacheExploration, bool] = False
+    reachability_threads: ReachabilityThreads = ReachabilityThreads(1)
+    output_processes: OutputProcesses = OutputProcesses(1)
+    roll_processes: RollProcesses = RollProcesses(1)
 
 
 class SNIOptions(Group):
@@ -737,9 +773,13 @@ class Settings(Group):
             if key not in _world_settings_name_cache:
                 # not a world group
                 return super().__getattribute__(key)
-            # directly import world and grab settings class
-            world_mod, world_cls_name = _world_settings_name_cache[key].rsplit(".", 1)
-            world = cast(type, getattr(__import__(world_mod, fromlist=[world_cls_name]), world_cls_name))
+            # import only this world and grab settings class
+            from worlds.AutoWorld import AutoWorldRegister
+            world = AutoWorldRegister.world_types.get(_world_settings_name_cache[key], None)
+            if world is None:
+                # world failed to load, keep its section as is
+                return super().__getattribute__(key)
+            world_mod, world_cls_name = world.__module__, world.__name__
             assert getattr(world, "settings_key") == key
             try:
                 cls_or_name = world.__annotations__["settings"]
@@ -850,6 +890,12 @@ def get_settings() -> Settings:
             for location in locations:
                 try:
                     res = Settings(location)
+                    if res.changed and not skip_autosave:
+                        # update an outdated file now, saving it on exit imports worlds, which may fail during shutdown
+                        try:
+                            res.save()
+                        except OSError as e:
+                            warnings.warn(f"Could not update {location}: {e}")
                     break
                 except FileNotFoundError:
                     continue
@@ -0,0 +1,45 @@
+def run_data_storage_benchmark():
+    """Times Set throughput of the server's data storage for typical client and tracker usage."""
+    import logging
+
+    from time_it import TimeIt
+
+    from Utils import init_logging
+    from DataStorage import DataStorage
+
+    init_logging("Benchmark Runner")
+    logger = logging.getLogger("Benchmark")
+
+    class Subscriber:
+        pass
+
+    sets = 100000
+    storage = DataStorage(value_limit=1024 * 1024, limit=64 * 1024 * 1024)
+    subscribers = [Subscriber() for _ in range(100)]
+    for number, subscriber in enumerate(subscribers):
+        storage.subscribe(subscriber, f"slot_{number}_*")
+        storage.subscribe(subscriber, f"counter_{number}")
+
+    with TimeIt(f"{sets} counter Sets", logger):
+        for number in range(sets):
+            key = f"counter_{number % 100}"
+            storage.set(key, 0, [{"operation": "add", "value": 1}])
+            storage.get_subscribers(key)
+
+    with TimeIt(f"{sets} dict update Sets on 100 keys", logger):
+        for number in range(sets):
+            key = f"slot_{number % 100}_locations"
+            storage.set(key, {}, [{"operation": "update", "value": {str(number % 1000): number}}])
+            storage.get_subscribers(key)
+
+    with TimeIt(f"{sets // 10} list appends in 10 operations each", logger):
+        for number in range(sets // 10):
+            storage.set("log", [], [{"operation": "add", "value": [number]}] * 10)
+            if number % 100 == 0:
+                storage.take_dirty()
+
+
+if __name__ == "__main__":
+    from path_change import change_home
+    change_home()
+    run_data_storage_benchmark()
@@ -3,6 +3,9 @@ def run_load_worlds_benchmark():
     Note that any first-time imports will be attributed to that world, as it is cached afterwards.
     Likely best used with isolated worlds to measure their time alone."""
     import logging
+    import subprocess
+    import sys
+    import tempfile
 
     from Utils import init_logging
 
@@ -12,14 +15,32 @@ def run_load_worlds_benchmark():
 
     import BaseClasses, Launcher, Fill
 
-    from worlds import world_sources
+    from worlds import load_all_worlds, world_sources
 
     init_logging("Benchmark Runner")
     logger = logging.getLogger("Benchmark")
 
+    load_all_worlds()
     for module in world_sources:
         logger.info(f"{module} took {module.time_taken:.4f} seconds.")
 
+    # startup of a fresh process, which only imports worlds that are new or changed since the world index was written
+    startup = ("import sys, time\n"
+               "import ModuleUpdate\n"
+               "ModuleUpdate.update_ran = True  # dependencies were checked by this process already\n"
+               "start = time.perf_counter()\n"
+               "import Utils\n"
+               "Utils.cache_path.cached_path = sys.argv[1]\n"
+               "import worlds\n"
+               "print(f'{time.perf_counter() - start:.4f} seconds, '\n"
+               "      f'{len(worlds.AutoWorldRegister.world_types.loaded)} of '\n"
+               "      f'{len(worlds.AutoWorldRegister.world_types)} worlds imported')\n")
+    with tempfile.TemporaryDirectory() as cache_dir:
+        for name in ("without world index", "with world index"):
+            result = subprocess.run([sys.executable, "-c", startup, cache_dir], stdin=subprocess.DEVNULL,
+                                    capture_output=True, text=True, check=True)
+            logger.info(f"Importing worlds {name} took {result.stdout.strip().splitlines()[-1]}.")
+
 
 if __name__ == "__main__":
     from path_change import change_home
@@ -0,0 +1,49 @@
+def run_location_store_benchmark():
+    """Times receiver lookups of both LocationStore implementations on a large synthetic multiworld."""
+    import logging
+    import random
+
+    from time_it import TimeIt
+
+    from Utils import init_logging
+    from NetUtils import LocationStore, _LocationStore
+
+    init_logging("Benchmark Runner")
+    logger = logging.getLogger("Benchmark")
+
+    players = 1000
+    locations_per_player = 300
+    items_per_player = 50
+    lookups = 1000
+
+    rng = random.Random(0)
+    locations = {
+        sender: {
+            location: (rng.randrange(items_per_player), rng.randint(1, players), 0)
+            for location in range(locations_per_player)
+        }
+        for sender in range(1, players + 1)
+    }
+    receivers = [rng.randint(1, players) for _ in range(lookups)]
+    item_ids = [rng.randrange(items_per_player) for _ in range(lookups)]
+
+    store_types = [_LocationStore]
+    if LocationStore is not _LocationStore:
+        store_types.append(LocationStore)
+    for store_type in store_types:
+        name = f"{store_type.__module__}.{store_type.__name__}"
+        with TimeIt(f"{name} load of {players * locations_per_player} locations", logger):
+            store = store_type(locations)
+        with TimeIt(f"{name} {lookups} find_item", logger):
+            for receiver, item_id in zip(receivers, item_ids):
+                for _ in store.find_item({receiver}, item_id):
+                    pass
+        with TimeIt(f"{name} {lookups} get_for_player", logger):
+            for receiver in receivers:
+                store.get_for_player(receiver)
+
+
+if __name__ == "__main__":
+    from path_change import change_home
+    change_home()
+    run_location_store_benchmark()
@@ -2,7 +2,7 @@ from argparse import Namespace
 from typing import List, Optional, Tuple, Type, Union
 
 from BaseClasses import CollectionState, Item, ItemClassification, Location, MultiWorld, Region
-from worlds import network_data_package
+from worlds import WorldInfo, network_data_package, world_info
 from worlds.AutoWorld import World, call_all
 
 gen_steps = ("generate_early", "create_regions", "create_items", "set_rules", "generate_basic", "pre_fill")
@@ -63,6 +63,7 @@ class TestWorld(World):
 
 # add our test world to the data package, so we can test it later
 network_data_package["games"][TestWorld.game] = TestWorld.get_data_package_data()
+world_info[TestWorld.game] = WorldInfo.from_world(TestWorld)
 
 
 def generate_test_multiworld(players: int = 1) -> MultiWorld:
@@ -0,0 +1,68 @@
+import unittest
+
+from BaseClasses import CollectionState, Item, ItemClassification, Region
+from . import generate_test_multiworld
+
+
+class TestCollectionStateCopy(unittest.TestCase):
+    def setUp(self) -> None:
+        self.multiworld = generate_test_multiworld(2)
+        for player in self.multiworld.player_ids:
+            gate = Region("Gate", player, self.multiworld)
+            self.multiworld.regions.append(gate)
+            self.multiworld.get_region("Menu", player).connect(
+                gate, rule=lambda state, player_=player: state.has("Key", player_))
+        self.state = CollectionState(self.multiworld)
+        self.gates = [self.multiworld.get_region("Gate", player) for player in self.multiworld.player_ids]
+
+    def key(self, player: int) -> Item:
+        return Item("Key", ItemClassification.progression, None, player)
+
+    def test_copy_is_independent(self) -> None:
+        """Changes to a copy must not leak into the original state and the other way around."""
+        self.assertFalse(self.gates[0].can_reach(self.state))
+        copied = self.state.copy()
+        copied.collect(self.key(1))
+        self.assertTrue(self.gates[0].can_reach(copied))
+        self.assertFalse(self.gates[0].can_reach(self.state))
+        self.assertEqual(self.state.count("Key", 1), 0)
+
+        self.state.collect(self.key(2))
+        self.assertTrue(self.gates[1].can_reach(self.state))
+        self.assertFalse(self.gates[1].can_reach(copied))
+        self.assertEqual(copied.count("Key", 2), 0)
+
+    def test_copy_shares_untouched_players(self) -> None:
+        self.gates[0].can_reach(self.state)
+        self.gates[1].can_reach(self.state)
+        copied = self.state.copy()
+        copied.collect(self.key(1))
+        self.gates[0].can_reach(copied)
+        self.assertIsNot(copied.prog_items[1], self.state.prog_items[1])
+        self.assertIsNot(copied.reachable_regions[1], self.state.reachable_regions[1])
+        self.assertIs(copied.prog_items[2], self.state.prog_items[2])
+        self.assertIs(copied.reachable_regions[2], self.state.reachable_regions[2])
+
+    def test_sweep_keeps_untouched_players_shared(self) -> None:
+        self.gates[0].can_reach(self.state)
+        self.gates[1].can_reach(self.state)
+        copied = self.state.copy()
+        self.assertFalse(any(copied.stale.values()), "a copy is as up to date as its origin")
+        copied.collect(self.key(1))
+        # makes player 2 stale without unlocking anything, so updating their regions changes nothing
+        copied.collect(Item("Junk", ItemClassification.filler, None, 2), True)
+        copied.sweep_for_events()
+        for player in self.multiworld.player_ids:
+            copied.update_reachable_regions(player)
+        self.assertTrue(self.gates[0].can_reach(copied))
+        self.assertIsNot(copied.reachable_regions[1], self.state.reachable_regions[1])
+        self.assertIs(copied.reachable_regions[2], self.state.reachable_regions[2])
+        self.assertIs(copied.blocked_connections[2], self.state.blocked_connections[2])
+        self.assertIs(copied.blocked_dependencies[2], self.state.blocked_dependencies[2])
+
+    def test_remove_from_copy(self) -> None:
+        self.state.collect(self.key(1))
+        copied = self.state.copy()
+        copied.remove(self.key(1))
+        self.assertFalse(self.gates[0].can_reach(copied))
+        self.assertTrue(self.gates[0].can_reach(self.state))
@@ -463,6 +463,53 @@ class TestFillRestrictive(unittest.TestCase):
         self.assertEqual(1, len(player1.prog_items))
         self.assertIsNot(loc0.item, player1.prog_items[0], "Filled item was still present in item pool")
 
+    def test_single_player_placement(self):
+        """Test that single player placement keeps items in their own world and removes only the filled locations"""
+        multiworld = generate_test_multiworld(2)
+        player1 = generate_player_data(multiworld, 1, 3, 2)
+        player2 = generate_player_data(multiworld, 2, 3, 1)
+        locations = player2.locations + player1.locations
+        item_pool = player1.prog_items + player2.prog_items
+
+        fill_restrictive(multiworld, multiworld.state, locations, item_pool, single_player_placement=True)
+
+        self.assertEqual([], item_pool)
+        for player in (player1, player2):
+            for item in player.prog_items:
+                self.assertEqual(player.id, item.location.player)
+        self.assertEqual(3, len(locations))
+        self.assertTrue(all(location.item is None for location in locations))
+        self.assertEqual([location for location in player2.locations + player1.locations if not location.item],
+                         locations)
+
+    def test_cached_exploration_fill(self):
+        """Test that caching exploration states places exactly like rebuilding them every step"""
+        def fill(cache_exploration: bool) -> List[str]:
+            multiworld = generate_test_multiworld(3)
+            players = [generate_player_data(multiworld, player, 8, 12) for player in multiworld.player_ids]
+            for player in players:
+                other = players[player.id % len(players)]
+                items = player.prog_items
+                region = player.menu
+                for step in range(5):
+                    region = player.generate_region(
+                        region, 2, lambda state, items_=items[2 * step:2 * step + 2], player_=player.id,
+                        other_item=other.prog_items[step].name, other_player=other.id:
+                        state.has_all(names(items_), player_) or state.has(other_item, other_player))
+                event = Location(player.id, f"player{player.id}_event", None, region)
+                event.place_locked_item(Item(f"player{player.id}_event_item", ItemClassification.progression,
+                                             None, player.id))
+                region.locations.append(event)
+                player.generate_region(region, 2, lambda state, player_=player.id:
+                                       state.has(f"player{player_}_event_item", player_))
+            item_pool = [item for player in players for item in player.prog_items]
+            fill_restrictive(multiworld, multiworld.state, multiworld.get_unfilled_locations(), item_pool,
+                             swap=False, cache_exploration=cache_exploration)
+            self.assertEqual([], item_pool)
+            return [f"{location.name}: {location.item.name}" for location in multiworld.get_filled_locations()]
+
+        self.assertEqual(fill(False), fill(True))
+
 
 class TestDistributeItemsRestrictive(unittest.TestCase):
     def test_basic_distribute(self):
@@ -0,0 +1,38 @@
+import unittest
+
+from BaseClasses import CollectionState, Item, ItemClassification, Location, Region
+from Profiler import GenerationProfiler
+from worlds.generic.Rules import add_rule
+from . import generate_test_multiworld
+
+
+class TestGenerationProfiler(unittest.TestCase):
+    def setUp(self) -> None:
+        self.multiworld = generate_test_multiworld()
+        self.profiler = self.multiworld.profiler = GenerationProfiler()
+        menu = self.multiworld.get_region("Menu", 1)
+        gate = Region("Gate", 1, self.multiworld)
+        self.multiworld.regions.append(gate)
+        menu.connect(gate, "Door", lambda state: state.has("Key", 1))
+        self.location = Location(1, "Chest", 1, gate)
+        gate.locations.append(self.location)
+
+    def test_rule_calls(self) -> None:
+        self.profiler.wrap_rules(self.multiworld)
+        add_rule(self.location, lambda state: True)
+        self.profiler.wrap_rules(self.multiworld)
+        state = CollectionState(self.multiworld)
+        state.collect(Item("Key", ItemClassification.progression, None, 1))
+        self.assertTrue(self.location.can_reach(state))
+
+        rules = {(rule["type"], rule["name"]): rule["calls"]
+                 for rule in self.profiler.get_report(self.multiworld)["rules"]}
+        self.assertEqual(rules, {("entrance", "Door"): 1, ("location", "Chest"): 1})
+
+    def test_counters(self) -> None:
+        state = CollectionState(self.multiworld)
+        state.copy()
+        state.sweep_for_events()
+        counters = self.profiler.get_report(self.multiworld)["counters"]
+        self.assertEqual(counters["CollectionState.copy"], 1)
+        self.assertGreaterEqual(counters["CollectionState.sweep_for_events"], 1)
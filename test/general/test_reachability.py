@@ -1,8 +1,12 @@
+import random
 import unittest
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Set, Tuple
 
-from BaseClasses import CollectionState
+from BaseClasses import CollectionState, Item, ItemClassification, Location, MultiWorld, Region, TrackedItemCounter
+from Fill import fill_restrictive
 from worlds.AutoWorld import AutoWorldRegister
-from . import setup_solo_multiworld
+from . import generate_test_multiworld, setup_solo_multiworld
 
 
 class TestBase(unittest.TestCase):
@@ -69,3 +73,136 @@ class TestBase(unittest.TestCase):
                             locations.add(location)
                     self.assertGreater(len(locations), 0,
                                        msg="Need to be able to reach at least one location to get started.")
+
+
+class TestIncrementalReachability(unittest.TestCase):
+    """Incremental reachability has to agree with the full re-evaluation of reachable regions and events."""
+    item_names = [f"Item {i}" for i in range(12)]
+
+    def create_multiworld(self, incremental: bool, seed: int, players: int = 1) -> MultiWorld:
+        multiworld = generate_test_multiworld(players)
+        rng = random.Random(seed)
+        for player in multiworld.player_ids:
+            multiworld.worlds[player].incremental_reachability = incremental
+            regions: List[Region] = [multiworld.get_region("Menu", player)]
+            for i in range(40):
+                region = Region(f"Region {i}", player, multiworld)
+                multiworld.regions.append(region)
+                regions.append(region)
+            event_names = []
+            for i, region in enumerate(regions[1:]):
+                if rng.random() < 0.3:
+                    location = Location(player, f"Event {i}", None, region)
+                    required = tuple(rng.sample(self.item_names, rng.randint(0, 2)))
+                    location.access_rule = lambda state, names=required, player_=player: state.has_all(names, player_)
+                    location.place_locked_item(Item(f"Event Item {i}", ItemClassification.progression, None, player))
+                    region.locations.append(location)
+                    event_names.append(location.item.name)
+            for i in range(80):
+                source, target = rng.sample(regions, 2)
+                required = tuple(rng.sample(self.item_names + event_names, rng.randint(0, 2)))
+                source.connect(target, f"Connection {i}",
+                               lambda state, names=required, player_=player: state.has_all(names, player_))
+            gate = regions[1].connect(regions[2], "Gate",
+                                      lambda state, player_=player: state.can_reach("Region 5", "Region", player_))
+            multiworld.register_indirect_condition(regions[6], gate)
+        return multiworld
+
+    @staticmethod
+    def reached(multiworld: MultiWorld, state: CollectionState) -> Tuple[Set[str], Set[str]]:
+        return ({str(region) for region in multiworld.get_regions() if region.can_reach(state)},
+                {str(location) for location in state.events})
+
+    def test_matches_full_update(self) -> None:
+        for seed in range(10):
+            with self.subTest(seed=seed):
+                full_multiworld = self.create_multiworld(False, seed)
+                incremental_multiworld = self.create_multiworld(True, seed)
+                full_state = CollectionState(full_multiworld)
+                incremental_state = CollectionState(incremental_multiworld)
+                full_state.sweep_for_events()
+                incremental_state.sweep_for_events()
+                self.assertEqual(self.reached(full_multiworld, full_state),
+                                 self.reached(incremental_multiworld, incremental_state))
+                names = self.item_names.copy()
+                random.Random(seed).shuffle(names)
+                for name in names:
+                    full_state.collect(Item(name, ItemClassification.progression, None, 1))
+                    incremental_state = incremental_state.copy()
+                    incremental_state.collect(Item(name, ItemClassification.progression, None, 1))
+                    self.assertEqual(self.reached(full_multiworld, full_state),
+                                     self.reached(incremental_multiworld, incremental_state), name)
+                removed = Item(names[0], ItemClassification.progression, None, 1)
+                full_state.remove(removed)
+                incremental_state.remove(removed)
+                self.assertEqual(self.reached(full_multiworld, full_state),
+                                 self.reached(incremental_multiworld, incremental_state))
+
+    def test_parallel_update(self) -> None:
+        """Updating independent players on a reachability executor has to match updating them one by one."""
+        with ThreadPoolExecutor(4) as executor:
+            for seed in range(5):
+                with self.subTest(seed=seed):
+                    serial_multiworld = self.create_multiworld(True, seed, 3)
+                    parallel_multiworld = self.create_multiworld(True, seed, 3)
+                    parallel_multiworld.reachability_executor = executor
+                    serial_state = CollectionState(serial_multiworld)
+                    parallel_state = CollectionState(parallel_multiworld)
+                    for name in self.item_names:
+                        for player in serial_multiworld.player_ids:
+                            serial_state.collect(Item(name, ItemClassification.progression, None, player), True)
+                            parallel_state.collect(Item(name, ItemClassification.progression, None, player), True)
+                        serial_state.sweep_for_events()
+                        parallel_state.sweep_for_events()
+                        self.assertEqual(self.reached(serial_multiworld, serial_state),
+                                         self.reached(parallel_multiworld, parallel_state), name)
+
+    def test_parallel_fill(self) -> None:
+        """The sweeps of fill_restrictive update all stale players together on the reachability executor."""
+        batches: List[List[int]] = []
+
+        class RecordingExecutor(ThreadPoolExecutor):
+            def map(self, fn, *iterables, **kwargs):
+                players = list(iterables[0])
+                batches.append(players)
+                return super().map(fn, players, **kwargs)
+
+        multiworld = self.create_multiworld(True, 0, 3)
+        for player in multiworld.player_ids:
+            menu = multiworld.get_region("Menu", player)
+            menu.locations += [Location(player, f"Spot {i}", 1000 + i, menu) for i in range(len(self.item_names))]
+        item_pool = [Item(name, ItemClassification.progression, None, player)
+                     for player in multiworld.player_ids for name in self.item_names]
+        with RecordingExecutor(3) as executor:
+            multiworld.reachability_executor = executor
+            fill_restrictive(multiworld, CollectionState(multiworld), multiworld.get_unfilled_locations(), item_pool)
+        self.assertEqual(item_pool, [])
+        self.assertTrue(any(len(players) == 3 for players in batches), batches)
+
+    def test_worlds_match_full_update(self) -> None:
+        """Worlds that opt into incremental reachability have to reach the same as without it."""
+        for game_name, world_type in AutoWorldRegister.world_types.items():
+            if not world_type.incremental_reachability:
+                continue
+            with self.subTest(game=game_name):
+                multiworld = setup_solo_multiworld(world_type)
+                world = multiworld.worlds[1]
+                world.incremental_reachability = False
+                full_state = CollectionState(multiworld)
+                del world.incremental_reachability
+                incremental_state = CollectionState(multiworld)
+                self.assertIsInstance(incremental_state.prog_items[1], TrackedItemCounter)
+
+                def reached(state: CollectionState) -> Tuple[Tuple[Set[str], Set[str]], Set[str]]:
+                    state.sweep_for_events()
+                    return (self.reached(multiworld, state),
+                            {str(location) for location in multiworld.get_locations() if location.can_reach(state)})
+
+                self.assertEqual(reached(full_state), reached(incremental_state))
+                items = [item for item in multiworld.itempool if item.advancement]
+                random.Random(0).shuffle(items)
+                for item in items:
+                    full_state.collect(item, True)
+                    incremental_state = incremental_state.copy()
+                    incremental_state.collect(item, True)
+                    self.assertEqual(reached(full_state), reached(incremental_state), item.name)
@@ -0,0 +1,66 @@
+import unittest
+from unittest import mock
+
+from BaseClasses import CollectionState, Item, ItemClassification, Location, Region
+from . import generate_test_multiworld
+
+
+class TestSpheres(unittest.TestCase):
+    def setUp(self) -> None:
+        self.multiworld = generate_test_multiworld()
+        self.multiworld.cache_spheres = True
+        menu = self.multiworld.get_region("Menu", 1)
+        gate = Region("Gate", 1, self.multiworld)
+        self.multiworld.regions.append(gate)
+        menu.connect(gate, rule=lambda state: state.has("Key", 1))
+        self.outside = Location(1, "Outside", 1, menu)
+        self.inside = Location(1, "Inside", 2, gate)
+        menu.locations.append(self.outside)
+        gate.locations.append(self.inside)
+        self.key = Item("Key", ItemClassification.progression, 1, 1)
+        self.filler = Item("Filler", ItemClassification.filler, 2, 1)
+        self.multiworld.completion_condition[1] = lambda state: state.has("Key", 1)
+
+    def test_spheres_cached_until_items_move(self) -> None:
+        self.multiworld.push_item(self.outside, self.key, False)
+        self.multiworld.push_item(self.inside, self.filler, False)
+        self.assertEqual(list(self.multiworld.get_spheres()), [{self.outside}, {self.inside}])
+        self.assertIs(self.multiworld.get_sphere_data(), self.multiworld.get_sphere_data())
+        self.assertTrue(self.multiworld.fulfills_accessibility())
+
+        self.outside.item, self.inside.item = None, None
+        self.multiworld.push_item(self.outside, self.filler, False)
+        self.multiworld.push_item(self.inside, self.key, False)
+        self.assertEqual(list(self.multiworld.get_spheres()), [{self.outside}, set(), {self.inside}])
+        self.assertFalse(self.multiworld.fulfills_accessibility())
+
+    def test_accessibility_uses_cached_walk(self) -> None:
+        self.multiworld.push_item(self.outside, self.key, False)
+        self.multiworld.push_item(self.inside, self.filler, False)
+        with mock.patch.object(self.multiworld, "_walk_spheres", wraps=self.multiworld._walk_spheres) as walk, \
+                mock.patch.object(self.multiworld, "get_sphere_data",
+                                  wraps=self.multiworld.get_sphere_data) as get_sphere_data:
+            self.multiworld.get_sphere_data()
+            self.assertTrue(self.multiworld.fulfills_accessibility())
+            self.assertEqual(get_sphere_data.call_count, 2)
+            walk.assert_called_once_with(False)
+
+            # a supplied state has to be swept from
+            self.assertTrue(self.multiworld.fulfills_accessibility(CollectionState(self.multiworld)))
+            self.assertEqual(get_sphere_data.call_count, 2)
+
+    def test_states_only_for_advancement_walk(self) -> None:
+        self.multiworld.push_item(self.outside, self.key, False)
+        self.multiworld.push_item(self.inside, self.filler, False)
+        self.assertEqual(self.multiworld.get_sphere_data(True).states, [])
+        self.assertEqual(len(self.multiworld.get_sphere_data().states), 3)
+
+    def test_spheres_follow_classification(self) -> None:
+        self.multiworld.push_item(self.outside, self.key, False)
+        self.multiworld.push_item(self.inside, self.filler, False)
+        self.assertTrue(self.multiworld.fulfills_accessibility())
+        self.key.classification = ItemClassification.useful
+        sphere_data = self.multiworld.get_sphere_data()
+        self.assertEqual(sphere_data.spheres, [{self.outside}])
+        self.assertEqual(sphere_data.unreachable, {self.inside})
+        self.assertFalse(self.multiworld.fulfills_accessibility())
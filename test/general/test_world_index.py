@@ -0,0 +1,62 @@
+import os
+import sys
+import tempfile
+import unittest
+import zipfile
+
+from worlds import WorldInfo, WorldSource, _source_worlds, world_info
+from worlds.AutoWorld import AutoWorldRegister, WorldTypes
+
+
+class TestWorldTypes(unittest.TestCase):
+    def test_lazy_lookup(self) -> None:
+        world_types = WorldTypes()
+        loads = []
+
+        def load() -> None:
+            loads.append("Lazy Game")
+            world_types["Lazy Game"] = AutoWorldRegister
+
+        world_types.register_lazy("Lazy Game", load)
+        world_types.register_lazy("Broken Game", lambda: None)
+        self.assertEqual(list(world_types), ["Lazy Game", "Broken Game"])
+        self.assertEqual(len(world_types), 2)
+        self.assertEqual(loads, [], "listing games should not import worlds")
+
+        self.assertIs(world_types["Lazy Game"], AutoWorldRegister)
+        self.assertIs(world_types["Lazy Game"], AutoWorldRegister)
+        self.assertEqual(loads, ["Lazy Game"], "worlds should only be imported once")
+        self.assertNotIn("Broken Game", world_types)
+        self.assertEqual(list(world_types.items()), [("Lazy Game", AutoWorldRegister)])
+        with self.assertRaises(KeyError):
+            world_types["Unknown Game"]
+
+
+class TestWorldIndex(unittest.TestCase):
+    def test_world_info(self) -> None:
+        """The world info read from the index has to match the worlds once they are imported."""
+        for game_name, info in world_info.items():
+            with self.subTest(game_name):
+                self.assertEqual(info, WorldInfo.from_world(AutoWorldRegister.world_types[game_name]))
+
+    def test_source_importing_another_world(self) -> None:
+        """A source that imports another world must not be credited with that world's game."""
+        alttp_world = AutoWorldRegister.world_types["A Link to the Past"]
+        with tempfile.TemporaryDirectory() as temp_dir:
+            path = os.path.join(temp_dir, "importing_world.apworld")
+            with zipfile.ZipFile(path, "w") as apworld:
+                apworld.writestr("importing_world/__init__.py",
+                                 "from worlds.alttp import ALTTPWorld\n"
+                                 "from worlds.AutoWorld import World\n"
+                                 "class ImportingWorld(World):\n"
+                                 "    game = 'Importing World'\n"
+                                 "    item_name_to_id = {}\n"
+                                 "    location_name_to_id = {}\n")
+            source = WorldSource(path, is_zip=True, relative=False)
+            try:
+                self.assertTrue(source.load())
+                self.assertEqual([world.game for world in _source_worlds(source)], ["Importing World"])
+            finally:
+                del AutoWorldRegister.world_types["Importing World"]
+                sys.modules.pop("worlds.importing_world", None)
+        self.assertIn(alttp_world, _source_worlds(WorldSource("alttp")))
@@ -1,6 +1,6 @@
 import sys
 from pathlib import Path
-from typing import TYPE_CHECKING
+from typing import TYPE_CHECKING, Optional, Sequence
 
 if TYPE_CHECKING:
     from threading import Event
@@ -17,7 +17,7 @@ class ServeGame:
     address: str
 
 
-def _launch_multiserver(multidata: Path, ready: "Event", stop: "Event") -> None:
+def _launch_multiserver(multidata: Path, ready: "Event", stop: "Event", args: Sequence[str] = ()) -> None:
     import os
     import warnings
 
@@ -28,7 +28,7 @@ def _launch_multiserver(multidata: Path, ready: "Event", stop: "Event") -> None:
         import asyncio
         from MultiServer import main, parse_args
 
-        sys.argv = [sys.argv[0], str(multidata), "--host", "127.0.0.1"]
+        sys.argv = [sys.argv[0], str(multidata), "--host", "127.0.0.1", *args]
         r, w = os.pipe()
         sys.stdin = os.fdopen(r, "r")
 
@@ -58,12 +58,16 @@ class LocalServeGame(ServeGame):
     from multiprocessing import Process
 
     _multidata: Path
+    _port: int
+    _args: Sequence[str]
     _proc: Process
     _stop: "Event"
 
-    def __init__(self, multidata: Path) -> None:
+    def __init__(self, multidata: Path, port: int = 38281, args: Sequence[str] = ()) -> None:
         self.address = ""
         self._multidata = multidata
+        self._port = port
+        self._args = args
 
     def __enter__(self) -> "LocalServeGame":
         from multiprocessing import Manager, Process, set_start_method
@@ -77,16 +81,22 @@ class LocalServeGame(ServeGame):
         ready: "Event" = manager.Event()
         self._stop = manager.Event()
 
-        self._proc = Process(target=_launch_multiserver, args=(self._multidata, ready, self._stop))
+        self._proc = Process(target=_launch_multiserver,
+                             args=(self._multidata, ready, self._stop, ["--port", str(self._port), *self._args]))
         try:
             self._proc.start()
             ready.wait(30)
-            self.address = "localhost:38281"
+            self.address = f"localhost:{self._port}"
             return self
         except BaseException:
             self.__exit__(*sys.exc_info())
             raise
 
+    @property
+    def pid(self) -> Optional[int]:
+        """Process id of the server, for measuring its resource usage."""
+        return self._proc.pid
+
     def __exit__(self, exc_type, exc_val, exc_tb) -> None:  # type: ignore
         try:
             self._stop.set()
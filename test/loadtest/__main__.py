@@ -0,0 +1,149 @@
+# Simulates many clients playing on a local MultiServer, to size hosts and to catch server performance regressions.
+# This spawns processes and opens one socket per client, so this is not run as part of unit testing.
+# Run with `python -m test.loadtest --help` from the Archipelago folder. For thousands of clients, raise the open file
+# limit (ulimit -n) and spread the clients over multiple --processes, as a single client process is easily saturated.
+import argparse
+import os
+import sys
+import threading
+import time
+from multiprocessing import Pool, set_start_method
+from pathlib import Path
+from tempfile import TemporaryDirectory
+from typing import Dict, List, Optional, Sequence
+
+from test.hosting.generate import generate_local
+from test.hosting.serve import LocalServeGame
+from test.loadtest.client import ClientStats, Rates, read_slots, run_clients
+
+
+class ServerMonitor(threading.Thread):
+    """Samples memory and CPU time of the server process. Only available on Linux, through /proc."""
+
+    def __init__(self, pid: int, interval: float = 0.5) -> None:
+        super().__init__(name="ServerMonitor", daemon=True)
+        self.pid = pid
+        self.interval = interval
+        self.samples: List[Dict[str, float]] = []
+        self._stop_event = threading.Event()
+
+    def read(self) -> Optional[Dict[str, float]]:
+        try:
+            with open(f"/proc/{self.pid}/status") as f:
+                status = dict(line.split(":", 1) for line in f)
+            with open(f"/proc/{self.pid}/stat") as f:
+                stat = f.read().rsplit(")", 1)[1].split()
+        except OSError:
+            return None
+        return {
+            "time": time.time(),
+            "rss": int(status["VmRSS"].split()[0]) * 1024,
+            "peak_rss": int(status["VmHWM"].split()[0]) * 1024,
+            "cpu": (int(stat[11]) + int(stat[12])) / os.sysconf("SC_CLK_TCK"),  # utime + stime
+        }
+
+    def run(self) -> None:
+        while not self._stop_event.wait(self.interval):
+            sample = self.read()
+            if sample:
+                self.samples.append(sample)
+
+    def stop(self) -> None:
+        self._stop_event.set()
+        self.join()
+
+    def between(self, start: float, end: float) -> List[Dict[str, float]]:
+        return [sample for sample in self.samples if start <= sample["time"] <= end]
+
+
+def percentile(values: Sequence[float], fraction: float) -> float:
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))] if ordered else float("nan")
+
+
+def report(stats: ClientStats, args: argparse.Namespace, monitor: Optional[ServerMonitor], start: float) -> None:
+    end = start + args.duration
+    print(f"\n{len(stats.connect_times)} of {args.clients} clients connected, "
+          f"{stats.connect_failures} failed. Connect p50 {percentile(stats.connect_times, 0.5) * 1000:.1f} ms, "
+          f"p99 {percentile(stats.connect_times, 0.99) * 1000:.1f} ms")
+    print(f"\n{'traffic':<10}{'answered':>10}{'p50 ms':>10}{'p99 ms':>10}{'max ms':>10}{'unanswered':>12}")
+    for kind, latencies in stats.latencies.items():
+        if latencies or stats.unanswered[kind]:
+            print(f"{kind:<10}{len(latencies):>10}{percentile(latencies, 0.5) * 1000:>10.1f}"
+                  f"{percentile(latencies, 0.99) * 1000:>10.1f}{max(latencies, default=0) * 1000:>10.1f}"
+                  f"{stats.unanswered[kind]:>12}")
+    print(f"\nMessages per second: {stats.sent / args.duration:.0f} sent, {stats.received / args.duration:.0f} received")
+
+    if not monitor:
+        return
+    idle = monitor.between(0, start - args.ramp)
+    loaded = monitor.between(start, end)
+    if not monitor.samples:
+        print("Server memory and CPU usage are only measured on Linux")
+        return
+    mib = 1024 * 1024
+    if idle:
+        print(f"Server RSS before connecting: {idle[-1]['rss'] / mib:.1f} MiB")
+    if loaded:
+        cpu = (loaded[-1]["cpu"] - loaded[0]["cpu"]) / max(loaded[-1]["time"] - loaded[0]["time"], 1e-9)
+        print(f"Server RSS during traffic: {max(sample['rss'] for sample in loaded) / mib:.1f} MiB, "
+              f"CPU {cpu * 100:.0f}% of one core")
+    print(f"Server peak RSS: {monitor.samples[-1]['peak_rss'] / mib:.1f} MiB")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Load test a local MultiServer with simulated clients.")
+    parser.add_argument("multidata", nargs="?", type=Path,
+                        help="Multiworld to host. If omitted, one is generated with --players slots of --game.")
+    parser.add_argument("--players", type=int, default=10)
+    parser.add_argument("--game", default="Clique")
+    parser.add_argument("--clients", type=int, default=100, help="Clients to connect, spread over all slots.")
+    parser.add_argument("--processes", type=int, default=1, help="Processes to run the clients in.")
+    parser.add_argument("--ramp", type=float, default=10, help="Seconds over which the clients connect.")
+    parser.add_argument("--duration", type=float, default=30, help="Seconds of traffic to measure.")
+    parser.add_argument("--port", type=int, default=38281)
+    parser.add_argument("--checks", type=float, default=0.1, help="LocationChecks per second per client.")
+    parser.add_argument("--sets", type=float, default=0.5, help="data storage Sets per second per client.")
+    parser.add_argument("--bounces", type=float, default=0.2, help="Bounces to the own slot per second per client.")
+    parser.add_argument("--says", type=float, default=0.01, help="chat messages per second per client.")
+    parser.add_argument("--hints", type=float, default=0.02, help="hinting LocationScouts per second per client.")
+    args = parser.parse_args()
+    rates = Rates(args.checks, args.sets, args.bounces, args.says, args.hints)
+
+    try:
+        set_start_method("spawn")
+    except RuntimeError:
+        pass
+
+    with TemporaryDirectory() as tempdir:
+        multidata = args.multidata
+        if not multidata:
+            print(f"Generating {args.players} slots of {args.game}")
+            multidata = generate_local([args.game] * args.players, tempdir)
+        with Pool(max(1, args.processes)) as pool:
+            slots = pool.apply(read_slots, (multidata,))
+            print(f"Hosting {multidata} with {len(slots)} slots")
+            # the server writes its save next to the multidata
+            with LocalServeGame(multidata, args.port, ["--loglevel", "warning"]) as host:
+                monitor = ServerMonitor(host.pid) if host.pid and sys.platform == "linux" else None
+                if monitor:
+                    monitor.start()
+                start = time.time() + args.ramp + 2  # time for the workers to start
+                per_process = -(-args.clients // max(1, args.processes))
+                results = [
+                    pool.apply_async(run_clients, (host.address, slots, first, min(per_process, args.clients - first),
+                                                   args.clients, rates, start, args.ramp, args.duration))
+                    for first in range(0, args.clients, per_process)
+                ]
+                print(f"Connecting {args.clients} clients over {args.ramp:.0f} seconds, "
+                      f"then measuring for {args.duration:.0f} seconds")
+                stats = ClientStats()
+                for result in results:
+                    stats.merge(result.get())
+                if monitor:
+                    monitor.stop()
+        report(stats, args, monitor, start)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,207 @@
+import asyncio
+import json
+import random
+import time
+import uuid
+from pathlib import Path
+from typing import Any, Dict, List, NamedTuple, Sequence, Tuple
+
+__all__ = [
+    "ClientStats",
+    "Rates",
+    "read_slots",
+    "run_clients",
+]
+
+
+class Rates(NamedTuple):
+    """Messages per second each client sends of each kind of traffic."""
+    checks: float
+    sets: float
+    bounces: float
+    says: float
+    hints: float
+
+
+class ClientStats:
+    """Measurements of simulated clients, collected per worker process and merged for the report."""
+    latencies: Dict[str, List[float]]
+    """seconds from sending a message until the server answered the request following it, per kind of traffic"""
+    unanswered: Dict[str, int]
+    connect_times: List[float]
+    connect_failures: int
+    sent: int
+    """messages sent during the measurement"""
+    received: int
+    """messages received during the measurement"""
+
+    def __init__(self) -> None:
+        self.latencies = {kind: [] for kind in Rates._fields}
+        self.unanswered = {kind: 0 for kind in Rates._fields}
+        self.connect_times = []
+        self.connect_failures = 0
+        self.sent = 0
+        self.received = 0
+
+    def merge(self, other: "ClientStats") -> None:
+        for kind in Rates._fields:
+            self.latencies[kind] += other.latencies[kind]
+            self.unanswered[kind] += other.unanswered[kind]
+        self.connect_times += other.connect_times
+        self.connect_failures += other.connect_failures
+        self.sent += other.sent
+        self.received += other.received
+
+
+def read_slots(multidata: Path) -> List[Tuple[str, str]]:
+    """Name and game of each player slot in multidata. Imports MultiServer, so only call this in a subprocess."""
+    from MultiServer import Context
+    from NetUtils import SlotType
+
+    ctx = Context("", 0, "", "", 0, 0, False)
+    ctx.load(str(multidata))
+    return [(slot_info.name, slot_info.game) for slot_info in ctx.slot_info.values()
+            if slot_info.type == SlotType.player]
+
+
+async def _sleep_until(timestamp: float) -> None:
+    await asyncio.sleep(max(0.0, timestamp - time.time()))
+
+
+class _SimulatedClient:
+    """
+    Connects to one slot and sends random traffic of each kind at its rate.
+    Each message is followed by a Get in the same frame, which the server answers right after handling the message.
+    """
+    connect_timeout = 30.0
+
+    def __init__(self, address: str, name: str, game: str, rates: Rates, stats: ClientStats) -> None:
+        self.address = address
+        self.name = name
+        self.game = game
+        self.rates = rates
+        self.stats = stats
+        self.locations: List[int] = []
+        self.slot = 0
+        self.team = 0
+        self.pending: Dict[int, Tuple[str, float]] = {}
+        self.next_request = 0
+        self.measuring = False
+
+    async def run(self, connect_at: float, start: float, end: float, grace: float) -> None:
+        import websockets
+        from NetUtils import encode
+        from Utils import version_tuple
+
+        await _sleep_until(connect_at)
+        connect_start = time.time()
+        try:
+            socket = await websockets.connect(f"ws://{self.address}", ping_timeout=None, ping_interval=None,
+                                              max_size=None)
+        except (OSError, websockets.WebSocketException):
+            self.stats.connect_failures += 1
+            return
+        try:
+            try:
+                connected = await asyncio.wait_for(self._connect(socket, encode([{
+                    "cmd": "Connect", "game": self.game, "name": self.name, "password": None,
+                    "uuid": uuid.uuid4().hex, "version": version_tuple, "items_handling": 0b111,
+                    "tags": ["LoadTest"], "slot_data": False,
+                }])), self.connect_timeout)
+            except asyncio.TimeoutError:
+                connected = {}
+            if not connected:
+                self.stats.connect_failures += 1
+                return
+            self.stats.connect_times.append(time.time() - connect_start)
+            self.team, self.slot = connected["team"], connected["slot"]
+            self.locations = connected["missing_locations"] + connected["checked_locations"]
+            await socket.send(encode([{"cmd": "SetNotify", "keys": [self._storage_key()]}]))
+
+            receiver = asyncio.create_task(self._receive(socket))
+            await _sleep_until(start)
+            self.measuring = True
+            senders = [asyncio.create_task(self._send_traffic(socket, kind, rate))
+                       for kind, rate in self.rates._asdict().items() if rate > 0]
+            await _sleep_until(end)
+            for sender in senders:
+                sender.cancel()
+            self.measuring = False
+            await asyncio.sleep(grace)  # for answers of the last requests
+            receiver.cancel()
+            for kind, _ in self.pending.values():
+                self.stats.unanswered[kind] += 1
+        except websockets.ConnectionClosed:
+            pass
+        finally:
+            await socket.close()
+
+    async def _connect(self, socket: Any, connect_msg: str) -> Dict[str, Any]:
+        await socket.recv()  # RoomInfo
+        await socket.send(connect_msg)
+        while True:
+            for msg in json.loads(await socket.recv()):
+                if msg["cmd"] == "Connected":
+                    return msg
+                if msg["cmd"] == "ConnectionRefused":
+                    return {}
+
+    def _storage_key(self) -> str:
+        return f"LoadTest_{self.team}_{self.slot}"
+
+    def _make_message(self, kind: str) -> Dict[str, Any]:
+        if kind == "checks":
+            return {"cmd": "LocationChecks", "locations": [random.choice(self.locations)] if self.locations else []}
+        if kind == "sets":
+            return {"cmd": "Set", "key": self._storage_key(), "default": 0, "want_reply": False,
+                    "operations": [{"operation": "add", "value": 1}]}
+        if kind == "bounces":
+            return {"cmd": "Bounce", "slots": [self.slot], "data": {"time": time.time(), "source": self.name}}
+        if kind == "says":
+            return {"cmd": "Say", "text": f"Load test message {self.next_request}"}
+        if kind == "hints":
+            return {"cmd": "LocationScouts", "locations": [random.choice(self.locations)] if self.locations else [],
+                    "create_as_hint": 2}
+        raise ValueError(f"Unknown kind of traffic {kind}")
+
+    async def _send_traffic(self, socket: Any, kind: str, rate: float) -> None:
+        while True:
+            await asyncio.sleep(random.expovariate(rate))
+            request = self.next_request
+            self.next_request += 1
+            self.pending[request] = kind, time.time()
+            await socket.send(json.dumps([self._make_message(kind),
+                                          {"cmd": "Get", "keys": [], "load_test_request": request}]))
+            self.stats.sent += 2
+
+    async def _receive(self, socket: Any) -> None:
+        async for frame in socket:
+            received_at = time.time()
+            msgs = json.loads(frame)
+            if self.measuring:
+                self.stats.received += len(msgs)
+            for msg in msgs:
+                if msg["cmd"] == "Retrieved" and "load_test_request" in msg:
+                    kind, sent_at = self.pending.pop(msg["load_test_request"])
+                    self.stats.latencies[kind].append(received_at - sent_at)
+
+
+def run_clients(address: str, slots: Sequence[Tuple[str, str]], first_client: int, count: int, total: int,
+                rates: Rates, start: float, ramp: float, duration: float) -> ClientStats:
+    """
+    Runs clients first_client to first_client + count of total, which connect spread over ramp seconds before start
+    and then send traffic for duration seconds. Meant to be run in a worker process.
+    """
+    stats = ClientStats()
+
+    async def main() -> None:
+        clients = []
+        for number in range(first_client, first_client + count):
+            name, game = slots[number % len(slots)]
+            client = _SimulatedClient(address, name, game, rates, stats)
+            connect_at = start - ramp + ramp * number / total
+            clients.append(client.run(connect_at, start, start + duration, grace=1.0))
+        await asyncio.gather(*clients)
+
+    asyncio.run(main())
+    return stats
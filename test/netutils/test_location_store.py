@@ -3,7 +3,7 @@ import os
 import typing
 import unittest
 import warnings
-from NetUtils import LocationStore, _LocationStore
+from NetUtils import LocationChecks, LocationStore, _LocationStore
 
 State = typing.Dict[typing.Tuple[int, int], typing.Set[int]]
 RawLocations = typing.Dict[int, typing.Dict[int, typing.Tuple[int, int, int]]]
@@ -50,6 +50,14 @@ class Base:
         """Test method calls on a loaded store."""
         store: typing.Union[LocationStore, _LocationStore]
 
+        def get_state(self, checked: State) -> typing.Dict[typing.Tuple[int, int], LocationChecks]:
+            """Turns sets of checked locations into the bitmaps the store reads."""
+            state = {}
+            for (team, slot), locations in checked.items():
+                state[team, slot] = checks = LocationChecks(self.store.get_location_ids(slot))
+                checks |= locations
+            return state
+
         def test_len(self) -> None:
             self.assertEqual(len(self.store), 5)
             self.assertEqual(len(self.store[1]), 3)
@@ -117,22 +125,36 @@ class Base:
             self.assertEqual(self.store.get_for_player(1), {1: {13}, 2: {22, 23}})
 
         def test_get_checked(self) -> None:
-            self.assertEqual(self.store.get_checked(full_state, 0, 1), [11, 12, 13])
-            self.assertEqual(self.store.get_checked(one_state, 0, 1), [12])
-            self.assertEqual(self.store.get_checked(empty_state, 0, 1), [])
-            self.assertEqual(self.store.get_checked(full_state, 0, 3), [9])
+            self.assertEqual(self.store.get_checked(self.get_state(full_state), 0, 1), [11, 12, 13])
+            self.assertEqual(self.store.get_checked(self.get_state(one_state), 0, 1), [12])
+            self.assertEqual(self.store.get_checked(self.get_state(empty_state), 0, 1), [])
+            self.assertEqual(self.store.get_checked(self.get_state(full_state), 0, 3), [9])
 
         def test_get_missing(self) -> None:
-            self.assertEqual(self.store.get_missing(full_state, 0, 1), [])
-            self.assertEqual(self.store.get_missing(one_state, 0, 1), [11, 13])
-            self.assertEqual(self.store.get_missing(empty_state, 0, 1), [11, 12, 13])
-            self.assertEqual(self.store.get_missing(empty_state, 0, 3), [9])
+            self.assertEqual(self.store.get_missing(self.get_state(full_state), 0, 1), [])
+            self.assertEqual(self.store.get_missing(self.get_state(one_state), 0, 1), [11, 13])
+            self.assertEqual(self.store.get_missing(self.get_state(empty_state), 0, 1), [11, 12, 13])
+            self.assertEqual(self.store.get_missing(self.get_state(empty_state), 0, 3), [9])
 
         def test_get_remaining(self) -> None:
-            self.assertEqual(self.store.get_remaining(full_state, 0, 1), [])
-            self.assertEqual(self.store.get_remaining(one_state, 0, 1), [13, 21])
-            self.assertEqual(self.store.get_remaining(empty_state, 0, 1), [13, 21, 22])
-            self.assertEqual(self.store.get_remaining(empty_state, 0, 3), [99])
+            self.assertEqual(self.store.get_remaining(self.get_state(full_state), 0, 1), [])
+            self.assertEqual(self.store.get_remaining(self.get_state(one_state), 0, 1), [13, 21])
+            self.assertEqual(self.store.get_remaining(self.get_state(empty_state), 0, 1), [13, 21, 22])
+            self.assertEqual(self.store.get_remaining(self.get_state(empty_state), 0, 3), [99])
+
+        def test_get_location_ids(self) -> None:
+            self.assertEqual(list(self.store.get_location_ids(2)), [21, 22, 23])
+            self.assertEqual(list(self.store.get_location_ids(6)), [])
+
+        def test_many_locations(self) -> None:
+            store = type(self.store)({1: {location: (location + 1, 1, 0) for location in range(1000, 1100, 3)}})
+            checked = set(range(1000, 1100, 9)) | {1099}
+            state = {(0, 1): LocationChecks(store.get_location_ids(1))}
+            state[0, 1] |= checked
+            missing = sorted(set(range(1000, 1100, 3)) - checked)
+            self.assertEqual(store.get_checked(state, 0, 1), sorted(checked))
+            self.assertEqual(store.get_missing(state, 0, 1), missing)
+            self.assertEqual(store.get_remaining(state, 0, 1), [location + 1 for location in missing])
 
         def test_location_set_intersection(self) -> None:
             locations = {10, 11, 12}
@@ -191,6 +213,17 @@ class Base:
             self.assertEqual(len(store[1]), 0)
             self.assertEqual(len(store[2]), 1)
 
+        def test_group_receiver(self) -> None:
+            store = self.type({
+                1: {1: (10, 3, 0), 2: (11, 1, 0)},
+                2: {1: (10, 3, 0), 2: (10, 2, 0)},
+            })
+            self.assertEqual(sorted(store.find_item({3}, 10)), [(1, 1, 10, 3, 0), (2, 1, 10, 3, 0)])
+            self.assertEqual(sorted(store.find_item({2, 3, 4}, 10)),
+                             [(1, 1, 10, 3, 0), (2, 1, 10, 3, 0), (2, 2, 10, 2, 0)])
+            self.assertEqual(store.get_for_player(3), {1: {1}, 2: {1}})
+            self.assertEqual(store.get_for_player(4), {})
+
         def test_no_locations_for_last(self) -> None:
             store = self.type({
                 1: {1: (1, 2, 3)},
@@ -201,6 +234,41 @@ class Base:
             self.assertEqual(len(store[2]), 0)
 
 
+class TestLocationChecks(unittest.TestCase):
+    def test_set(self) -> None:
+        checks = LocationChecks(range(100, 120, 2))
+        self.assertEqual(len(checks), 0)
+        checks |= {100, 104, 118}
+        checks.add(104)
+        self.assertEqual(len(checks), 3)
+        self.assertIn(118, checks)
+        self.assertNotIn(102, checks)
+        self.assertNotIn(105, checks)
+        self.assertNotIn("100", checks)
+        self.assertEqual(list(checks), [100, 104, 118])
+        self.assertEqual(checks.missing(), [102, 106, 108, 110, 112, 114, 116])
+        self.assertEqual({99, 100, 102} - checks, {99, 102})
+        self.assertEqual(checks & {100, 102}, {100})
+        checks.discard(104)
+        checks.discard(105)
+        self.assertEqual(checks, {100, 118})
+        with self.assertRaises(KeyError):
+            checks.add(101)
+
+    def test_bitmap(self) -> None:
+        checks = LocationChecks([11, 12, 13])
+        checks |= {11, 13}
+        self.assertEqual(checks.bitmap, 0b101)
+        self.assertEqual(LocationChecks([11, 12, 13], 0b101), {11, 13})
+        self.assertEqual(LocationChecks([], 0), set())
+        many_locations = range(1000, 3000, 2)
+        checks = LocationChecks(many_locations)
+        checks |= set(many_locations[::3])
+        self.assertEqual(LocationChecks(many_locations, checks.bitmap), checks)
+        with self.assertRaises(ValueError):
+            LocationChecks([11, 12, 13], 0b1000)
+
+
 class TestPurePythonLocationStore(Base.TestLocationStore):
     """Run base method tests for pure python implementation."""
     def setUp(self) -> None:
@@ -223,6 +291,10 @@ class TestSpeedupsLocationStore(Base.TestLocationStore):
         self.store = LocationStore(sample_data)
         super().setUp()
 
+    def test_misaligned_checks(self) -> None:
+        with self.assertRaises(ValueError):
+            self.store.get_missing({(0, 1): LocationChecks(range(20), 1)}, 0, 1)
+
 
 @unittest.skipIf(LocationStore is _LocationStore and not ci, "_speedups not available")
 class TestSpeedupsLocationStoreConstructor(Base.TestLocationStoreConstructor):
@@ -0,0 +1,55 @@
+# Tests for the sectioned .archipelago format in NetUtils
+import pickle
+import gc
+import unittest
+import weakref
+import zlib
+
+from MultiServer import Context
+from NetUtils import Multidata, NetworkSlot, SlotType, dump_multidata
+
+sample_multidata = {
+    "slot_info": {1: NetworkSlot("Player1", "Archipelago", SlotType.player)},
+    "locations": {1: {location: (location + 100, 1, 0) for location in range(5000)}},
+    "spheres": [{1: {1, 2}}, {1: {3}}],
+    "seed_name": "12345",
+}
+
+
+class TestMultidata(unittest.TestCase):
+    def test_round_trip(self) -> None:
+        multidata = Context.decompress(dump_multidata(sample_multidata))
+        self.assertIsInstance(multidata, Multidata)
+        self.assertEqual(dict(multidata), sample_multidata)
+
+    def test_sections_load_lazily(self) -> None:
+        multidata = Multidata(dump_multidata(sample_multidata))
+        self.assertIn("spheres", multidata)
+        self.assertNotIn("spheres", multidata._loaded)
+        self.assertEqual(multidata.get("spheres"), sample_multidata["spheres"])
+        self.assertIn("spheres", multidata._loaded)
+        self.assertNotIn("locations", multidata._loaded)
+        self.assertEqual(multidata.pop("locations"), sample_multidata["locations"])
+        self.assertNotIn("locations", multidata)
+        self.assertEqual(len(multidata), len(sample_multidata) - 1)
+
+    def test_pop_loader(self) -> None:
+        multidata = Multidata(dump_multidata(sample_multidata))
+        loader = multidata.pop_loader("spheres", [])
+        self.assertNotIn("spheres", multidata)
+        self.assertEqual(multidata.pop_loader("spheres", [])(), [])
+        reference = weakref.ref(multidata)
+        del multidata
+        gc.collect()
+        self.assertIsNone(reference(), "loader keeps the multidata alive")
+        self.assertEqual(loader(), sample_multidata["spheres"])
+
+    def test_rewrite_partially_loaded(self) -> None:
+        multidata = Multidata(dump_multidata(sample_multidata))
+        multidata["seed_name"] = "54321"
+        rewritten = Context.decompress(dump_multidata(multidata))
+        self.assertEqual(dict(rewritten), {**sample_multidata, "seed_name": "54321"})
+
+    def test_legacy_format(self) -> None:
+        data = bytes([3]) + zlib.compress(pickle.dumps(sample_multidata), 9)
+        self.assertEqual(Context.decompress(data), sample_multidata)
@@ -0,0 +1,139 @@
+import asyncio
+import base64
+import json
+import typing
+import unittest
+
+from worlds._bizhawk import BizHawkContext, ConnectionStatus, RequestFailedError, SyncError, guarded_read, \
+    send_requests
+
+
+class FakeWriter:
+    """Records the messages sent to the connector instead of writing them to a socket"""
+    messages: typing.List[str]
+    closed: bool
+
+    def __init__(self) -> None:
+        self.messages = []
+        self.closed = False
+
+    def write(self, data: bytes) -> None:
+        self.messages.append(data.decode("utf-8"))
+
+    async def drain(self) -> None:
+        pass
+
+    def close(self) -> None:
+        self.closed = True
+
+
+class TestBizHawkProtocol(unittest.IsolatedAsyncioTestCase):
+    ctx: BizHawkContext
+    reader: asyncio.StreamReader
+    writer: FakeWriter
+
+    async def asyncSetUp(self) -> None:
+        self.ctx = BizHawkContext()
+        self.reader = asyncio.StreamReader()
+        self.writer = FakeWriter()
+        self.ctx.streams = self.reader, self.writer  # type: ignore
+        self.ctx.connection_status = ConnectionStatus.TENTATIVE
+
+    async def sent(self, count: int) -> typing.List[typing.Dict[str, typing.Any]]:
+        """Waits until `count` messages were sent and returns them"""
+        while len(self.writer.messages) < count:
+            await asyncio.sleep(0)
+        return [json.loads(message) for message in self.writer.messages]
+
+    def respond(self, request_id: int, responses: typing.List[typing.Dict[str, typing.Any]], data: bytes = b"") -> None:
+        self.reader.feed_data(json.dumps({"id": request_id, "responses": responses}).encode("utf-8") + b"\n" + data)
+
+    async def test_request_id(self) -> None:
+        task = asyncio.create_task(send_requests(self.ctx, [{"type": "PING"}]))
+        request = (await self.sent(1))[0]
+        self.assertEqual(request["requests"], [{"type": "PING"}])
+        self.assertFalse(request["binary"])
+        self.respond(request["id"], [{"type": "PONG"}])
+        self.assertEqual(await task, [{"type": "PONG"}])
+        self.assertEqual(self.ctx.connection_status, ConnectionStatus.CONNECTED)
+
+        task = asyncio.create_task(send_requests(self.ctx, [{"type": "PING"}]))
+        request = (await self.sent(2))[1]
+        self.respond(request["id"] + 1, [{"type": "PONG"}])
+        with self.assertRaises(SyncError):
+            await task
+        self.assertTrue(self.writer.closed)
+        self.assertIsNone(self.ctx.streams)
+        self.assertEqual(self.ctx.connection_status, ConnectionStatus.NOT_CONNECTED)
+
+    async def test_pipelining(self) -> None:
+        tasks = [asyncio.create_task(send_requests(self.ctx, [{"type": "HASH"}, {"type": "SYSTEM", "n": n}]))
+                 for n in range(3)]
+        requests = await self.sent(3)
+        self.assertEqual(len({request["id"] for request in requests}), 3)
+        self.assertTrue(not any(task.done() for task in tasks))
+
+        for n, request in enumerate(requests):
+            self.respond(request["id"], [{"type": "HASH_RESPONSE", "value": "hash"},
+                                         {"type": "SYSTEM_RESPONSE", "value": f"system {n}"}])
+        results = await asyncio.gather(*tasks)
+        self.assertEqual([result[1]["value"] for result in results], ["system 0", "system 1", "system 2"])
+        self.assertEqual(self.ctx.latency.count, 3)
+        self.assertEqual(self.ctx.latency.peak_in_flight, 3)
+
+    async def test_max_in_flight(self) -> None:
+        tasks = [asyncio.create_task(send_requests(self.ctx, [{"type": "PING"}])) for _ in range(6)]
+        requests = await self.sent(4)
+        for _ in range(10):
+            await asyncio.sleep(0)
+        self.assertEqual(len(self.writer.messages), 4)
+
+        self.respond(requests[0]["id"], [{"type": "PONG"}])
+        requests = await self.sent(5)
+        for request in requests[1:]:
+            self.respond(request["id"], [{"type": "PONG"}])
+        requests = await self.sent(6)
+        self.respond(requests[5]["id"], [{"type": "PONG"}])
+        await asyncio.gather(*tasks)
+        self.assertEqual(self.ctx.latency.peak_in_flight, 4)
+
+    async def test_timeout_fails_later_requests(self) -> None:
+        tasks = [asyncio.create_task(send_requests(self.ctx, [{"type": "PING"}])) for _ in range(3)]
+        await self.sent(3)
+        self.reader.set_exception(asyncio.TimeoutError())
+        results = await asyncio.gather(*tasks, return_exceptions=True)
+        self.assertEqual([str(result) for result in results],
+                         ["Connection timed out", "Connection closed", "Connection closed"])
+        self.assertTrue(all(isinstance(result, RequestFailedError) for result in results))
+        self.assertTrue(self.writer.closed)
+        self.assertIsNone(self.ctx.streams)
+
+    async def test_binary_read(self) -> None:
+        memory = bytes(range(256)) * 2
+        task = asyncio.create_task(guarded_read(self.ctx, [(0, 300, "RAM"), (300, 2, "RAM"), (0x100, 1, "ROM")],
+                                                [(0, [0], "RAM")]))
+        request = (await self.sent(1))[0]
+        self.assertTrue(request["binary"])
+        self.assertEqual([read.get("size") for read in request["requests"]], [None, 300, 2, 1])
+        self.respond(request["id"], [{"type": "GUARD_RESPONSE", "value": True, "address": 0},
+                                     {"type": "READ_RESPONSE", "size": 300},
+                                     {"type": "READ_RESPONSE", "size": 2},
+                                     {"type": "READ_RESPONSE", "size": 1}],
+                     memory[:302] + b"\x42")
+        self.assertEqual(await task, [memory[:300], memory[300:302], b"\x42"])
+
+        # small reads stay base64 encoded json
+        task = asyncio.create_task(guarded_read(self.ctx, [(0, 4, "RAM")], []))
+        request = (await self.sent(2))[1]
+        self.assertFalse(request["binary"])
+        self.respond(request["id"], [{"type": "READ_RESPONSE", "value": base64.b64encode(memory[:4]).decode()}])
+        self.assertEqual(await task, [memory[:4]])
+
+    async def test_binary_read_incomplete(self) -> None:
+        task = asyncio.create_task(guarded_read(self.ctx, [(0, 300, "RAM")], []))
+        request = (await self.sent(1))[0]
+        self.respond(request["id"], [{"type": "READ_RESPONSE", "size": 300}], bytes(100))
+        self.reader.feed_eof()
+        with self.assertRaises(RequestFailedError):
+            await task
+        self.assertIsNone(self.ctx.streams)
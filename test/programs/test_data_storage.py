@@ -0,0 +1,93 @@
+import unittest
+
+from DataStorage import DataStorage, DataStorageError
+
+
+def operation(name: str, value=None) -> dict:
+    return {"operation": name, "value": value}
+
+
+class Subscriber:
+    pass
+
+
+class TestDataStorage(unittest.TestCase):
+    def setUp(self) -> None:
+        self.storage = DataStorage()
+
+    def test_operations(self) -> None:
+        self.assertEqual(self.storage.set("number", 0, [operation("add", 5), operation("mul", 3)]), (0, 15))
+        self.assertEqual(self.storage.set("number", 0, [operation("max", 10), operation("right_shift", 1)]), (15, 7))
+        self.assertEqual(self.storage.set("list", [], [operation("add", [1, 2]), operation("add", [3]),
+                                                       operation("remove", 2)]), ([], [1, 3]))
+        self.assertEqual(self.storage.set("dict", {}, [operation("update", {"a": 1, "b": 2}),
+                                                       operation("pop", "a")]), ({}, {"b": 2}))
+        self.assertEqual(self.storage.set("default", 4, [operation("default")]), (4, 4))
+
+    def test_values_not_modified_in_place(self) -> None:
+        default = {"a": 1}
+        original, value = self.storage.set("dict", default, [operation("update", {"b": 2})])
+        self.assertEqual(default, {"a": 1}, "default is echoed back in SetReply and must not change")
+        self.assertIs(original, default)
+        self.assertEqual(value, {"a": 1, "b": 2})
+
+        replacement = [1]
+        self.storage.set("list", [], [operation("replace", replacement), operation("add", [2])])
+        self.storage.set("list", [], [operation("add", [3]), operation("add", [4])])
+        self.assertEqual(replacement, [1], "operation values are echoed back in SetReply and must not change")
+        stored = self.storage.get("list")
+        self.assertEqual(stored, [1, 2, 3, 4])
+        self.storage.set("list", [], [operation("remove", 1)])
+        self.assertEqual(stored, [1, 2, 3, 4], "a previously stored value must not change")
+
+    def test_failed_operation(self) -> None:
+        self.storage.set("key", 0, [operation("replace", 1)])
+        self.storage.take_dirty()
+        with self.assertRaises(DataStorageError):
+            self.storage.set("key", 0, [operation("add", 1), operation("not an operation")])
+        with self.assertRaises(DataStorageError):
+            self.storage.set("key", 0, [operation("add", "text")])
+        self.assertEqual(self.storage.get("key"), 1)
+        self.assertEqual(self.storage.take_dirty(), {})
+
+    def test_limits(self) -> None:
+        storage = DataStorage(value_limit=20, limit=30)
+        storage.set("a", "", [operation("replace", "x" * 10)])  # 1 + 12 bytes
+        with self.assertRaises(DataStorageError):
+            storage.set("b", "", [operation("replace", "x" * 20)])
+        storage.set("b", "", [operation("replace", "x" * 10)])
+        with self.assertRaises(DataStorageError):
+            storage.set("c", "", [operation("replace", "x" * 10)])
+        storage.set("a", "", [operation("replace", "")])  # shrinking frees space for c
+        storage.set("c", "", [operation("replace", "x" * 10)])
+        self.assertEqual(storage.total_size, 1 + 2 + 2 * (1 + 12))
+
+    def test_estimated_size(self) -> None:
+        storage = DataStorage(value_limit=40)
+        storage.set("dict", {}, [operation("update", {"a": 1})])
+        for _ in range(10):  # overwriting the same entry, the estimate grows but the value does not
+            storage.set("dict", {}, [operation("update", {"a": 1})])
+        self.assertLessEqual(storage.sizes["dict"], 40, "estimate is measured once it exceeds the limit")
+        self.assertGreaterEqual(storage.sizes["dict"], len("dict") + len('{"a":1}'))
+        with self.assertRaises(DataStorageError):
+            storage.set("dict", {}, [operation("update", {"b" * 40: 1})])
+        self.assertEqual(storage.get("dict"), {"a": 1})
+
+    def test_dirty(self) -> None:
+        self.storage.set("a", 0, [operation("add", 1)])
+        self.storage.set("b", 0, [operation("add", 1)])
+        self.assertEqual(self.storage.take_dirty(), {"a": 1, "b": 1})
+        self.storage.set("a", 0, [operation("add", 1)])
+        self.assertEqual(self.storage.take_dirty(), {"a": 2})
+        self.assertEqual(self.storage.take_dirty(), {})
+
+    def test_subscribers(self) -> None:
+        exact, prefix, everything = Subscriber(), Subscriber(), Subscriber()
+        self.storage.subscribe(exact, "team_0_deaths")
+        self.storage.subscribe(prefix, "team_0_*")
+        self.storage.subscribe(everything, "*")
+        self.assertEqual(self.storage.get_subscribers("team_0_deaths"), {exact, prefix, everything})
+        self.assertEqual(self.storage.get_subscribers("team_0_gifts"), {prefix, everything})
+        self.assertEqual(self.storage.get_subscribers("team_1_gifts"), {everything})
+        del everything
+        self.assertEqual(self.storage.get_subscribers("team_1_gifts"), set(), "disconnected clients are dropped")
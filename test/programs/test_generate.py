@@ -3,6 +3,7 @@
 import unittest
 import os
 import os.path
+import random
 import sys
 
 from pathlib import Path
@@ -92,3 +93,64 @@ class TestGenerateMain(unittest.TestCase):
             user_path.cached_path = user_path_backup
 
         self.assertOutput(self.output_tempdir.name)
+
+
+class TestGenerateRolls(unittest.TestCase):
+    """This tests rolling player files in Generate.py main"""
+
+    def setUp(self):
+        self.original_argv = sys.argv.copy()
+        self.input_tempdir = TemporaryDirectory(prefix='AP_in_')
+
+    def tearDown(self):
+        self.input_tempdir.cleanup()
+        sys.argv = self.original_argv
+
+    def write_player_file(self, name: str, content: str) -> None:
+        with open(os.path.join(self.input_tempdir.name, name), "w", encoding="utf-8") as f:
+            f.write(content)
+
+    def roll(self, *args: str):
+        sys.argv = [sys.argv[0], '--seed', '0', '--player_files_path', self.input_tempdir.name, *args]
+        erargs, _ = Generate.main()
+        return {option: {player: getattr(value, "value", value) for player, value in player_values.items()}
+                for option, player_values in vars(erargs).items() if isinstance(player_values, dict)}
+
+    def test_roll_processes(self):
+        for number in range(4):
+            self.write_player_file(f"Player{number}.yaml", f"""
+name: Player{number}
+game: Clique
+Clique:
+  color: random
+  hard_mode: random
+---
+name: Player{number}b
+game: Clique
+Clique:
+  color: random
+  hard_mode: random
+triggers:
+  - option_category: Clique
+    option_name: hard_mode
+    option_result: true
+    options:
+      Clique:
+        color: random-low
+""")
+        serial = self.roll()
+        serial_state = random.getstate()
+        self.assertEqual(len(serial["name"]), 8)
+        self.assertEqual(serial, self.roll('--roll_processes', '3'))
+        self.assertEqual(serial_state, random.getstate(), "rolling in this process should not change its random")
+
+    def test_invalid_files(self):
+        self.write_player_file("Valid.yaml", "name: Valid\ngame: Clique\nClique: {}\n")
+        self.write_player_file("Unknown.yaml", "name: Unknown\ngame: Not A Game\nNot A Game: {}\n")
+        self.write_player_file("Broken.yaml", "name: [Broken\n")
+        with self.assertRaises(ValueError) as context:
+            self.roll()
+        self.assertIn("2 files are invalid", str(context.exception))
+        self.assertIn("Unknown.yaml", str(context.exception))
+        self.assertIn("Broken.yaml", str(context.exception))
+        self.assertNotIn("Valid.yaml", str(context.exception))
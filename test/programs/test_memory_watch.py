@@ -0,0 +1,234 @@
+import asyncio
+import base64
+import json
+import typing
+import unittest
+
+from NetUtils import NetworkItem
+from worlds._memory_watch import MemoryChange, MemoryWatcher, notify
+
+
+class TestMemoryWatcher(unittest.IsolatedAsyncioTestCase):
+    memory = bytes(range(256))
+
+    def read(self, watcher: MemoryWatcher):
+        return [self.memory[address:address + size] for address, size, _ in watcher.reads]
+
+    def test_coalesce(self) -> None:
+        watcher = MemoryWatcher()
+        watcher.watch(0x10, 4)
+        watcher.watch(0x40, 2)
+        watcher.watch(0x12, 4)  # overlaps the first
+        watcher.watch(0x16, 2)  # adjacent to the third
+        watcher.watch(0x14, 1)  # inside the third
+        watcher.watch(0x20, 1, domain="SRAM")
+        watcher.watch(0x21, 1, domain="WRAM")
+        self.assertEqual(watcher.reads, [(0x10, 8, ""), (0x40, 2, ""), (0x20, 1, "SRAM"), (0x21, 1, "WRAM")])
+
+        watcher.max_gap = 0x30
+        watcher.unwatch(watcher.watches[-1])
+        self.assertEqual(watcher.reads, [(0x10, 0x32, ""), (0x20, 1, "SRAM")])
+
+    def test_changes(self) -> None:
+        watcher = MemoryWatcher()
+        first = watcher.watch(0x10, 4)
+        second = watcher.watch(0x12, 4)
+
+        changes = watcher.update(self.read(watcher))
+        self.assertEqual(changes, [MemoryChange(first, None, self.memory[0x10:0x14]),
+                                   MemoryChange(second, None, self.memory[0x12:0x16])])
+        self.assertEqual(changes[0].changed_offsets(), [0, 1, 2, 3])
+        self.assertEqual(watcher.update(self.read(watcher)), [])
+
+        self.memory = self.memory[:0x15] + b"\xff" + self.memory[0x16:]
+        changes = watcher.update(self.read(watcher))
+        self.assertEqual(changes, [MemoryChange(second, self.memory[0x12:0x15] + b"\x15", self.memory[0x12:0x16])])
+        self.assertEqual(changes[0].changed_offsets(), [3])
+
+        watcher.reset()
+        self.assertEqual(len(watcher.update(self.read(watcher))), 2)
+        with self.assertRaises(ValueError):
+            watcher.update([])
+
+    async def test_notify(self) -> None:
+        calls = []
+
+        async def async_callback(change: MemoryChange) -> None:
+            calls.append(("async", change.new))
+
+        watcher = MemoryWatcher()
+        watcher.watch(0, 1, lambda change: calls.append(("sync", change.new)))
+        watcher.watch(1, 1, async_callback)
+        watcher.watch(2, 1)
+        await notify(watcher.update(self.read(watcher)))
+        self.assertEqual(calls, [("sync", b"\x00"), ("async", b"\x01")])
+
+
+class FakeSNI:
+    """Serves the GetAddress and PutAddress requests of an SNIContext from `memory`"""
+    memory: bytearray
+    requests: typing.List[typing.Dict[str, typing.Any]]
+    open = True
+    closed = False
+
+    def __init__(self, ctx: typing.Any) -> None:
+        self.ctx = ctx
+        self.memory = bytearray(0x1000000)
+        self.requests = []
+        self._put: typing.Optional[int] = None
+
+    async def send(self, message: typing.Union[str, bytes]) -> None:
+        if self._put is not None:
+            self.memory[self._put:self._put + len(message)] = message
+            self._put = None
+            return
+        request = json.loads(message)
+        self.requests.append(request)
+        address, size = (int(operand, 16) for operand in request["Operands"])
+        if request["Opcode"] == "GetAddress":
+            self.ctx.snes_recv_queue.put_nowait(bytes(self.memory[address:address + size]))
+        else:
+            self._put = address
+
+
+class TestSNIWatches(unittest.IsolatedAsyncioTestCase):
+    async def test_super_metroid(self) -> None:
+        """The game mode and queue counters are read in one round trip, checks are only read when the queue changed"""
+        from SNIClient import SNESState, SNIContext, snes_read_watches
+        from worlds.sm import locations_start_id
+        from worlds.sm.Client import SMSNIClient, SM_SEND_QUEUE_RCOUNT, SM_SEND_QUEUE_START, WRAM_START
+
+        ctx = SNIContext("", "", "")
+        sni = FakeSNI(ctx)
+        ctx.snes_socket = sni  # type: ignore
+        ctx.snes_state = SNESState.SNES_ATTACHED
+        sent: typing.List[typing.Any] = []
+
+        async def send_msgs(msgs: typing.List[typing.Any]) -> None:
+            sent.extend(msgs)
+
+        ctx.send_msgs = send_msgs  # type: ignore
+        handler = SMSNIClient()
+        ctx.game = handler.game
+        handler.watch_memory(ctx)
+
+        async def tick() -> typing.List[str]:
+            sni.requests.clear()
+            await notify(await snes_read_watches(ctx))
+            await handler.game_watcher(ctx)
+            return [request["Opcode"] for request in sni.requests]
+
+        sni.memory[WRAM_START + 0x0998] = 0x08  # in game
+        sni.memory[SM_SEND_QUEUE_RCOUNT:SM_SEND_QUEUE_RCOUNT + 4] = bytes([0, 0, 1, 0])
+        sni.memory[SM_SEND_QUEUE_START + 4] = 5 << 3
+
+        # not connected to a server, the check stays in the queue
+        self.assertEqual(await tick(), ["GetAddress"] * 3)
+        self.assertEqual(sent, [])
+
+        ctx.server = object()  # type: ignore
+        ctx.slot = 1
+        self.assertEqual(await tick(), ["GetAddress"] * 4 + ["PutAddress"])
+        self.assertEqual(sent, [{"cmd": "LocationChecks", "locations": [locations_start_id + 5]}])
+        self.assertEqual(sni.memory[SM_SEND_QUEUE_RCOUNT], 1)
+
+        for _ in range(2):
+            self.assertEqual(await tick(), ["GetAddress"] * 3)
+        self.assertEqual(len(sent), 1)
+
+
+class FakeConnector:
+    """Answers the requests written to a BizHawkContext from `memory`, like the connector script would"""
+    memory: typing.Dict[str, bytearray]
+    messages: typing.List[typing.Dict[str, typing.Any]]
+
+    def __init__(self, reader: asyncio.StreamReader) -> None:
+        self.reader = reader
+        self.memory = {}
+        self.messages = []
+
+    def write(self, data: bytes) -> None:
+        message = json.loads(data)
+        self.messages.append(message)
+        responses = []
+        for request in message["requests"]:
+            memory = self.memory[request["domain"]]
+            address = request["address"]
+            if request["type"] == "READ":
+                value = base64.b64encode(memory[address:address + request["size"]]).decode()
+                responses.append({"type": "READ_RESPONSE", "value": value})
+            elif request["type"] == "GUARD":
+                expected = base64.b64decode(request["expected_data"])
+                responses.append({"type": "GUARD_RESPONSE", "value": memory[address:address + len(expected)] == expected,
+                                  "address": address})
+            else:
+                value = base64.b64decode(request["value"])
+                memory[address:address + len(value)] = value
+                responses.append({"type": "WRITE_RESPONSE"})
+        self.reader.feed_data(json.dumps({"id": message["id"], "responses": responses}).encode() + b"\n")
+
+    async def drain(self) -> None:
+        pass
+
+
+class FakeBizHawkClientContext:
+    def __init__(self) -> None:
+        from worlds._bizhawk import BizHawkContext, ConnectionStatus
+        self.bizhawk_ctx = BizHawkContext()
+        self.bizhawk_ctx.connection_status = ConnectionStatus.CONNECTED
+        self.watches = MemoryWatcher()
+        self.items_received: typing.List[NetworkItem] = []
+        self.server_locations: typing.Set[int] = set()
+        self.finished_game = False
+        self.sent: typing.List[typing.Any] = []
+
+    async def send_msgs(self, msgs: typing.List[typing.Any]) -> None:
+        self.sent.extend(msgs)
+
+
+class TestBizHawkWatches(unittest.IsolatedAsyncioTestCase):
+    async def test_yugioh06(self) -> None:
+        """Watched memory is read in one request per tick, and only what changed is acted upon"""
+        from worlds._bizhawk import read_watches
+        from worlds.yugioh06.client_bh import YuGiOh2006Client
+
+        ctx = FakeBizHawkClientContext()
+        reader = asyncio.StreamReader()
+        connector = FakeConnector(reader)
+        ctx.bizhawk_ctx.streams = reader, connector  # type: ignore
+        ewram = connector.memory["EWRAM"] = bytearray(0x10000)
+        ewram[0:8] = b"YWCT2006"
+        ewram[0x52E8] = 0b1  # first location checked
+        ctx.server_locations = {5730001, 5730002}
+        ctx.items_received = [NetworkItem(5730001 + 3, 1, 1)]
+
+        handler = YuGiOh2006Client()
+        handler.watch_memory(ctx)  # type: ignore
+        location_changes: typing.List[MemoryChange] = []
+
+        def on_locations_changed(change: MemoryChange) -> None:
+            location_changes.append(change)
+            handler.on_locations_changed(change)
+
+        ctx.watches.watches[1].callback = on_locations_changed
+
+        async def tick() -> int:
+            count = ctx.bizhawk_ctx.latency.count
+            await notify(await read_watches(ctx.bizhawk_ctx, ctx.watches))
+            await handler.game_watcher(ctx)  # type: ignore
+            return ctx.bizhawk_ctx.latency.count - count
+
+        self.assertEqual(await tick(), 2, "one read and one write of the received item")
+        self.assertEqual([len(request["requests"]) for request in connector.messages], [3, 2])
+        self.assertEqual(ewram[0x5308], 1 << 3)
+        self.assertEqual(ctx.sent, [{"cmd": "LocationChecks", "locations": [5730001]}])
+        self.assertEqual(len(location_changes), 1)
+
+        self.assertEqual(await tick(), 1, "nothing changed, only the read")
+        self.assertEqual(len(ctx.sent), 1)
+        self.assertEqual(len(location_changes), 1)
+
+        ewram[0x52E8] = 0b11
+        self.assertEqual(await tick(), 1)
+        self.assertEqual(location_changes[-1].changed_offsets(), [0])
+        self.assertEqual(set(ctx.sent[-1]["locations"]), {5730001, 5730002})
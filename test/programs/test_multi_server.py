@@ -1,5 +1,11 @@
+import asyncio
+import os
+import tempfile
+import typing
 import unittest
-from MultiServer import Context, ServerCommandProcessor
+
+from MultiServer import Client, Context, ServerCommandProcessor, send_items_to, send_new_items
+from NetUtils import Endpoint, Hint, LocationChecks, LocationStore, NetworkItem, decode
 
 
 class TestResolvePlayerName(unittest.TestCase):
@@ -38,3 +44,209 @@ class TestResolvePlayerName(unittest.TestCase):
         assert p.resolve_player("ABC") == (1, 2, "abc"), "case insensitive resolves when 1 match"
         assert p.resolve_player("abcd") == (1, 3, "abCD"), "case insensitive resolves when 1 match"
         assert not p.resolve_player("aB"), "partial name shouldn't resolve to player"
+
+
+class RecordingSocket:
+    open = True
+
+    def __init__(self) -> None:
+        self.sent: typing.List[typing.List[dict]] = []
+
+    async def send(self, msg: str) -> None:
+        self.sent.append(decode(msg))
+
+
+class RecordingContext(Context):
+    def __init__(self) -> None:
+        super().__init__("", 0, "", "", 0, 0, False)
+        self.sent: typing.List[typing.Tuple[Client, typing.List[dict]]] = []
+        """frames sent by send_frame"""
+
+    def send_frame(self, endpoints: typing.Iterable[Endpoint], msg: str) -> bool:
+        for endpoint in endpoints:
+            self.sent.append((endpoint, decode(msg)))
+        return True
+
+
+class TestItemDelivery(unittest.IsolatedAsyncioTestCase):
+    def setUp(self) -> None:
+        self.ctx = RecordingContext()
+        self.ctx.clients = {0: {}}
+        self.clients = {}
+        for slot in (1, 2):
+            client = Client(RecordingSocket(), self.ctx)
+            client.items_handling = 0b111
+            self.clients[slot] = client
+            self.ctx.clients[0][slot] = [client]
+
+    async def test_coalesce_per_tick(self) -> None:
+        send_items_to(self.ctx, 0, 1, NetworkItem(10, 100, 2, 0))
+        send_new_items(self.ctx)
+        send_items_to(self.ctx, 0, 1, NetworkItem(11, 101, 2, 0))
+        send_new_items(self.ctx)
+        await asyncio.sleep(0)
+        await asyncio.sleep(0)
+
+        self.assertEqual(len(self.ctx.sent), 1)
+        client, msgs = self.ctx.sent[0]
+        self.assertIs(client, self.clients[1])
+        self.assertEqual(msgs[0]["cmd"], "ReceivedItems")
+        self.assertEqual([item.item for item in msgs[0]["items"]], [10, 11])
+        self.assertEqual(self.clients[1].send_index, 2)
+        self.assertEqual(self.clients[2].send_index, 0)
+
+        send_new_items(self.ctx)
+        await asyncio.sleep(0)
+        await asyncio.sleep(0)
+        self.assertEqual(len(self.ctx.sent), 1, "no new items, nothing to send")
+
+
+class TestOutbox(unittest.IsolatedAsyncioTestCase):
+    def setUp(self) -> None:
+        self.ctx = RecordingContext()
+        self.clients = [Client(RecordingSocket(), self.ctx) for _ in range(3)]
+        for client, slot in zip(self.clients, (1, 1, 2)):
+            client.auth = True
+            client.team, client.slot = 0, slot
+        self.ctx.player_names = {(0, 1): "Player1", (0, 2): "Player2"}
+        self.ctx.clients = {0: {1: self.clients[:2], 2: self.clients[2:]}}
+
+    async def test_one_frame_per_tick(self) -> None:
+        for number in range(3):
+            self.ctx.broadcast_team(0, [{"cmd": "PrintJSON", "data": [{"text": str(number)}]}])
+        self.ctx.notify_client(self.clients[2], "only for 2")
+        await asyncio.sleep(0)
+
+        self.assertEqual(len(self.ctx.sent), 3, "one frame per client")
+        texts = {id(client): [msg["data"][0]["text"] for msg in msgs] for client, msgs in self.ctx.sent}
+        self.assertEqual(texts[id(self.clients[0])], ["0", "1", "2"])
+        self.assertEqual(texts[id(self.clients[2])], ["0", "1", "2", "only for 2"])
+        self.assertEqual(self.ctx.outbox_stats.endpoints, 3)
+        self.assertEqual(self.ctx.outbox_stats.messages, 10)
+        self.assertEqual(self.ctx.outbox_stats.longest_queue, 4)
+        self.assertEqual(self.ctx.outbox_stats.frames, 2, "clients 0 and 1 should share their frame")
+
+    async def test_direct_send_keeps_order(self) -> None:
+        client = self.clients[0]
+        self.ctx.broadcast(self.clients, [{"cmd": "RoomUpdate", "hint_points": 1}])
+        await self.ctx.send_msgs(client, [{"cmd": "RoomUpdate", "hint_points": 2}])
+        self.assertEqual([msg["hint_points"] for msg in client.socket.sent[0]], [1, 2])
+        await asyncio.sleep(0)
+        self.assertNotIn(client, [endpoint for endpoint, _ in self.ctx.sent])
+
+    async def test_items_join_frame(self) -> None:
+        for client in self.clients:
+            client.items_handling = 0b111
+        send_items_to(self.ctx, 0, 1, NetworkItem(10, 100, 2, 0))
+        send_new_items(self.ctx)
+        self.ctx.broadcast_team(0, [{"cmd": "PrintJSON", "data": [{"text": "sent"}]}])
+        await asyncio.sleep(0)
+        frames = [msgs for client, msgs in self.ctx.sent if client is self.clients[0]]
+        self.assertEqual([[msg["cmd"] for msg in msgs] for msgs in frames], [["PrintJSON", "ReceivedItems"]])
+
+    async def test_items_delivered_by_flush(self) -> None:
+        for client in self.clients:
+            client.items_handling = 0b111
+        self.ctx.broadcast_team(0, [{"cmd": "PrintJSON", "data": [{"text": "sent"}]}])
+        send_items_to(self.ctx, 0, 1, NetworkItem(10, 100, 2, 0))
+        send_new_items(self.ctx)
+        await asyncio.sleep(0)
+        frames = [msgs for client, msgs in self.ctx.sent if client is self.clients[0]]
+        self.assertEqual([[msg["cmd"] for msg in msgs] for msgs in frames], [["PrintJSON", "ReceivedItems"]])
+        self.assertEqual(self.ctx.outbox_stats.messages, 5)
+
+        await asyncio.sleep(0)
+        self.assertEqual(len(self.ctx.sent), 3, "the items should not schedule another flush")
+        self.assertEqual(self.ctx.outbox_stats.messages, 5)
+
+
+class TestSaveJournal(unittest.TestCase):
+    def setUp(self) -> None:
+        self.tempdir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tempdir.cleanup)
+        self.ctx = self.new_context()
+
+    def new_context(self) -> Context:
+        ctx = Context("", 0, "", "", 0, 0, False)
+        ctx.save_filename = os.path.join(self.tempdir.name, "test.apsave")
+        ctx.group_collected = {}
+        ctx.locations = LocationStore({1: {}, 2: {100: (10, 1, 0), 101: (11, 1, 0), 102: (12, 1, 0)}})
+        return ctx
+
+    def load(self) -> dict:
+        ctx = self.new_context()
+        savedata = ctx._read_save()
+        self.loaded_token = ctx.save_journal_token
+        return savedata
+
+    def test_journal_replay(self) -> None:
+        self.assertTrue(self.ctx._save())
+        snapshot_size = os.path.getsize(self.ctx.save_filename)
+        send_items_to(self.ctx, 0, 1, NetworkItem(10, 100, 2, 0))
+        self.ctx.location_checks[0, 2] |= {100}
+        self.ctx.data_storage.set("key", 0, [{"operation": "replace", "value": 1}])
+        self.assertTrue(self.ctx._save())
+        send_items_to(self.ctx, 0, 1, NetworkItem(11, 101, 2, 0))
+        self.ctx.location_checks[0, 2] |= {101}
+        self.ctx.hints_used[0, 1] = 3
+        self.assertTrue(self.ctx._save())
+
+        self.assertEqual(os.path.getsize(self.ctx.save_filename), snapshot_size, "snapshot should not be rewritten")
+        savedata = self.load()
+        self.assertEqual(self.loaded_token, self.ctx.save_journal_token)
+        self.assertEqual(savedata["received_items"][0, 1, True], [NetworkItem(10, 100, 2, 0), NetworkItem(11, 101, 2, 0)])
+        self.assertEqual(savedata["location_checks"][0, 2], 0b011)
+        self.assertEqual(savedata["stored_data"], {"key": 1})
+        self.assertEqual(savedata["hints_used"], {(0, 1): 3})
+
+    def test_ignore_stale_or_broken_journal(self) -> None:
+        self.assertTrue(self.ctx._save())
+        with open(self.ctx.save_journal_filename, "rb") as f:
+            stale_journal = f.read()
+        send_items_to(self.ctx, 0, 1, NetworkItem(10, 100, 2, 0))
+        self.assertTrue(self.ctx._save(exit_save=True))
+        send_items_to(self.ctx, 0, 1, NetworkItem(11, 101, 2, 0))
+        self.assertTrue(self.ctx._save())
+        with open(self.ctx.save_journal_filename, "ab") as f:
+            f.write(stale_journal[:-1])
+        self.assertEqual(len(self.load()["received_items"][0, 1, True]), 2, "incomplete entry at the end")
+        self.assertIsNone(self.loaded_token)
+
+        with open(self.ctx.save_journal_filename, "wb") as f:
+            f.write(stale_journal)
+        self.assertEqual(len(self.load()["received_items"][0, 1, True]), 1, "journal of an older snapshot")
+        self.assertIsNone(self.loaded_token)
+
+
+    def test_set_save(self) -> None:
+        self.ctx.location_checks[0, 2] |= {100, 102}
+        savedata = self.ctx.get_save()
+        self.assertEqual(savedata["location_checks"], {(0, 2): 0b101})
+        ctx = self.new_context()
+        ctx.set_save(savedata)
+        self.assertIsInstance(ctx.location_checks[0, 2], LocationChecks)
+        self.assertEqual(ctx.location_checks[0, 2], {100, 102})
+        self.assertEqual(ctx.locations.get_missing(ctx.location_checks, 0, 2), [101])
+
+        # version 2 saved sets, which could contain ids unknown to the multidata
+        ctx = self.new_context()
+        ctx.set_save({**savedata, "version": 2, "location_checks": {(0, 2): {100, 101, 99}}})
+        self.assertEqual(ctx.location_checks[0, 2], {100, 101})
+        self.assertEqual(ctx.location_checks[0, 1], set())
+
+
+class TestHintIndex(unittest.TestCase):
+    def test_update_found_hints(self) -> None:
+        ctx = Context("", 0, "", "", 0, 0, False)
+        hint = Hint(receiving_player=2, finding_player=1, location=100, item=10, found=False)
+        other_hint = Hint(receiving_player=2, finding_player=1, location=101, item=11, found=False)
+        for slot in (1, 2):
+            ctx.hints[0, slot] |= {hint, other_hint}
+            ctx.index_hint(0, slot, hint)
+            ctx.index_hint(0, slot, other_hint)
+
+        self.assertEqual(ctx.update_found_hints(0, 1, [100]), {1, 2})
+        for slot in (1, 2):
+            self.assertEqual(ctx.hints[0, slot], {hint._replace(found=True), other_hint})
+        self.assertEqual(ctx.update_found_hints(0, 1, [100]), set(), "hint was already found")
+        self.assertEqual(ctx.update_found_hints(0, 2, [101]), set(), "location of another player")
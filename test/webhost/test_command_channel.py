@@ -0,0 +1,29 @@
+import unittest
+from uuid import uuid4
+
+from WebHostLib.commandchannel import get_hoster_address, get_room_hoster, notify_room, open_listener, \
+    read_notifications
+
+
+class TestCommandChannel(unittest.TestCase):
+    def test_notify(self) -> None:
+        sock = open_listener(("127.0.0.1", 0))
+        self.assertIsNotNone(sock)
+        with sock:
+            config = {"HOSTERS": 1, "ROOM_COMMAND_PORT": sock.getsockname()[1]}
+            room_ids = {uuid4(), uuid4()}
+            for room_id in room_ids:
+                notify_room(config, room_id)
+            received = set()
+            while received != room_ids:
+                notified = read_notifications(sock, 1)
+                self.assertTrue(notified, "notification got lost")
+                received |= notified
+            self.assertEqual(read_notifications(sock, 0), set())
+
+    def test_hoster_address(self) -> None:
+        config = {"HOSTERS": 4, "ROOM_COMMAND_PORT": 40000}
+        room_id = uuid4()
+        self.assertEqual(get_hoster_address(config, get_room_hoster(config, room_id)),
+                         ("127.0.0.1", 40000 + room_id.int % 4))
+        self.assertIsNone(get_hoster_address({"HOSTERS": 4, "ROOM_COMMAND_PORT": None}, 0))
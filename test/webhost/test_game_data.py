@@ -0,0 +1,72 @@
+import tempfile
+import unittest
+
+from WebHostLib.gamedata import GameData, RoomView, write_game_data
+from worlds import network_data_package, world_info
+from worlds.AutoWorld import AutoWorldRegister
+
+
+def hint_blacklists():
+    return {game: info.hint_blacklist for game, info in world_info.items()}
+
+
+class TestGameData(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls) -> None:
+        cls.temp_dir = tempfile.TemporaryDirectory()
+        cls.path = write_game_data(cls.temp_dir.name, network_data_package["games"], hint_blacklists())
+        cls.game_data = GameData(cls.path)
+
+    @classmethod
+    def tearDownClass(cls) -> None:
+        del cls.game_data  # release the mapping before the file is removed
+        cls.temp_dir.cleanup()
+
+    def test_lookups(self) -> None:
+        for game_name, world in AutoWorldRegister.world_types.items():
+            with self.subTest(game_name):
+                self.assertEqual(dict(self.game_data.item_name_to_id(game_name)), world.item_name_to_id)
+                self.assertEqual(dict(self.game_data.location_name_to_id(game_name)), world.location_name_to_id)
+                item_names = self.game_data.item_names(game_name)
+                for item_name, item_id in world.item_name_to_id.items():
+                    self.assertEqual(item_names[item_id], item_name)
+                game_package = network_data_package["games"][game_name]
+                self.assertEqual(self.game_data.name_groups(game_name),
+                                 (game_package["item_name_groups"], game_package["location_name_groups"]))
+                self.assertEqual(self.game_data.non_hintable_names[game_name], world.hint_blacklist)
+
+    def test_package(self) -> None:
+        for game_name, game_package in network_data_package["games"].items():
+            with self.subTest(game_name):
+                self.assertEqual(self.game_data.package(game_name), {
+                    key: value for key, value in game_package.items()
+                    if key not in ("item_name_groups", "location_name_groups")})
+
+    def test_unknown_ids(self) -> None:
+        item_names = self.game_data.item_names("Archipelago")
+        self.assertNotIn(-999999, item_names)
+        self.assertEqual(item_names[-999999], "Unknown item (ID:-999999)")
+        self.assertNotIn("Not An Item", self.game_data.item_name_to_id("Archipelago"))
+
+    def test_same_data_same_file(self) -> None:
+        path = write_game_data(self.temp_dir.name, network_data_package["games"], hint_blacklists())
+        self.assertEqual(path, self.path)
+
+    def test_changed_data_new_file(self) -> None:
+        games_package = dict(network_data_package["games"])
+        games_package["Archipelago"] = {**games_package["Archipelago"], "checksum": "changed"}
+        path = write_game_data(self.temp_dir.name, games_package, hint_blacklists())
+        self.assertNotEqual(path, self.path)
+        game_data = GameData(path)
+        self.assertEqual(game_data.checksum("Archipelago"), "changed")
+        del game_data
+
+    def test_room_view(self) -> None:
+        view = RoomView({"Archipelago"}, self.game_data.package)
+        self.assertEqual(list(view), ["Archipelago"])
+        self.assertNotIn("Custom Game", view)
+        view["Custom Game"] = {"item_name_to_id": {}}
+        self.assertEqual(view["Custom Game"], {"item_name_to_id": {}})
+        self.assertEqual(len(view), 2)
+        with self.assertRaises(KeyError):
+            view["Other Game"]
@@ -59,6 +59,8 @@ class AutoSNIClientRegister(abc.ABCMeta):
 
     @staticmethod
     async def get_handler(ctx: SNIContext) -> Optional[SNIClient]:
+        from worlds import load_all_worlds
+        load_all_worlds()  # worlds register their handlers on import
         for _game, handler in AutoSNIClientRegister.game_handlers.items():
             if await handler.validate_rom(ctx):
                 return handler
@@ -80,6 +82,11 @@ class SNIClient(abc.ABC, metaclass=AutoSNIClientRegister):
         """ TODO: interface documentation here """
         ...
 
+    def watch_memory(self, ctx: SNIContext) -> None:
+        """ override this to add watches to `ctx.snes_watches` once this handler is chosen for a ROM.
+        Watched memory is read right before each `game_watcher` call and only changes reach the watch callbacks. """
+        pass
+
     async def deathlink_kill_player(self, ctx: SNIContext) -> None:
         """ override this with implementation to kill player """
         pass
@@ -1,5 +1,6 @@
 from __future__ import annotations
 
+import functools
 import hashlib
 import logging
 import pathlib
@@ -7,8 +8,8 @@ import sys
 import time
 from random import Random
 from dataclasses import make_dataclass
-from typing import (Any, Callable, ClassVar, Dict, FrozenSet, List, Mapping, Optional, Set, TextIO, Tuple,
-                    TYPE_CHECKING, Type, Union)
+from typing import (Any, Callable, ClassVar, Dict, FrozenSet, ItemsView, Iterator, List, Mapping, MutableMapping,
+                    Optional, Set, TextIO, Tuple, TYPE_CHECKING, Type, Union, ValuesView)
 
 from Options import item_and_loc_options, OptionGroup, PerGameCommonOptions
 from BaseClasses import CollectionState
@@ -21,8 +22,72 @@ if TYPE_CHECKING:
 perf_logger = logging.getLogger("performance")
 
 
+class WorldTypes(MutableMapping[str, "AutoWorldRegister"]):
+    """
+    Registered worlds by game. Worlds known from the world index are imported when they are first looked up.
+    Iterating the game names and len don't import worlds, looking up items, values or membership does.
+    """
+    loaded: Dict[str, AutoWorldRegister]
+    _loaders: Dict[str, Callable[[], Any]]
+    """game -> import of the world source providing it"""
+    _games: Dict[str, None]
+    """all games in order of registration"""
+
+    def __init__(self) -> None:
+        self.loaded = {}
+        self._loaders = {}
+        self._games = {}
+
+    def register_lazy(self, game: str, load: Callable[[], Any]) -> None:
+        self._loaders[game] = load
+        self._games[game] = None
+
+    def _load(self, game: str) -> bool:
+        load = self._loaders.pop(game, None)
+        if load:
+            load()
+            if game not in self.loaded:  # failed to load
+                self._games.pop(game, None)
+        return game in self.loaded
+
+    def _loaded_in_order(self) -> Dict[str, AutoWorldRegister]:
+        for game in list(self._loaders):
+            self._load(game)
+        return {game: self.loaded[game] for game in self._games}
+
+    def __getitem__(self, game: str) -> AutoWorldRegister:
+        if game in self.loaded or self._load(game):
+            return self.loaded[game]
+        raise KeyError(game)
+
+    def __contains__(self, game: object) -> bool:
+        return game in self.loaded or (isinstance(game, str) and self._load(game))
+
+    def __setitem__(self, game: str, world: AutoWorldRegister) -> None:
+        self.loaded[game] = world
+        self._loaders.pop(game, None)
+        self._games[game] = None
+
+    def __delitem__(self, game: str) -> None:
+        del self._games[game]
+        self._loaders.pop(game, None)
+        self.loaded.pop(game, None)
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(list(self._games))
+
+    def __len__(self) -> int:
+        return len(self._games)
+
+    def items(self) -> ItemsView[str, AutoWorldRegister]:
+        return self._loaded_in_order().items()
+
+    def values(self) -> ValuesView[AutoWorldRegister]:
+        return self._loaded_in_order().values()
+
+
 class AutoWorldRegister(type):
-    world_types: Dict[str, Type[World]] = {}
+    world_types: WorldTypes = WorldTypes()
     __file__: str
     zip_path: Optional[str]
     settings_key: str
@@ -78,10 +143,15 @@ class AutoWorldRegister(type):
             dct["options_dataclass"] = make_dataclass(f"{name}Options", dct["option_definitions"].items(),
                                                       bases=(PerGameCommonOptions,))
 
+        # CollectionState copies share prog_items until they get changed, so unshare them before collect/remove
+        for method_name in ("collect", "remove"):
+            if method_name in dct:
+                dct[method_name] = _owning_prog_items(dct[method_name])
+
         # construct class
         new_class = super().__new__(mcs, name, bases, dct)
         if "game" in dct:
-            if dct["game"] in AutoWorldRegister.world_types:
+            if dct["game"] in AutoWorldRegister.world_types.loaded:
                 raise RuntimeError(f"""Game {dct["game"]} already registered.""")
             AutoWorldRegister.world_types[dct["game"]] = new_class
         new_class.__file__ = sys.modules[new_class.__module__].__file__
@@ -95,6 +165,16 @@ class AutoWorldRegister(type):
         return new_class
 
 
+def _owning_prog_items(method: Callable[[World, CollectionState, Item], bool]) \
+        -> Callable[[World, CollectionState, Item], bool]:
+    @functools.wraps(method)
+    def wrapper(self: World, state: CollectionState, item: Item) -> bool:
+        state.own_prog_items(self.player)
+        state.own_prog_items(item.player)
+        return method(self, state, item)
+    return wrapper
+
+
 class AutoLogicRegister(type):
     def __new__(mcs, name: str, bases: Tuple[type, ...], dct: Dict[str, Any]) -> AutoLogicRegister:
         new_class = super().__new__(mcs, name, bases, dct)
@@ -149,6 +229,8 @@ def _timed_call(method: Callable[..., Any], *args: Any,
     start = time.perf_counter()
     ret = method(*args)
     taken = time.perf_counter() - start
+    if multiworld and multiworld.profiler:
+        multiworld.profiler.add_call(method, taken, player)
     if taken > 1.0:
         if player and multiworld:
             perf_logger.info(f"Took {taken:.4f} seconds in {method.__qualname__} for player {player}, "
@@ -195,7 +277,7 @@ def call_stage(multiworld: "MultiWorld", method_name: str, *args: Any) -> None:
     for world_type in sorted(world_types, key=lambda world: world.__name__):
         stage_callable = getattr(world_type, f"stage_{method_name}", None)
         if stage_callable:
-            _timed_call(stage_callable, multiworld, *args)
+            _timed_call(stage_callable, multiworld, *args, multiworld=multiworld)
 
 
 class WebWorld(metaclass=WebWorldRegister):
@@ -289,6 +371,14 @@ class World(metaclass=AutoWorldRegister):
     hidden: ClassVar[bool] = False
     """Hide World Type from various views. Does not remove functionality."""
 
+    incremental_reachability: ClassVar[bool] = False
+    """
+    Opt into incremental reachability. CollectionState then tracks which item names each Entrance and Location access
+    rule looks up, and collecting an item only re-evaluates the rules that looked up a changed name.
+    Only enable this if all access rules depend solely on this player's items, queried through state.prog_items or
+    the has/count helpers, and on region access that is registered with register_indirect_condition.
+    """
+
     web: ClassVar[WebWorld] = WebWorld()
     """see WebWorld for options"""
 
@@ -399,6 +489,15 @@ class World(metaclass=AutoWorldRegister):
         """
         pass
 
+    def get_output_job(self, output_directory: str) -> Optional[Callable[[], Any]]:
+        """
+        Alternative to generate_output for CPU-bound output. Prepare what needs the multiworld, then return a picklable
+        callable, like a functools.partial of a module level function or of a patch's write method, that finishes the
+        output on its own. Depending on the output_processes setting it then runs in a separate process.
+        This method gets called from a threadpool, do not use multiworld.random here.
+        """
+        return None
+
     def fill_slot_data(self) -> Mapping[str, Any]:  # json of WebHostLib.models.Slot
         """
         What is returned from this function will be in the `slot_data` field
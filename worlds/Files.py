@@ -33,6 +33,8 @@ class AutoPatchRegister(abc.ABCMeta):
 
     @staticmethod
     def get_handler(file: str) -> Optional[AutoPatchRegister]:
+        from . import load_all_worlds
+        load_all_worlds()  # worlds register their patch types on import
         for file_ending, handler in AutoPatchRegister.file_endings.items():
             if file.endswith(file_ending):
                 return handler
@@ -286,6 +288,16 @@ class APDeltaPatch(APProcedurePatch):
         super(APDeltaPatch, self).write_contents(opened_zipfile)
 
 
+def write_delta_patch(patch: APDeltaPatch) -> None:
+    """Writes the patch, then removes the patched file it was diffed against. Meant as a World's output job."""
+    import os
+    try:
+        patch.write()
+    finally:
+        if os.path.exists(patch.patched_path):
+            os.unlink(patch.patched_path)
+
+
 class APTokenTypes(IntEnum):
     WRITE = 0
     COPY = 1
@@ -1,15 +1,21 @@
 import importlib
 import importlib.util
+import hashlib
 import logging
 import os
+import pathlib
+import pickle
 import sys
 import warnings
 import zipimport
 import time
 import dataclasses
-from typing import Dict, List, TypedDict
+from typing import Any, Dict, FrozenSet, List, Optional, TypedDict, TYPE_CHECKING
 
-from Utils import local_path, user_path
+from Utils import cache_path, local_path, user_path, __version__
+
+if TYPE_CHECKING:
+    from .AutoWorld import AutoWorldRegister as WorldType
 
 local_folder = os.path.dirname(__file__)
 user_folder = user_path("worlds") if user_path() != local_path() else user_path("custom_worlds")
@@ -27,6 +33,9 @@ __all__ = {
     "GamesPackage",
     "DataPackage",
     "failed_world_loads",
+    "WorldInfo",
+    "world_info",
+    "load_all_worlds",
 }
 
 
@@ -45,12 +54,31 @@ class DataPackage(TypedDict):
     games: Dict[str, GamesPackage]
 
 
+@dataclasses.dataclass(frozen=True)
+class WorldInfo:
+    """What is needed to know about a world without importing it, cached in the world index."""
+    game: str
+    hidden: bool
+    hint_blacklist: FrozenSet[str]
+    settings_key: str
+    has_settings: bool
+    """whether the world defines a settings.Group for host.yaml"""
+
+    @classmethod
+    def from_world(cls, world: "WorldType") -> "WorldInfo":
+        annotation = world.__annotations__.get("settings", None)
+        return cls(world.game, world.hidden, frozenset(world.hint_blacklist), world.settings_key,
+                   annotation is not None and annotation != "ClassVar[Optional['Group']]")
+
+
 @dataclasses.dataclass(order=True)
 class WorldSource:
     path: str  # typically relative path from this module
     is_zip: bool = False
     relative: bool = True  # relative to regular world import folder
     time_taken: float = -1.0
+    loaded: Optional[bool] = dataclasses.field(default=None, compare=False)
+    """None until load was called, then whether loading succeeded"""
 
     def __repr__(self) -> str:
         return f"{self.__class__.__name__}({self.path}, is_zip={self.is_zip}, relative={self.relative})"
@@ -61,7 +89,35 @@ class WorldSource:
             return os.path.join(local_folder, self.path)
         return self.path
 
+    def fingerprint(self) -> str:
+        """Changes when any file of the world changes, to tell if the world index is still valid for it."""
+        path = self.resolved_path
+        if self.is_zip:
+            stat = os.stat(path)
+            entries = [("", stat.st_size, stat.st_mtime_ns)]
+        else:
+            entries = []
+            folders = [""]
+            while folders:
+                folder = folders.pop()
+                with os.scandir(os.path.join(path, folder)) as scanned:
+                    for entry in scanned:
+                        if entry.is_dir():
+                            if entry.name != "__pycache__":
+                                folders.append(os.path.join(folder, entry.name))
+                        else:
+                            stat = entry.stat()
+                            entries.append((os.path.join(folder, entry.name), stat.st_size, stat.st_mtime_ns))
+            entries.sort()
+        return hashlib.sha1(repr(entries).encode()).hexdigest()
+
     def load(self) -> bool:
+        """Imports the world, only once."""
+        if self.loaded is None:
+            self.loaded = self._load()
+        return self.loaded
+
+    def _load(self) -> bool:
         try:
             start = time.perf_counter()
             if self.is_zip:
@@ -117,15 +173,94 @@ for folder in (folder for folder in (user_folder, local_folder) if folder):
             elif entry.is_file() and entry.name.endswith(".apworld"):
                 world_sources.append(WorldSource(file_name, is_zip=True, relative=relative))
 
-# import all submodules to trigger AutoWorldRegister
 world_sources.sort()
-for world_source in world_sources:
-    world_source.load()
 
-# Build the data package for each game.
+# The world index caches the games and data packages of each world source, so worlds that did not change since the
+# index was written only get imported when they are first looked up in AutoWorldRegister.world_types.
+_index_path = cache_path("world_index.pickle")
+
+
+def _index_header() -> Dict[str, Any]:
+    """The index is only valid for the same version and world loading code."""
+    return {
+        "version": __version__,
+        "core": [(os.stat(path).st_size, os.stat(path).st_mtime_ns) for path in
+                 (__file__, os.path.join(local_folder, "AutoWorld.py"))],
+    }
+
+
+def _read_index() -> Dict[str, Dict[str, Any]]:
+    """source path -> fingerprint, world infos and data packages"""
+    try:
+        with open(_index_path, "rb") as f:
+            index = pickle.load(f)
+        if index["header"] == _index_header():
+            return index["sources"]
+    except FileNotFoundError:
+        pass
+    except Exception as e:
+        logging.debug(f"Could not read world index, rebuilding it: {e!r}")
+    return {}
+
+
+def _write_index(sources: Dict[str, Dict[str, Any]]) -> None:
+    temp_path = f"{_index_path}.{os.getpid()}.tmp"
+    try:
+        os.makedirs(os.path.dirname(_index_path), exist_ok=True)
+        with open(temp_path, "wb") as f:
+            pickle.dump({"header": _index_header(), "sources": sources}, f, pickle.HIGHEST_PROTOCOL)
+        os.replace(temp_path, _index_path)
+    except OSError as e:
+        logging.debug(f"Could not write world index: {e!r}")
+
+
 from .AutoWorld import AutoWorldRegister
 
-network_data_package: DataPackage = {
-    "games": {world_name: world.get_data_package_data() for world_name, world in AutoWorldRegister.world_types.items()},
-}
+
+def _source_worlds(source: WorldSource) -> List["WorldType"]:
+    """The loaded worlds whose files are in source, no matter which source imported them first."""
+    path = pathlib.Path(source.resolved_path)
+    if source.is_zip:
+        return [world for world in AutoWorldRegister.world_types.loaded.values() if world.zip_path == path]
+    return [world for world in AutoWorldRegister.world_types.loaded.values()
+            if not world.zip_path and path in pathlib.Path(world.__file__).parents]
+
+
+world_info: Dict[str, WorldInfo] = {}
+network_data_package: DataPackage = {"games": {}}
+
+_index = _read_index()
+_new_index: Dict[str, Dict[str, Any]] = {}
+for world_source in world_sources:
+    _fingerprint = world_source.fingerprint()
+    _entry = _index.get(world_source.resolved_path)
+    if _entry and _entry["fingerprint"] == _fingerprint and not any(info.game in world_info
+                                                                     for info in _entry["games"]):
+        for _info in _entry["games"]:
+            if _info.game not in AutoWorldRegister.world_types.loaded:  # not imported by an earlier source
+                AutoWorldRegister.world_types.register_lazy(_info.game, world_source.load)
+    else:
+        # new or changed, import it now to find out its games
+        if not world_source.load():
+            continue
+        _worlds = _source_worlds(world_source)
+        _entry = {
+            "fingerprint": _fingerprint,
+            "games": [WorldInfo.from_world(world) for world in _worlds],
+            "packages": {world.game: world.get_data_package_data() for world in _worlds},
+        }
+    _new_index[world_source.resolved_path] = _entry
+    for _info in _entry["games"]:
+        world_info[_info.game] = _info
+        network_data_package["games"][_info.game] = _entry["packages"][_info.game]
+
+if _new_index != _index:
+    _write_index(_new_index)
+del _index, _new_index
+
+
+def load_all_worlds() -> None:
+    """Imports all worlds, for tools that need what worlds register on import, like launcher components."""
+    for source in world_sources:
+        source.load()
 
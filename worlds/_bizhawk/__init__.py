@@ -7,15 +7,26 @@ naively passed to BizHawk without validation or modification.
 
 import asyncio
 import base64
+import collections
 import enum
 import json
 import sys
+import time
 import typing
 
+from .._memory_watch import MemoryChange, MemoryWatcher
+
 
 BIZHAWK_SOCKET_PORT_RANGE_START = 43055
 BIZHAWK_SOCKET_PORT_RANGE_SIZE = 5
 
+MAX_IN_FLIGHT = 4
+"""How many messages may wait for a response from the connector at the same time"""
+BINARY_READ_SIZE = 256
+"""Reads of at least this many bytes in total are sent back as raw bytes instead of base64"""
+
+_T = typing.TypeVar("_T")
+
 
 class ConnectionStatus(enum.IntEnum):
     NOT_CONNECTED = 1
@@ -43,50 +54,152 @@ class SyncError(Exception):
     pass
 
 
+class RoundTripStats:
+    """Round trip times of messages sent to the connector script, to see how fast the client can poll"""
+    count: int
+    total: float
+    recent: typing.Deque[float]
+    peak_in_flight: int
+    """most messages that were waiting for a response at the same time"""
+
+    def __init__(self, window: int = 100) -> None:
+        self.recent = collections.deque(maxlen=window)
+        self.reset()
+
+    def reset(self) -> None:
+        self.count = 0
+        self.total = 0.0
+        self.recent.clear()
+        self.peak_in_flight = 0
+
+    def add(self, seconds: float) -> None:
+        self.count += 1
+        self.total += seconds
+        self.recent.append(seconds)
+
+    def __str__(self) -> str:
+        if not self.count:
+            return "No round trips yet"
+        return (f"{self.count} round trips averaging {self.total / self.count * 1000:.1f} ms. "
+                f"Last {len(self.recent)}: average {sum(self.recent) / len(self.recent) * 1000:.1f} ms, "
+                f"min {min(self.recent) * 1000:.1f} ms, max {max(self.recent) * 1000:.1f} ms. "
+                f"Up to {self.peak_in_flight} in flight.")
+
+
 class BizHawkContext:
     streams: typing.Optional[typing.Tuple[asyncio.StreamReader, asyncio.StreamWriter]]
     connection_status: ConnectionStatus
+    latency: RoundTripStats
     _lock: asyncio.Lock
+    _in_flight: asyncio.Semaphore
+    _in_flight_count: int
+    _last_response: typing.Optional[asyncio.Event]
+    _next_request_id: int
     _port: typing.Optional[int]
 
-    def __init__(self) -> None:
+    def __init__(self, max_in_flight: int = MAX_IN_FLIGHT) -> None:
         self.streams = None
         self.connection_status = ConnectionStatus.NOT_CONNECTED
+        self.latency = RoundTripStats()
         self._lock = asyncio.Lock()
+        self._in_flight = asyncio.Semaphore(max_in_flight)
+        self._in_flight_count = 0
+        self._last_response = None
+        self._next_request_id = 0
         self._port = None
 
-    async def _send_message(self, message: str):
-        async with self._lock:
-            if self.streams is None:
+    def _close(self, streams: typing.Tuple[asyncio.StreamReader, asyncio.StreamWriter]) -> None:
+        streams[1].close()
+        if self.streams is streams:
+            self.streams = None
+            self.connection_status = ConnectionStatus.NOT_CONNECTED
+
+    async def _exchange(self, message: str,
+                        receive: typing.Callable[[asyncio.StreamReader], typing.Awaitable[_T]]) -> _T:
+        """Sends a message without waiting for earlier messages to be answered, then waits for its own response.
+
+        The connector answers messages in the order it received them, so each message reads its response with `receive`
+        once the message sent before it has read its own."""
+        if self.streams is None:
+            raise NotConnectedError("You tried to send a request before a connection to BizHawk was made")
+
+        async with self._in_flight:
+            streams = self.streams
+            if streams is None:
                 raise NotConnectedError("You tried to send a request before a connection to BizHawk was made")
 
+            reader, writer = streams
+            previous_response = self._last_response
+            response_read = self._last_response = asyncio.Event()
+            self._in_flight_count += 1
+            self.latency.peak_in_flight = max(self.latency.peak_in_flight, self._in_flight_count)
+            start = time.perf_counter()
             try:
-                reader, writer = self.streams
-                writer.write(message.encode("utf-8") + b"\n")
-                await asyncio.wait_for(writer.drain(), timeout=5)
-
-                res = await asyncio.wait_for(reader.readline(), timeout=5)
+                async with self._lock:
+                    writer.write(message.encode("utf-8") + b"\n")
+                    await asyncio.wait_for(writer.drain(), timeout=5)
 
-                if res == b"":
-                    writer.close()
-                    self.streams = None
-                    self.connection_status = ConnectionStatus.NOT_CONNECTED
+                if previous_response is not None:
+                    await previous_response.wait()
+                if self.streams is not streams:
                     raise RequestFailedError("Connection closed")
 
+                res = await receive(reader)
+                self.latency.add(time.perf_counter() - start)
+
                 if self.connection_status == ConnectionStatus.TENTATIVE:
                     self.connection_status = ConnectionStatus.CONNECTED
 
-                return res.decode("utf-8")
+                return res
             except asyncio.TimeoutError as exc:
-                writer.close()
-                self.streams = None
-                self.connection_status = ConnectionStatus.NOT_CONNECTED
+                self._close(streams)
                 raise RequestFailedError("Connection timed out") from exc
             except ConnectionResetError as exc:
-                writer.close()
-                self.streams = None
-                self.connection_status = ConnectionStatus.NOT_CONNECTED
+                self._close(streams)
                 raise RequestFailedError("Connection reset") from exc
+            except asyncio.IncompleteReadError as exc:
+                self._close(streams)
+                raise RequestFailedError("Connection closed") from exc
+            except (RequestFailedError, SyncError):
+                self._close(streams)
+                raise
+            finally:
+                self._in_flight_count -= 1
+                response_read.set()
+
+    async def _receive_line(self, reader: asyncio.StreamReader) -> str:
+        res = await asyncio.wait_for(reader.readline(), timeout=5)
+        if res == b"":
+            raise RequestFailedError("Connection closed")
+        return res.decode("utf-8")
+
+    async def _send_message(self, message: str) -> str:
+        return await self._exchange(message, self._receive_line)
+
+    async def _send_batch(self, req_list: typing.List[typing.Dict[str, typing.Any]],
+                          binary: bool) -> typing.List[typing.Dict[str, typing.Any]]:
+        """Sends a list of requests with a request id and returns the responses. With `binary`, the data of
+        `READ_RESPONSE`s is sent as raw bytes after the responses instead of base64 and put into their `value`."""
+        request_id = self._next_request_id
+        self._next_request_id += 1
+
+        async def receive(reader: asyncio.StreamReader) -> typing.List[typing.Dict[str, typing.Any]]:
+            message = json.loads(await self._receive_line(reader))
+            if message["id"] != request_id:
+                raise SyncError(f"Expected response to request {request_id} but got {message['id']}")
+
+            responses: typing.List[typing.Dict[str, typing.Any]] = message["responses"]
+            if binary:
+                sizes = [response["size"] for response in responses if response["type"] == "READ_RESPONSE"]
+                data = await asyncio.wait_for(reader.readexactly(sum(sizes)), timeout=5)
+                offset = 0
+                for response in responses:
+                    if response["type"] == "READ_RESPONSE":
+                        response["value"] = data[offset:offset + response["size"]]
+                        offset += response["size"]
+            return responses
+
+        return await self._exchange(json.dumps({"id": request_id, "binary": binary, "requests": req_list}), receive)
 
 
 async def connect(ctx: BizHawkContext) -> bool:
@@ -100,6 +213,7 @@ async def connect(ctx: BizHawkContext) -> bool:
             ctx.streams = await asyncio.open_connection("127.0.0.1", port)
             ctx.connection_status = ConnectionStatus.TENTATIVE
             ctx._port = port
+            ctx.latency.reset()
             return True
         except (TimeoutError, ConnectionRefusedError):
             continue
@@ -122,11 +236,15 @@ async def get_script_version(ctx: BizHawkContext) -> int:
     return int(await ctx._send_message("VERSION"))
 
 
-async def send_requests(ctx: BizHawkContext, req_list: typing.List[typing.Dict[str, typing.Any]]) -> typing.List[typing.Dict[str, typing.Any]]:
+async def send_requests(ctx: BizHawkContext, req_list: typing.List[typing.Dict[str, typing.Any]],
+                        binary: bool = False) -> typing.List[typing.Dict[str, typing.Any]]:
     """Sends a list of requests to the BizHawk connector and returns their responses.
 
+    Requests sent concurrently (e.g. with `asyncio.gather`) are pipelined; the connector handles all of them that arrived
+    on the same frame. If `binary` is True, the `value` of each `READ_RESPONSE` is the read `bytes` instead of base64.
+
     It's likely you want to use the wrapper functions instead of this."""
-    responses = json.loads(await ctx._send_message(json.dumps(req_list)))
+    responses = await ctx._send_batch(req_list, binary)
     errors: typing.List[ConnectorError] = []
 
     for response in responses:
@@ -250,7 +368,7 @@ async def guarded_read(ctx: BizHawkContext, read_list: typing.List[typing.Tuple[
         "address": address,
         "size": size,
         "domain": domain
-    } for address, size, domain in read_list])
+    } for address, size, domain in read_list], sum(size for _, size, _ in read_list) >= BINARY_READ_SIZE)
 
     ret: typing.List[bytes] = []
     for item in res:
@@ -261,7 +379,8 @@ async def guarded_read(ctx: BizHawkContext, read_list: typing.List[typing.Tuple[
             if item["type"] != "READ_RESPONSE":
                 raise SyncError(f"Expected response of type READ_RESPONSE or GUARD_RESPONSE but got {item['type']}")
 
-            ret.append(base64.b64decode(item["value"]))
+            value = item["value"]
+            ret.append(value if isinstance(value, bytes) else base64.b64decode(value))
 
     return ret
 
@@ -324,3 +443,11 @@ async def write(ctx: BizHawkContext, write_list: typing.List[typing.Tuple[int, t
     - `value` is a list of bytes to write, in order, starting at `address`
     - `domain` is the name of the region of memory the address corresponds to"""
     await guarded_write(ctx, write_list, [])
+
+
+async def read_watches(ctx: BizHawkContext, watcher: MemoryWatcher) -> typing.List[MemoryChange]:
+    """Reads the memory watched by `watcher` in one request and returns the watches whose bytes changed since the last
+    read. See `worlds/_memory_watch.py`."""
+    if not watcher:
+        return []
+    return watcher.update(await read(ctx, watcher.reads))
@@ -55,6 +55,8 @@ class AutoBizHawkClientRegister(abc.ABCMeta):
 
     @staticmethod
     async def get_handler(ctx: "BizHawkClientContext", system: str) -> Optional[BizHawkClient]:
+        from worlds import load_all_worlds
+        load_all_worlds()  # worlds register their handlers on import
         for systems, handlers in AutoBizHawkClientRegister.game_handlers.items():
             if system in systems:
                 for handler in handlers.values():
@@ -90,6 +92,12 @@ class BizHawkClient(abc.ABC, metaclass=AutoBizHawkClientRegister):
         username."""
         pass
 
+    def watch_memory(self, ctx: "BizHawkClientContext") -> None:
+        """Called once when this client is chosen for the loaded ROM. You may override this to add watches to
+        `ctx.watches` instead of reading the same memory yourself in every `game_watcher` call. Watched memory is read
+        right before each `game_watcher` call, and watch callbacks are only called when the watched bytes change."""
+        pass
+
     @abc.abstractmethod
     async def game_watcher(self, ctx: "BizHawkClientContext") -> None:
         """Runs on a loop with the approximate interval `ctx.watcher_timeout`. The currently loaded ROM is guaranteed
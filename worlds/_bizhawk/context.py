@@ -13,11 +13,12 @@ import Patch
 import Utils
 
 from . import BizHawkContext, ConnectionStatus, NotConnectedError, RequestFailedError, connect, disconnect, get_hash, \
-    get_script_version, get_system, ping
+    get_script_version, get_system, ping, read_watches
+from .._memory_watch import MemoryWatcher, notify
 from .client import BizHawkClient, AutoBizHawkClientRegister
 
 
-EXPECTED_SCRIPT_VERSION = 1
+EXPECTED_SCRIPT_VERSION = 2
 
 
 class AuthStatus(enum.IntEnum):
@@ -29,7 +30,7 @@ class AuthStatus(enum.IntEnum):
 
 class BizHawkClientCommandProcessor(ClientCommandProcessor):
     def _cmd_bh(self):
-        """Shows the current status of the client's connection to BizHawk"""
+        """Shows the current status of the client's connection to BizHawk and how fast it responds"""
         if isinstance(self.ctx, BizHawkClientContext):
             if self.ctx.bizhawk_ctx.connection_status == ConnectionStatus.NOT_CONNECTED:
                 logger.info("BizHawk Connection Status: Not Connected")
@@ -37,6 +38,7 @@ class BizHawkClientCommandProcessor(ClientCommandProcessor):
                 logger.info("BizHawk Connection Status: Tentatively Connected")
             elif self.ctx.bizhawk_ctx.connection_status == ConnectionStatus.CONNECTED:
                 logger.info("BizHawk Connection Status: Connected")
+                logger.info(f"Round trips: {self.ctx.bizhawk_ctx.latency}")
 
 
 class BizHawkClientContext(CommonContext):
@@ -47,6 +49,8 @@ class BizHawkClientContext(CommonContext):
     slot_data: Optional[Dict[str, Any]] = None
     rom_hash: Optional[str] = None
     bizhawk_ctx: BizHawkContext
+    watches: MemoryWatcher
+    """Memory the client handler watches, read before each call to its `game_watcher`"""
 
     watcher_timeout: float
     """The maximum amount of time the game watcher loop will wait for an update from the server before executing"""
@@ -57,6 +61,7 @@ class BizHawkClientContext(CommonContext):
         self.password_requested = False
         self.client_handler = None
         self.bizhawk_ctx = BizHawkContext()
+        self.watches = MemoryWatcher()
         self.watcher_timeout = 0.5
 
     def run_gui(self):
@@ -143,6 +148,7 @@ async def _game_watcher(ctx: BizHawkClientContext):
                     continue
 
                 showed_no_handler_message = False
+                ctx.watches.reset()
 
                 script_version = await get_script_version(ctx.bizhawk_ctx)
 
@@ -173,6 +179,7 @@ async def _game_watcher(ctx: BizHawkClientContext):
             ctx.rom_hash = rom_hash
 
             if ctx.client_handler is None:
+                ctx.watches.clear()
                 system = await get_system(ctx.bizhawk_ctx)
                 ctx.client_handler = await AutoBizHawkClientRegister.get_handler(ctx, system)
 
@@ -185,6 +192,9 @@ async def _game_watcher(ctx: BizHawkClientContext):
                 else:
                     showed_no_handler_message = False
                     logger.info(f"Running handler for {ctx.client_handler.game}")
+                    ctx.client_handler.watch_memory(ctx)
+
+            changes = await read_watches(ctx.bizhawk_ctx, ctx.watches)
 
         except RequestFailedError as exc:
             logger.info(f"Lost connection to BizHawk: {exc.args[0]}")
@@ -199,7 +209,8 @@ async def _game_watcher(ctx: BizHawkClientContext):
         else:
             ctx.auth_status = AuthStatus.NOT_AUTHENTICATED
 
-        # Call the handler's game watcher
+        # Call the watch callbacks and the handler's game watcher
+        await notify(changes)
         await ctx.client_handler.game_watcher(ctx)
 
 
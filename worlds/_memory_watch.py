@@ -0,0 +1,133 @@
+"""
+Memory watches let a client register the memory ranges it cares about once, instead of reading them itself every time
+its game watcher runs. The ranges of all watches are coalesced into as few reads as possible, and after each read only
+the watches whose bytes changed are reported.
+
+This module only does the bookkeeping. Reading memory is left to the SNI and BizHawk clients, which poll the watches of
+their context before calling the game handler's `game_watcher`.
+"""
+
+import inspect
+import typing
+
+
+class MemoryChange(typing.NamedTuple):
+    watch: "Watch"
+    old: typing.Optional[bytes]
+    """the bytes at the previous read, None if this is the first read since the watch was added or reset"""
+    new: bytes
+
+    def changed_offsets(self) -> typing.List[int]:
+        """Offsets from the watch's address of the bytes that changed."""
+        if self.old is None:
+            return list(range(len(self.new)))
+        return [offset for offset, (old, new) in enumerate(zip(self.old, self.new)) if old != new]
+
+
+WatchCallback = typing.Callable[[MemoryChange], typing.Optional[typing.Awaitable[None]]]
+
+
+class Watch:
+    __slots__ = ("address", "size", "domain", "callback", "data")
+
+    address: int
+    size: int
+    domain: str
+    """memory domain for clients that have them, like BizHawk"""
+    callback: typing.Optional[WatchCallback]
+    data: typing.Optional[bytes]
+    """the bytes at the last read"""
+
+    def __init__(self, address: int, size: int, domain: str, callback: typing.Optional[WatchCallback]) -> None:
+        self.address = address
+        self.size = size
+        self.domain = domain
+        self.callback = callback
+        self.data = None
+
+    def __repr__(self) -> str:
+        return f"{self.__class__.__name__}({hex(self.address)}, {self.size}, {self.domain!r})"
+
+
+class MemoryWatcher:
+    watches: typing.List[Watch]
+    max_gap: int
+    """ranges that are at most this many bytes apart are read together"""
+    _reads: typing.Optional[typing.List[typing.Tuple[int, int, str]]]
+    _slices: typing.List[typing.Tuple[Watch, int, int]]
+    """watch, index into reads, offset into that read"""
+
+    def __init__(self, max_gap: int = 0) -> None:
+        self.watches = []
+        self.max_gap = max_gap
+        self._reads = None
+        self._slices = []
+
+    def __len__(self) -> int:
+        return len(self.watches)
+
+    def watch(self, address: int, size: int, callback: typing.Optional[WatchCallback] = None,
+              domain: str = "") -> Watch:
+        """Adds a watch for `size` bytes at `address`. `callback` is called with a `MemoryChange` whenever they change,
+        including the first time they are read, and may be a coroutine function."""
+        if size <= 0:
+            raise ValueError(f"Can't watch {size} bytes")
+        watch = Watch(address, size, domain, callback)
+        self.watches.append(watch)
+        self._reads = None
+        return watch
+
+    def unwatch(self, watch: Watch) -> None:
+        self.watches.remove(watch)
+        self._reads = None
+
+    def clear(self) -> None:
+        """Removes all watches, e.g. when the game handler changes."""
+        self.watches.clear()
+        self._reads = None
+
+    def reset(self) -> None:
+        """Forgets the last read bytes, so every watch is reported again after the next read, e.g. after reconnecting."""
+        for watch in self.watches:
+            watch.data = None
+
+    @property
+    def reads(self) -> typing.List[typing.Tuple[int, int, str]]:
+        """The `(address, size, domain)` ranges to read, with overlapping and adjacent watches coalesced."""
+        if self._reads is None:
+            self._reads = []
+            self._slices = []
+            end = 0
+            for watch in sorted(self.watches, key=lambda watch: (watch.domain, watch.address)):
+                if self._reads and self._reads[-1][2] == watch.domain and watch.address <= end + self.max_gap:
+                    address, size, domain = self._reads[-1]
+                    end = max(end, watch.address + watch.size)
+                    self._reads[-1] = (address, end - address, domain)
+                else:
+                    end = watch.address + watch.size
+                    self._reads.append((watch.address, watch.size, watch.domain))
+                self._slices.append((watch, len(self._reads) - 1, watch.address - self._reads[-1][0]))
+        return self._reads
+
+    def update(self, results: typing.Sequence[bytes]) -> typing.List[MemoryChange]:
+        """Takes the bytes read for each of `reads`, in the same order, and returns the changes since the last read."""
+        reads = self.reads
+        if len(results) != len(reads):
+            raise ValueError(f"Expected {len(reads)} results but got {len(results)}")
+
+        changes: typing.List[MemoryChange] = []
+        for watch, index, offset in self._slices:
+            data = results[index][offset:offset + watch.size]
+            if data != watch.data:
+                changes.append(MemoryChange(watch, watch.data, data))
+                watch.data = data
+        return changes
+
+
+async def notify(changes: typing.Iterable[MemoryChange]) -> None:
+    """Calls the callbacks of the changed watches, in the order they were changed."""
+    for change in changes:
+        if change.watch.callback is not None:
+            result = change.watch.callback(change)
+            if inspect.isawaitable(result):
+                await result
@@ -31,7 +31,9 @@ def fake_pearl_state(state, player):
     if state.has('Moon Pearl', player):
         return state
     fake_state = state.copy()
+    fake_state.own_prog_items(player)
     fake_state.prog_items[player]['Moon Pearl'] += 1
+    fake_state.stale[player] = True
     return fake_state
 
 
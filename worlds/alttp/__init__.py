@@ -1,3 +1,4 @@
+import functools
 import logging
 import os
 import random
@@ -23,6 +24,7 @@ from .Rules import set_rules
 from .Shops import create_shops, Shop, push_shop_inventories, ShopType, price_rate_display, price_type_display_name
 from .SubClasses import ALttPItem, LTTPRegionType
 from worlds.AutoWorld import World, WebWorld, LogicMixin
+from worlds.Files import write_delta_patch
 from .StateHelpers import can_buy_unlimited
 
 lttp_logger = logging.getLogger("A Link to the Past")
@@ -551,7 +553,7 @@ class ALTTPWorld(World):
                     or world.pot_shuffle[player] or world.bush_shuffle[player]
                     or world.killable_thieves[player])
 
-    def generate_output(self, output_directory: str):
+    def get_output_job(self, output_directory: str) -> typing.Callable[[], None]:
         multiworld = self.multiworld
         player = self.player
 
@@ -597,16 +599,16 @@ class ALTTPWorld(World):
 
             rompath = os.path.join(output_directory, f"{self.multiworld.get_out_file_name_base(self.player)}.sfc")
             rom.write_to_file(rompath)
-            patch = LttPDeltaPatch(os.path.splitext(rompath)[0]+LttPDeltaPatch.patch_file_ending, player=player,
-                                   player_name=multiworld.player_name[player], patched_path=rompath)
-            patch.write()
-            os.unlink(rompath)
             self.rom_name = rom.name
         except:
             raise
         finally:
             self.rom_name_available_event.set() # make sure threading continues and errors are collected
 
+        patch = LttPDeltaPatch(os.path.splitext(rompath)[0]+LttPDeltaPatch.patch_file_ending, player=player,
+                               player_name=multiworld.player_name[player], patched_path=rompath)
+        return functools.partial(write_delta_patch, patch)
+
     @classmethod
     def stage_extend_hint_information(cls, world, hint_data: typing.Dict[int, typing.Dict[int, str]]):
         er_hint_data = {player: {} for player in world.get_game_players("A Link to the Past") if
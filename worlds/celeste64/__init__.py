@@ -34,6 +34,7 @@ class Celeste64World(World):
     # Class Data
     game = "Celeste 64"
     web = Celeste64WebWorld()
+    incremental_reachability = True
     options_dataclass = Celeste64Options
     options: Celeste64Options
     location_name_to_id = location_table
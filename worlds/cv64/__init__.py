@@ -1,3 +1,4 @@
+import functools
 import os
 import typing
 import settings
@@ -239,7 +240,7 @@ class CV64World(World):
                     not self.options.multi_hit_breakables:
                 self.multiworld.local_early_items[self.player][iname.left_tower_key] = 1
 
-    def generate_output(self, output_directory: str) -> None:
+    def get_output_job(self, output_directory: str) -> typing.Callable[[], None]:
         active_locations = self.multiworld.get_locations(self.player)
 
         # Location data and shop names, descriptions, and colors
@@ -277,7 +278,7 @@ class CV64World(World):
         rom_path = os.path.join(output_directory, f"{self.multiworld.get_out_file_name_base(self.player)}"
                                                   f"{patch.patch_file_ending}")
 
-        patch.write(rom_path)
+        return functools.partial(patch.write, rom_path)
 
     def get_filler_item_name(self) -> str:
         return self.random.choice(filler_item_names)
@@ -1,4 +1,5 @@
 import dataclasses
+import functools
 import os
 import typing
 import math
@@ -9,6 +10,7 @@ from Options import PerGameCommonOptions
 import Patch
 import settings
 from worlds.AutoWorld import WebWorld, World
+from worlds.Files import write_delta_patch
 
 from .Client import DKC3SNIClient
 from .Items import DKC3Item, ItemData, item_table, inventory_table, junk_table
@@ -157,7 +159,7 @@ class DKC3World(World):
 
         self.multiworld.itempool += itempool
 
-    def generate_output(self, output_directory: str):
+    def get_output_job(self, output_directory: str) -> typing.Callable[[], None]:
         try:
             rom = LocalRom(get_base_rom_path())
             patch_rom(self, rom, self.active_level_list)
@@ -167,16 +169,12 @@ class DKC3World(World):
             rompath = os.path.join(output_directory, f"{self.multiworld.get_out_file_name_base(self.player)}.sfc")
             rom.write_to_file(rompath)
             self.rom_name = rom.name
-
-            patch = DKC3DeltaPatch(os.path.splitext(rompath)[0]+DKC3DeltaPatch.patch_file_ending, player=self.player,
-                                   player_name=self.multiworld.player_name[self.player], patched_path=rompath)
-            patch.write()
-        except:
-            raise
         finally:
             self.rom_name_available_event.set()  # make sure threading continues and errors are collected
-            if os.path.exists(rompath):
-                os.unlink(rompath)
+
+        patch = DKC3DeltaPatch(os.path.splitext(rompath)[0]+DKC3DeltaPatch.patch_file_ending, player=self.player,
+                               player_name=self.multiworld.player_name[self.player], patched_path=rompath)
+        return functools.partial(write_delta_patch, patch)
 
     def modify_multidata(self, multidata: dict):
         import base64
@@ -1,3 +1,4 @@
+import functools
 import logging
 import typing
 
@@ -5,6 +6,7 @@ from BaseClasses import Tutorial, ItemClassification, MultiWorld
 from Fill import fill_restrictive
 from Options import PerGameCommonOptions
 from worlds.AutoWorld import World, WebWorld
+from worlds.Files import write_delta_patch
 from .Items import item_table, item_names, copy_ability_table, animal_friend_table, filler_item_weights, KDL3Item, \
     trap_item_table, copy_ability_access_table, star_item_weights, total_filler_weights
 from .Locations import location_table, KDL3Location, level_consumables, consumable_locations, star_locations
@@ -300,8 +302,7 @@ class KDL3World(World):
         else:
             self.boss_butch_bosses = [False for _ in range(6)]
 
-    def generate_output(self, output_directory: str):
-        rom_path = ""
+    def get_output_job(self, output_directory: str) -> typing.Callable[[], None]:
         try:
             rom = RomData(get_base_rom_path())
             patch_rom(self, rom)
@@ -309,16 +310,12 @@ class KDL3World(World):
             rom_path = os.path.join(output_directory, f"{self.multiworld.get_out_file_name_base(self.player)}.sfc")
             rom.write_to_file(rom_path)
             self.rom_name = rom.name
-
-            patch = KDL3DeltaPatch(os.path.splitext(rom_path)[0] + KDL3DeltaPatch.patch_file_ending, player=self.player,
-                                   player_name=self.multiworld.player_name[self.player], patched_path=rom_path)
-            patch.write()
-        except Exception:
-            raise
         finally:
             self.rom_name_available_event.set()  # make sure threading continues and errors are collected
-            if os.path.exists(rom_path):
-                os.unlink(rom_path)
+
+        patch = KDL3DeltaPatch(os.path.splitext(rom_path)[0] + KDL3DeltaPatch.patch_file_ending, player=self.player,
+                               player_name=self.multiworld.player_name[self.player], patched_path=rom_path)
+        return functools.partial(write_delta_patch, patch)
 
     def modify_multidata(self, multidata: dict):
         # wait for self.rom_name to be available.
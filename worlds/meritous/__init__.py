@@ -37,6 +37,7 @@ class MeritousWorld(World):
 
     game: str = "Meritous"
     topology_present: False
+    incremental_reachability = True
 
     web = MeritousWeb()
 
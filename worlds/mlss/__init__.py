@@ -1,10 +1,11 @@
+import functools
 import os
 import pkgutil
 import typing
 import settings
 from BaseClasses import Tutorial, ItemClassification
 from worlds.AutoWorld import WebWorld, World
-from typing import List, Dict, Any
+from typing import Callable, List, Dict, Any
 from .Locations import all_locations, location_table, bowsers, bowsersMini, hidden, coins
 from .Options import MLSSOptions
 from .Items import MLSSItem, itemList, item_frequencies, item_table
@@ -173,11 +174,11 @@ class MLSSWorld(World):
     def get_filler_item_name(self) -> str:
         return self.random.choice(list(filter(lambda item: item.classification == ItemClassification.filler, itemList)))
 
-    def generate_output(self, output_directory: str) -> None:
+    def get_output_job(self, output_directory: str) -> Callable[[], None]:
         patch = MLSSProcedurePatch(player=self.player, player_name=self.multiworld.player_name[self.player])
         patch.write_file("base_patch.bsdiff4", pkgutil.get_data(__name__, "data/basepatch.bsdiff"))
         write_tokens(self, patch)
         rom_path = os.path.join(
             output_directory, f"{self.multiworld.get_out_file_name_base(self.player)}" f"{patch.patch_file_ending}"
         )
-        patch.write(rom_path)
+        return functools.partial(patch.write, rom_path)
@@ -41,6 +41,21 @@ from ..AutoWorld import World, AutoLogicRegister, WebWorld
 i_o_limiter = threading.Semaphore(2)
 
 
+def write_patch_file(rom: Rom, rom_file: str, outfile_name: str, output_directory: str, player: int,
+                     player_name: str) -> None:
+    """Diffs and compresses the patched rom into an apz5. Meant as OoT's output job."""
+    with i_o_limiter:
+        if not Rom.original:  # a fresh output process, the patch is diffed against the base rom
+            Rom(file=rom_file)
+        rom.update_header()
+        patch_data = create_patch_file(rom)
+
+        apz5 = OoTContainer(patch_data, outfile_name, output_directory,
+            player=player,
+            player_name=player_name)
+        apz5.write()
+
+
 class OOTCollectionState(metaclass=AutoLogicRegister):
     def init_mixin(self, parent: MultiWorld):
         oot_ids = parent.get_game_players(OOTWorld.game) + parent.get_game_groups(OOTWorld.game)
@@ -65,6 +80,9 @@ class OOTCollectionState(metaclass=AutoLogicRegister):
                                      self.day_reachable_regions}
         ret.dampe_reachable_regions = {player: copy.copy(self.adult_reachable_regions[player]) for player in
                                        self.dampe_reachable_regions}
+        # age and time of day reachability are not carried over, so they have to be recomputed
+        for player in self.child_reachable_regions:
+            ret.stale[player] = True
         return ret
 
 
@@ -1040,7 +1058,7 @@ class OOTWorld(World):
                 loc.address = None
 
 
-    def generate_output(self, output_directory: str):
+    def get_output_job(self, output_directory: str) -> typing.Callable[[], None]:
 
         # Write entrances to spoiler log
         all_entrances = self.get_shuffled_entrances()
@@ -1080,7 +1098,8 @@ class OOTWorld(World):
             self.hint_rng = self.multiworld.per_slot_randoms[self.player]
 
             outfile_name = self.multiworld.get_out_file_name_base(self.player)
-            rom = Rom(file=get_options()['oot_options']['rom_file'])
+            rom_file = get_options()['oot_options']['rom_file']
+            rom = Rom(file=rom_file)
             try:
                 if self.hints != 'none':
                     buildWorldGossipHints(self)
@@ -1091,14 +1110,9 @@ class OOTWorld(World):
                 raise e
             finally:
                 self.collectible_flags_available.set()
-            rom.update_header()
-            patch_data = create_patch_file(rom)
-            rom.restore()
-
-            apz5 = OoTContainer(patch_data, outfile_name, output_directory,
-                player=self.player,
-                player_name=self.multiworld.get_player_name(self.player))
-            apz5.write()
+
+        return functools.partial(write_patch_file, rom, rom_file, outfile_name, output_directory, self.player,
+                                 self.multiworld.get_player_name(self.player))
 
 
     # Gathers hint data for OoT. Loops over all world locations for woth, barren, and major item locations.
@@ -3,10 +3,11 @@ Archipelago World definition for Pokemon Emerald Version
 """
 from collections import Counter
 import copy
+import functools
 import logging
 import os
 import pkgutil
-from typing import Any, Set, List, Dict, Optional, Tuple, ClassVar, TextIO, Union
+from typing import Any, Callable, Set, List, Dict, Optional, Tuple, ClassVar, TextIO, Union
 
 from BaseClasses import ItemClassification, MultiWorld, Tutorial, LocationProgressType
 from Fill import FillError, fill_restrictive
@@ -568,7 +569,7 @@ class PokemonEmeraldWorld(World):
                     logging.debug(f"Failed to shuffle HMs for player {self.player}. Retrying.")
                     continue
 
-    def generate_output(self, output_directory: str) -> None:
+    def get_output_job(self, output_directory: str) -> Callable[[], None]:
         self.modified_trainers = copy.deepcopy(emerald_data.trainers)
         self.modified_tmhm_moves = copy.deepcopy(emerald_data.tmhm_moves)
         self.modified_legendary_encounters = copy.deepcopy(emerald_data.legendary_encounters)
@@ -610,7 +611,7 @@ class PokemonEmeraldWorld(World):
 
         # Write Output
         out_file_name = self.multiworld.get_out_file_name_base(self.player)
-        patch.write(os.path.join(output_directory, f"{out_file_name}{patch.patch_file_ending}"))
+        return functools.partial(patch.write, os.path.join(output_directory, f"{out_file_name}{patch.patch_file_ending}"))
 
     def write_spoiler(self, spoiler_handle: TextIO):
         if self.options.dexsanity:
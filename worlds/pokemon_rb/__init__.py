@@ -1,3 +1,4 @@
+import functools
 import os
 import settings
 import typing
@@ -10,6 +11,7 @@ from Utils import __version__
 from BaseClasses import Item, MultiWorld, Tutorial, ItemClassification, LocationProgressType
 from Fill import fill_restrictive, FillError, sweep_from_pool
 from worlds.AutoWorld import World, WebWorld
+from worlds.Files import write_delta_patch
 from worlds.generic.Rules import add_item_rule
 from .items import item_table, item_groups
 from .locations import location_data, PokemonRBLocation
@@ -17,7 +19,7 @@ from .regions import create_regions
 from .options import pokemon_rb_options
 from .rom_addresses import rom_addresses
 from .text import encode_text
-from .rom import generate_output, get_base_rom_bytes, get_base_rom_path, RedDeltaPatch, BlueDeltaPatch
+from .rom import get_output_patch, get_base_rom_bytes, get_base_rom_path, RedDeltaPatch, BlueDeltaPatch
 from .pokemon import process_pokemon_data, process_move_data, verify_hm_moves
 from .encounters import process_pokemon_locations, process_trainer_data
 from .rules import set_rules
@@ -537,8 +539,8 @@ class PokemonRedBlueWorld(World):
     def stage_generate_output(cls, multiworld, output_directory):
         level_scaling(multiworld)
 
-    def generate_output(self, output_directory: str):
-        generate_output(self, output_directory)
+    def get_output_job(self, output_directory: str) -> typing.Callable[[], None]:
+        return functools.partial(write_delta_patch, get_output_patch(self, output_directory))
 
     def modify_multidata(self, multidata: dict):
         rom_name = bytearray(f'AP{__version__.replace(".", "")[0:3]}_{self.player}_{self.multiworld.seed:11}\0',
@@ -3,7 +3,7 @@ import hashlib
 import Utils
 import bsdiff4
 import pkgutil
-from worlds.Files import APDeltaPatch
+from worlds.Files import APDeltaPatch, write_delta_patch
 from .text import encode_text
 from .items import item_table
 from .pokemon import set_mon_palettes
@@ -194,6 +194,11 @@ def write_quizzes(self, data, random):
 
 
 def generate_output(self, output_directory: str):
+    write_delta_patch(get_output_patch(self, output_directory))
+
+
+def get_output_patch(self, output_directory: str) -> APDeltaPatch:
+    """Writes the patched ROM and returns the patch to diff it against the base ROM, which is the slow part."""
     random = self.multiworld.per_slot_randoms[self.player]
     game_version = self.multiworld.game_version[self.player].current_key
     data = bytes(get_base_rom_bytes(game_version))
@@ -625,9 +630,7 @@ def generate_output(self, output_directory: str):
     else:
         patch = BlueDeltaPatch(os.path.splitext(rompath)[0] + BlueDeltaPatch.patch_file_ending, player=self.player,
                                player_name=self.multiworld.player_name[self.player], patched_path=rompath)
-
-    patch.write()
-    os.unlink(rompath)
+    return patch
 
 
 def write_bytes(data, byte_array, address):
@@ -0,0 +1,56 @@
+import concurrent.futures
+import hashlib
+import os
+import tempfile
+import unittest
+import zipfile
+from typing import Dict
+
+from Fill import distribute_items_restrictive
+from test.general import setup_solo_multiworld
+from worlds.AutoWorld import call_all
+from .. import PokemonRedBlueWorld, rom
+
+# generating only needs a base ROM of the right size, the real one can't be part of the tests
+FAKE_BASE_ROM = bytes(0x100000)
+
+
+def use_fake_base_rom() -> None:
+    rom.get_base_rom_bytes = lambda game_version, hash="": FAKE_BASE_ROM
+
+
+def read_patch(output_directory: str) -> Dict[str, str]:
+    """Digests of the members of the patch written to output_directory, as zips also store when they were written"""
+    files = os.listdir(output_directory)
+    assert len(files) == 1 and files[0].endswith((".apred", ".apblue")), files
+    with zipfile.ZipFile(os.path.join(output_directory, files[0])) as patch:
+        return {name: hashlib.sha256(patch.read(name)).hexdigest() for name in patch.namelist()}
+
+
+class TestOutputJob(unittest.TestCase):
+    def setUp(self) -> None:
+        self.get_base_rom_bytes = rom.get_base_rom_bytes
+        use_fake_base_rom()
+
+    def tearDown(self) -> None:
+        rom.get_base_rom_bytes = self.get_base_rom_bytes
+
+    def test_job_in_process_pool(self) -> None:
+        """The output job pickles and writes the same patch in another process as generate_output does"""
+        multiworld = setup_solo_multiworld(PokemonRedBlueWorld)
+        distribute_items_restrictive(multiworld)
+        call_all(multiworld, "post_fill")
+        world = multiworld.worlds[1]
+        random_state = multiworld.per_slot_randoms[1].getstate()
+
+        with tempfile.TemporaryDirectory() as directory:
+            PokemonRedBlueWorld.stage_generate_output(multiworld, directory)
+            rom.generate_output(world, directory)
+            expected = read_patch(directory)
+
+        multiworld.per_slot_randoms[1].setstate(random_state)
+        with tempfile.TemporaryDirectory() as directory:
+            job = world.get_output_job(directory)
+            with concurrent.futures.ProcessPoolExecutor(1, initializer=use_fake_base_rom) as pool:
+                pool.submit(job).result()
+            self.assertEqual(read_patch(directory), expected)
@@ -36,6 +36,7 @@ class RLWorld(World):
     option_definitions = rl_options
     topology_present = True
     required_client_version = (0, 3, 5)
+    incremental_reachability = True
     web = RLWeb()
 
     item_name_to_id = {name: data.code for name, data in item_table.items()}
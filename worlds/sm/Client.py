@@ -1,3 +1,4 @@
+import functools
 import logging
 import asyncio
 import time
@@ -87,26 +88,17 @@ class SMSNIClient(SNIClient):
         return True
 
 
-    async def game_watcher(self, ctx):
-        from SNIClient import snes_buffered_write, snes_flush_writes, snes_read
-        if ctx.server is None or ctx.slot is None:
-            # not successfully connected to a multiworld server, cannot process the game sending items
-            return
-
-        gamemode = await snes_read(ctx, WRAM_START + 0x0998, 1)
-        if "DeathLink" in ctx.tags and gamemode and ctx.last_death_link + 1 < time.time():
-            currently_dead = gamemode[0] in SM_DEATH_MODES
-            await ctx.handle_deathlink_state(currently_dead)
-        if gamemode is not None and gamemode[0] in SM_ENDGAME_MODES:
-            if not ctx.finished_game:
-                await ctx.send_msgs([{"cmd": "StatusUpdate", "status": ClientStatus.CLIENT_GOAL}])
-                ctx.finished_game = True
-            return
+    def watch_memory(self, ctx):
+        self.game_mode = ctx.snes_watches.watch(WRAM_START + 0x0998, 1)
+        ctx.snes_watches.watch(SM_SEND_QUEUE_RCOUNT, 4, functools.partial(self.on_send_queue_changed, ctx))
+        self.recv_queue = ctx.snes_watches.watch(SM_RECV_QUEUE_WCOUNT, 2)
 
-        data = await snes_read(ctx, SM_SEND_QUEUE_RCOUNT, 4)
-        if data is None:
+    async def on_send_queue_changed(self, ctx, change):
+        from SNIClient import snes_buffered_write, snes_read
+        if ctx.server is None or ctx.slot is None or self.game_mode.data[0] in SM_ENDGAME_MODES:
             return
 
+        data = change.new
         recv_index = data[0] | (data[1] << 8)
         recv_item = data[2] | (data[3] << 8) # this is actually SM_SEND_QUEUE_WCOUNT
 
@@ -128,7 +120,26 @@ class SMSNIClient(SNIClient):
                 f'New Check: {location} ({len(ctx.locations_checked)}/{len(ctx.missing_locations) + len(ctx.checked_locations)})')
             await ctx.send_msgs([{"cmd": 'LocationChecks', "locations": [location_id]}])
 
-        data = await snes_read(ctx, SM_RECV_QUEUE_WCOUNT, 2)
+    async def game_watcher(self, ctx):
+        from SNIClient import snes_buffered_write, snes_flush_writes
+        if ctx.server is None or ctx.slot is None:
+            # not successfully connected to a multiworld server, cannot process the game sending items
+            # report the watched memory again once connected, so the send queue isn't skipped
+            ctx.snes_watches.reset()
+            return
+
+        # the watches were read right before this call, new checks were already sent if the send queue changed
+        gamemode = self.game_mode.data
+        if "DeathLink" in ctx.tags and gamemode and ctx.last_death_link + 1 < time.time():
+            currently_dead = gamemode[0] in SM_DEATH_MODES
+            await ctx.handle_deathlink_state(currently_dead)
+        if gamemode is not None and gamemode[0] in SM_ENDGAME_MODES:
+            if not ctx.finished_game:
+                await ctx.send_msgs([{"cmd": "StatusUpdate", "status": ClientStatus.CLIENT_GOAL}])
+                ctx.finished_game = True
+            return
+
+        data = self.recv_queue.data
         if data is None:
             return
 
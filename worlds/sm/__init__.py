@@ -2,6 +2,7 @@ from __future__ import annotations
 
 import base64
 import copy
+import functools
 import logging
 import threading
 import typing
@@ -11,6 +12,7 @@ import settings
 from BaseClasses import CollectionState, Entrance, Item, ItemClassification, Location, MultiWorld, Region, Tutorial
 from Options import Accessibility
 from worlds.AutoWorld import AutoLogicRegister, WebWorld, World
+from worlds.Files import write_delta_patch
 from worlds.generic.Rules import add_rule, set_rule
 
 logger = logging.getLogger("Super Metroid")
@@ -379,7 +381,6 @@ class SMWorld(World):
 
         # Having a sorted itemLocs from collection order is required for escapeTrigger when Tourian is Disabled.
         # We cant use stage_post_fill for this as its called after worlds' post_fill.
-        # get_spheres could be cached in multiworld?
         # Another possible solution would be to have a globally accessible list of items in the order in which the get placed in push_item
         # and use the inversed starting from the first progression item.
         spheres: List[Location] = getattr(self.multiworld, "_sm_spheres", None)
@@ -798,7 +799,7 @@ class SMWorld(World):
 
         romPatcher.end()
 
-    def generate_output(self, output_directory: str):
+    def get_output_job(self, output_directory: str) -> typing.Callable[[], None]:
         self.variaRando.args.rom = get_base_rom_path()
         outfilebase = self.multiworld.get_out_file_name_base(self.player)
         outputFilename = os.path.join(output_directory, f"{outfilebase}.sfc")
@@ -808,16 +809,16 @@ class SMWorld(World):
             self.write_crc(outputFilename)
             self.rom_name = self.romName
         except:
-            raise
-        else:
-            patch = SMDeltaPatch(os.path.splitext(outputFilename)[0] + SMDeltaPatch.patch_file_ending, player=self.player,
-                                 player_name=self.multiworld.player_name[self.player], patched_path=outputFilename)
-            patch.write()
-        finally:
             if os.path.exists(outputFilename):
                 os.unlink(outputFilename)
+            raise
+        finally:
             self.rom_name_available_event.set()  # make sure threading continues and errors are collected
 
+        patch = SMDeltaPatch(os.path.splitext(outputFilename)[0] + SMDeltaPatch.patch_file_ending, player=self.player,
+                             player_name=self.multiworld.player_name[self.player], patched_path=outputFilename)
+        return functools.partial(write_delta_patch, patch)
+
     def checksum_mirror_sum(self, start, length, mask = 0x800000):
         while not(length & mask) and mask:
             mask >>= 1
@@ -1,4 +1,5 @@
 import dataclasses
+import functools
 import os
 import typing
 import math
@@ -7,6 +8,7 @@ import threading
 
 from BaseClasses import Item, MultiWorld, Tutorial, ItemClassification
 from worlds.AutoWorld import WebWorld, World
+from worlds.Files import write_delta_patch
 from worlds.generic.Rules import add_rule, exclusion_rules
 
 from .Client import SMWSNIClient
@@ -212,28 +214,22 @@ class SMWWorld(World):
         self.multiworld.itempool += itempool
 
 
-    def generate_output(self, output_directory: str):
-        rompath = ""  # if variable is not declared finally clause may fail
+    def get_output_job(self, output_directory: str) -> typing.Callable[[], None]:
+        multiworld = self.multiworld
+        player = self.player
         try:
-            multiworld = self.multiworld
-            player = self.player
-
             rom = LocalRom(get_base_rom_path())
             patch_rom(self, rom, self.player, self.active_level_dict)
 
             rompath = os.path.join(output_directory, f"{self.multiworld.get_out_file_name_base(self.player)}.sfc")
             rom.write_to_file(rompath)
             self.rom_name = rom.name
-
-            patch = SMWDeltaPatch(os.path.splitext(rompath)[0]+SMWDeltaPatch.patch_file_ending, player=player,
-                                  player_name=multiworld.player_name[player], patched_path=rompath)
-            patch.write()
-        except:
-            raise
         finally:
             self.rom_name_available_event.set()  # make sure threading continues and errors are collected
-            if os.path.exists(rompath):
-                os.unlink(rompath)
+
+        patch = SMWDeltaPatch(os.path.splitext(rompath)[0]+SMWDeltaPatch.patch_file_ending, player=player,
+                              player_name=multiworld.player_name[player], patched_path=rompath)
+        return functools.partial(write_delta_patch, patch)
 
     def modify_multidata(self, multidata: dict):
         import base64
@@ -1,4 +1,5 @@
 import base64
+import functools
 import os
 import typing
 import threading
@@ -6,6 +7,7 @@ import threading
 from typing import List, Set, TextIO, Dict
 from BaseClasses import Item, MultiWorld, Tutorial, ItemClassification
 from worlds.AutoWorld import World, WebWorld
+from worlds.Files import write_delta_patch
 import settings
 from .Items import get_item_names_per_category, item_table, filler_items, trap_items
 from .Locations import get_locations
@@ -338,25 +340,22 @@ class YoshisIslandWorld(World):
 
         self.multiworld.itempool += pool
 
-    def generate_output(self, output_directory: str) -> None:
-        rompath = ""  # if variable is not declared finally clause may fail
+    def get_output_job(self, output_directory: str) -> typing.Callable[[], None]:
+        world = self.multiworld
+        player = self.player
         try:
-            world = self.multiworld
-            player = self.player
             rom = LocalRom(get_base_rom_path())
             patch_rom(self, rom, self.player)
 
             rompath = os.path.join(output_directory, f"{self.multiworld.get_out_file_name_base(self.player)}.sfc")
             rom.write_to_file(rompath)
             self.rom_name = rom.name
-
-            patch = YoshisIslandDeltaPatch(os.path.splitext(rompath)[0] + YoshisIslandDeltaPatch.patch_file_ending,
-                                           player=player, player_name=world.player_name[player], patched_path=rompath)
-            patch.write()
         finally:
             self.rom_name_available_event.set()
-            if os.path.exists(rompath):
-                os.unlink(rompath)
+
+        patch = YoshisIslandDeltaPatch(os.path.splitext(rompath)[0] + YoshisIslandDeltaPatch.patch_file_ending,
+                                       player=player, player_name=world.player_name[player], patched_path=rompath)
+        return functools.partial(write_delta_patch, patch)
 
     def modify_multidata(self, multidata: dict) -> None:
         # wait for self.rom_name to be available.
@@ -1,6 +1,7 @@
+import functools
 import os
 import pkgutil
-from typing import Any, ClassVar, Dict, List
+from typing import Any, Callable, ClassVar, Dict, List
 
 import settings
 from BaseClasses import Entrance, Item, ItemClassification, Location, MultiWorld, Region, Tutorial
@@ -388,7 +389,7 @@ class Yugioh06World(World):
     def set_rules(self):
         set_rules(self)
 
-    def generate_output(self, output_directory: str):
+    def get_output_job(self, output_directory: str) -> Callable[[], None]:
         outfilepname = f"_P{self.player}"
         outfilepname += f"_{self.multiworld.get_file_safe_player_name(self.player).replace(' ', '_')}"
         self.rom_name_text = f'YGO06{Utils.__version__.replace(".", "")[0:3]}_{self.player}_{self.multiworld.seed:11}\0'
@@ -411,7 +412,7 @@ class Yugioh06World(World):
 
         # Write Output
         out_file_name = self.multiworld.get_out_file_name_base(self.player)
-        patch.write(os.path.join(output_directory, f"{out_file_name}{patch.patch_file_ending}"))
+        return functools.partial(patch.write, os.path.join(output_directory, f"{out_file_name}{patch.patch_file_ending}"))
 
     def fill_slot_data(self) -> Dict[str, Any]:
         slot_data: Dict[str, Any] = {
@@ -5,6 +5,7 @@ from NetUtils import ClientStatus, NetworkItem
 
 import worlds._bizhawk as bizhawk
 from worlds._bizhawk.client import BizHawkClient
+from worlds._memory_watch import MemoryChange, Watch
 from . import item_to_index
 
 if TYPE_CHECKING:
@@ -16,12 +17,21 @@ class YuGiOh2006Client(BizHawkClient):
     system = "GBA"
     patch_suffix = ".apygo06"
     local_checked_locations: Set[int]
+    location_flags: Set[int]
+    """set location flags, kept up to date by the watch on them"""
+    goal_reached: bool
     goal_flag: int
     rom_slot_name: Optional[str]
+    game_state: Watch
+    items: Watch
+    amount_items: Watch
+    money: Watch
 
     def __init__(self) -> None:
         super().__init__()
         self.local_checked_locations = set()
+        self.location_flags = set()
+        self.goal_reached = False
         self.rom_slot_name = None
 
     async def validate_rom(self, ctx: "BizHawkClientContext") -> bool:
@@ -54,33 +64,44 @@ class YuGiOh2006Client(BizHawkClient):
     async def set_auth(self, ctx: "BizHawkClientContext") -> None:
         ctx.auth = self.rom_slot_name
 
+    def watch_memory(self, ctx: "BizHawkClientContext") -> None:
+        self.location_flags = set()
+        self.goal_reached = False
+        self.game_state = ctx.watches.watch(0x0, 8, domain="EWRAM")
+        ctx.watches.watch(0x52E8, 32, self.on_locations_changed, "EWRAM")
+        self.items = ctx.watches.watch(0x5308, 32, domain="EWRAM")
+        self.amount_items = ctx.watches.watch(0x5325, 1, domain="EWRAM")
+        self.money = ctx.watches.watch(0x6C38, 4, domain="EWRAM")
+
+    def on_locations_changed(self, change: MemoryChange) -> None:
+        # Only look at the bytes of the location flags that changed.
+        for byte_i in change.changed_offsets():
+            byte = change.new[byte_i]
+            for i in range(8):
+                if byte & (1 << i) != 0:
+                    self.location_flags.add(byte_i * 8 + i)
+                else:
+                    self.location_flags.discard(byte_i * 8 + i)
+        # Either any ending cutscene or the credits state.
+        self.goal_reached = change.new[18] & (1 << 5) != 0
+
     async def game_watcher(self, ctx: "BizHawkClientContext") -> None:
         try:
-            read_state = await bizhawk.read(
-                ctx.bizhawk_ctx,
-                [
-                    (0x0, 8, "EWRAM"),
-                    (0x52E8, 32, "EWRAM"),
-                    (0x5308, 32, "EWRAM"),
-                    (0x5325, 1, "EWRAM"),
-                    (0x6C38, 4, "EWRAM"),
-                ],
-            )
-            game_state = read_state[0].decode("utf-8")
-            locations = read_state[1]
-            items = read_state[2]
-            amount_items = int.from_bytes(read_state[3], "little")
-            money = int.from_bytes(read_state[4], "little")
+            # The watched memory was read right before this call.
+            items = self.items.data
+            amount_items = int.from_bytes(self.amount_items.data, "little")
+            money = int.from_bytes(self.money.data, "little")
 
             # make sure save was created
-            if game_state != "YWCT2006":
+            if self.game_state.data != b"YWCT2006":
                 return
-            local_items = bytearray(items)
-            await bizhawk.guarded_write(
-                ctx.bizhawk_ctx,
-                [(0x5308, parse_items(bytearray(items), ctx.items_received), "EWRAM")],
-                [(0x5308, local_items, "EWRAM")],
-            )
+            local_items = parse_items(bytearray(items), ctx.items_received)
+            if local_items != items:
+                await bizhawk.guarded_write(
+                    ctx.bizhawk_ctx,
+                    [(0x5308, local_items, "EWRAM")],
+                    [(0x5308, items, "EWRAM")],
+                )
             money_received = 0
             for item in ctx.items_received:
                 if item.item == item_to_index["5000DP"] + 5730000:
@@ -98,18 +119,7 @@ class YuGiOh2006Client(BizHawkClient):
                     ],
                 )
 
-            locs_to_send = set()
-
-            # Check for set location flags.
-            for byte_i, byte in enumerate(bytearray(locations)):
-                for i in range(8):
-                    and_value = 1 << i
-                    if byte & and_value != 0:
-                        flag_id = byte_i * 8 + i
-
-                        location_id = flag_id + 5730001
-                        if location_id in ctx.server_locations:
-                            locs_to_send.add(location_id)
+            locs_to_send = {flag_id + 5730001 for flag_id in self.location_flags} & ctx.server_locations
 
             # Send locations if there are any to send.
             if locs_to_send != self.local_checked_locations:
@@ -119,7 +129,7 @@ class YuGiOh2006Client(BizHawkClient):
                     await ctx.send_msgs([{"cmd": "LocationChecks", "locations": list(locs_to_send)}])
 
             # Send game clear if we're in either any ending cutscene or the credits state.
-            if not ctx.finished_game and locations[18] & (1 << 5) != 0:
+            if not ctx.finished_game and self.goal_reached:
                 await ctx.send_msgs([{"cmd": "StatusUpdate", "status": ClientStatus.CLIENT_GOAL}])
 
         except bizhawk.RequestFailedError: